@@ -7,4 +7,7 @@ MONGO_URI = "mongodb://localhost:27017/"
 DATABASE_NAME = "regression_tests"
 
 # Tolerance threshold for pass/fail determination (as a decimal percentage)
-TOLERANCE_THRESHOLD = 0.05  # 5% tolerance
\ No newline at end of file
+TOLERANCE_THRESHOLD = 0.05  # 5% tolerance
+
+# XML parser backend: "auto" uses lxml when it is installed, "lxml" or "stdlib" force one
+XML_BACKEND = "auto"
@@ -2,7 +2,7 @@
 XML parsing and data extraction for the regression testing library.
 """
 
-import xml.etree.ElementTree as ET
+from samuel_regression_lib import xml_backend
 
 
 class XMLExtractor:
@@ -34,7 +34,7 @@ class XMLExtractor:
             dict or None: Dictionary of output data or None if extraction fails
         """
         try:
-            root = ET.fromstring(xml_string)
+            root = xml_backend.fromstring(xml_string)
             output = root.find(".//OUTPUT")
 
             if output is None:
@@ -56,5 +56,5 @@ class XMLExtractor:
                 output_dict[tag] = value
 
             return output_dict
-        except ET.ParseError:
+        except xml_backend.ParseError:
             return None
\ No newline at end of file
@@ -7,4 +7,7 @@ setup(
     install_requires=[
         "pymongo>=4.0.0",
     ],
+    extras_require={
+        "fast": ["lxml>=4.9"],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+Benchmark BSON decoding on the reference lookup and listing paths.
+
+Compares the CPU time spent decoding reference documents the way pymongo
+returns them:
+
+    full dict      whole document (including xml_data) decoded to dicts
+    projected dict only output_data, decoded to dicts
+    projected lazy only output_data as raw BSON wrapped in LazyDocument,
+                   the way Database returns it
+
+Each variant is timed for two access patterns: what the comparator reads
+(every RESULT value and the number of SLOPES) and a single RESULT scalar
+(as read by listings and quick checks).
+
+The lazy variant is what Database returns with raw_bson (MONGO_RAW_BSON),
+which is opt-in; by default lookups return projected dicts. The compared
+fields pattern gains little (around 1.2x to 1.6x here), while reading one
+scalar is where lazy decoding pays off.
+
+The offline mode decodes server replies built in memory, so it needs no
+MongoDB. With --live the same lookups are run through Database against
+MONGO_URI with raw_bson disabled and enabled.
+
+Usage:
+    python benchmarks/bench_bson_decoding.py [--count N] [--slopes N] [--live METHOD]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samuel_regression_lib.lazy import LazyDocument  # noqa: E402
+
+RESULT = {
+    "START": 12.5, "END": 812.25, "WIDTH": 799.75, "HEIGHT_MIN": 0.125,
+    "HEIGHT_MAX": 4.5, "HEIGHT_MEAN": 2.3125, "ANGLE": 45.0,
+}
+
+
+def _reference(index, slopes, xml_bytes):
+    """Build a reference document shaped like the stored ones."""
+    output_data = {
+        "RESULT": dict(RESULT, WIDTH=RESULT["WIDTH"] + index),
+        "SLOPES": [{"Pos": i, "Sensor": i * 0.5} for i in range(slopes)],
+    }
+    return {
+        "filename": f"file{index}.xml",
+        "method": "lq",
+        "xml_data": "<DATA>" + "x" * xml_bytes + "</DATA>",
+        "output_data": output_data,
+        "output_fingerprint": "0" * 64,
+        "created_at": 1.0,
+        "updated_at": 1.0,
+    }
+
+
+def _read_compared(output_data):
+    """Access what the comparator reads from a reference."""
+    result = output_data.get("RESULT", {})
+    total = 0.0
+    for key in result:
+        total += result.get(key)
+    return total + len(output_data["SLOPES"])
+
+
+def _read_scalar(output_data):
+    """Access a single RESULT scalar."""
+    return output_data["RESULT"]["WIDTH"]
+
+
+def _time(label, function, repeat):
+    """Run a function `repeat` times and print its best CPU time."""
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        function()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:16} {best * 1000:9.1f} ms CPU")
+    return best
+
+
+def run_offline(count, slopes, xml_bytes, repeat):
+    """Decode in-memory replies with each document class."""
+    documents = [_reference(i, slopes, xml_bytes) for i in range(count)]
+    full = b"".join(bson.encode(doc) for doc in documents)
+    projected = b"".join(
+        bson.encode({"_id": i, "output_data": doc["output_data"]}) for i, doc in enumerate(documents)
+    )
+    raw_options = CodecOptions(document_class=RawBSONDocument)
+
+    print(f"{count} references, {slopes} slopes, {xml_bytes} bytes of XML each")
+
+    for pattern, read in (("compared fields", _read_compared), ("one scalar", _read_scalar)):
+        print(f"\n{pattern}:")
+
+        def full_dict():
+            for doc in bson.decode_all(full):
+                read(doc["output_data"])
+
+        def projected_dict():
+            for doc in bson.decode_all(projected):
+                read(doc["output_data"])
+
+        def projected_lazy():
+            for doc in bson.decode_all(projected, raw_options):
+                read(LazyDocument.from_raw(doc)["output_data"])
+
+        baseline = _time("full dict", full_dict, repeat)
+        _time("projected dict", projected_dict, repeat)
+        lazy = _time("projected lazy", projected_lazy, repeat)
+        print(f"speedup          {baseline / lazy:9.1f}x")
+
+
+def run_live(method, count, repeat):
+    """Look up stored references through Database with and without raw BSON."""
+    from samuel_regression_lib.db import Database
+
+    for raw_bson in (False, True):
+        database = Database(raw_bson=raw_bson)
+        keys = [
+            (doc["filename"], method)
+            for doc in database.iter_reference_data(method, limit=count)
+        ]
+
+        def lookups():
+            for filename, key_method in keys:
+                _read_compared(database.get_reference_data(filename, key_method))
+
+        def batched():
+            for output_data in database.get_reference_data_many(keys).values():
+                _read_compared(output_data)
+
+        label = "raw" if raw_bson else "dict"
+        print(f"{len(keys)} references of method '{method}'")
+        _time(f"lookup {label}", lookups, repeat)
+        _time(f"batch {label}", batched, repeat)
+        database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BSON decoding of references")
+    parser.add_argument("--count", type=int, default=5000, help="Number of references")
+    parser.add_argument("--slopes", type=int, default=200, help="SLOPES entries per reference")
+    parser.add_argument("--xml-bytes", type=int, default=20000, help="Size of xml_data")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best is reported)")
+    parser.add_argument("--live", metavar="METHOD", help="Benchmark a running MongoDB instead")
+    args = parser.parse_args()
+
+    if args.live:
+        run_live(args.live, args.count, args.repeat)
+    else:
+        run_offline(args.count, args.slopes, args.xml_bytes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
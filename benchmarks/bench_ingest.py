@@ -0,0 +1,86 @@
+"""
+Benchmark samreglib ingestion: two parses per file against one.
+
+Times, per file, the previous regadd path (extract_metadata_from_xml and
+xml_to_json, each parsing the file) against core.ingest.ingest_xml, which
+parses once and builds both results from the same tree. Also times the
+document parse alone, and checks that both paths produce identical
+metadata and raw JSON.
+
+Usage:
+    python benchmarks/bench_ingest.py [--slopes N] [--params N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from xml.sax.saxutils import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "samreglib"))
+
+from core import xml_backend  # noqa: E402
+from core.extractor import extract_metadata_from_xml  # noqa: E402
+from core.ingest import ingest_xml  # noqa: E402
+from core.xml_to_json import xml_to_json  # noqa: E402
+
+
+def _document(slopes, params):
+    """Build a regadd input file: a header of parameters and an embedded OUTPUT."""
+    slope_text = "".join(
+        f"<SLOPE><PosY>{i}</PosY><Sensor>{i * 0.5}</Sensor></SLOPE>" for i in range(slopes)
+    )
+    embedded = (
+        f"<OUTPUT>{slope_text}<RESULT><START>0</START><END>10</END><WIDTH>10.0</WIDTH>"
+        "<HEIGHT_MIN>1.0</HEIGHT_MIN><HEIGHT_MAX>2.0</HEIGHT_MAX><HEIGHT_MEAN>1.5</HEIGHT_MEAN>"
+        "<ANGLE>45.0</ANGLE></RESULT></OUTPUT>"
+    )
+    header = "".join(f"<Param><Name>p{i}</Name><Value>{i}</Value></Param>" for i in range(params))
+    return f"<Root><Header>{header}</Header><Data>{escape(embedded)}</Data></Root>"
+
+
+def _time(label, function, repeat):
+    """Run a function `repeat` times and print its best CPU time."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = function()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:24} {best * 1000:9.1f} ms CPU")
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-parse ingestion")
+    parser.add_argument("--slopes", type=int, default=20000, help="SLOPE entries in the embedded output")
+    parser.add_argument("--params", type=int, default=2000, help="Header parameters in the document")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False) as f:
+        f.write(_document(args.slopes, args.params))
+    try:
+        print(f"{os.path.getsize(f.name)} byte document, {xml_backend.BACKEND} parser\n")
+
+        parse, _ = _time("parse once", lambda: xml_backend.parse(f.name), args.repeat)
+        two_pass, expected = _time(
+            "extract + xml_to_json",
+            lambda: (extract_metadata_from_xml(f.name)[0], xml_to_json(f.name)[0]),
+            args.repeat,
+        )
+        one_pass, actual = _time("ingest_xml", lambda: ingest_xml(f.name)[:2], args.repeat)
+    finally:
+        os.remove(f.name)
+
+    print(f"\nparse time per file      {2 * parse * 1000:9.1f} -> {parse * 1000:.1f} ms")
+    print(f"total speedup            {two_pass / one_pass:9.2f}x")
+    if tuple(actual) != expected:
+        raise SystemExit("ingest_xml output differs from the two-parse path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark the XML parser backends of the extractors.
+
+Times xml.etree.ElementTree ("stdlib") against lxml for:
+
+    parse          parsing a structured document of many small elements
+    extract        samuel_regression_lib XMLExtractor.extract_output on a
+                   document with a header and an embedded <Data> blob
+    xml_to_json    samreglib core.xml_to_json on the structured document
+
+and checks that both backends produce identical extracted outputs.
+Needs lxml installed (pip install lxml) for the comparison.
+
+Usage:
+    python benchmarks/bench_xml_parsing.py [--elements N] [--slopes N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import types
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, "samreglib"))
+
+from samuel_regression_lib import extractors, xml_backend  # noqa: E402
+from core import xml_to_json  # noqa: E402
+
+STDLIB = types.SimpleNamespace(
+    fromstring=ET.fromstring,
+    parse=lambda source: ET.parse(source).getroot(),
+)
+
+
+def _structured_document(elements):
+    """Build a document of measurement records with comments and attributes."""
+    records = "".join(
+        f"<!-- record {i} --><RECORD id='{i}'><Pos>{i * 0.5}</Pos>"
+        f"<Sensor>{i % 97 * 0.25}</Sensor><Flag>ok</Flag></RECORD>"
+        for i in range(elements)
+    )
+    return f"<?xml version='1.0' encoding='UTF-8'?><SAM><HEADER><Version>1.0</Version></HEADER>{records}</SAM>"
+
+
+def _embedded_document(slopes):
+    """Build an output document whose <Data> holds the embedded OUTPUT text."""
+    slope_text = "".join(
+        f"<SLOPE><Pos>{i}</Pos><Sensor>{i * 0.5}</Sensor></SLOPE>" for i in range(slopes)
+    )
+    embedded = (
+        f"<OUTPUT>{slope_text}<RESULT><START>0</START><END>10</END><WIDTH>10.0</WIDTH>"
+        "<HEIGHT_MIN>1.0</HEIGHT_MIN><HEIGHT_MAX>2.0</HEIGHT_MAX><HEIGHT_MEAN>1.5</HEIGHT_MEAN>"
+        "<ANGLE>45.0</ANGLE></RESULT></OUTPUT>"
+    )
+    header = "".join(f"<Param name='p{i}'>{i}</Param>" for i in range(slopes))
+    return f"<Root><Header>{header}</Header><Data>{escape(embedded)}</Data></Root>"
+
+
+def _time(label, function, repeat):
+    """Run a function `repeat` times and print its best CPU time."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = function()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:16} {best * 1000:9.1f} ms CPU")
+    return best, result
+
+
+def _compare(name, stdlib_run, accelerated_run, repeat):
+    """Time a workload with both backends and check their outputs match."""
+    print(f"\n{name}:")
+    baseline, expected = _time("stdlib", stdlib_run, repeat)
+    if xml_backend.BACKEND != xml_backend.BACKEND_LXML:
+        print("lxml             not installed")
+        return
+
+    accelerated, actual = _time("lxml", accelerated_run, repeat)
+    print(f"speedup          {baseline / accelerated:9.1f}x")
+    if actual != expected:
+        raise SystemExit(f"{name}: outputs differ between backends")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the XML parser backends")
+    parser.add_argument("--elements", type=int, default=20000, help="Records in the structured document")
+    parser.add_argument("--slopes", type=int, default=20000, help="SLOPE entries in the embedded document")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions (best is reported)")
+    args = parser.parse_args()
+
+    structured = _structured_document(args.elements)
+    embedded = _embedded_document(args.slopes)
+    print(f"structured document {len(structured)} bytes, embedded document {len(embedded)} bytes")
+
+    _compare(
+        "parse",
+        lambda: len(ET.fromstring(structured)),
+        lambda: len(xml_backend.fromstring(structured)),
+        args.repeat,
+    )
+
+    extractor = extractors.XMLExtractor()
+
+    def extract_stdlib():
+        with patch.object(extractors, "xml_backend", STDLIB):
+            return extractor.extract_output(embedded)
+
+    _compare("extract", extract_stdlib, lambda: extractor.extract_output(embedded), args.repeat)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False) as f:
+        f.write(structured)
+    try:
+        def convert_stdlib():
+            with patch.object(xml_to_json, "xml_backend", STDLIB):
+                return xml_to_json.xml_to_json(f.name)[0]
+
+        _compare(
+            "xml_to_json", convert_stdlib, lambda: xml_to_json.xml_to_json(f.name)[0], args.repeat
+        )
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
-from .main import test_file, display_results, MainApplication
+from .main import test_file, display_results, set_headless, MainApplication
 
-__all__ = ['test_file', 'display_results', 'MainApplication']
+__all__ = ['test_file', 'display_results', 'set_headless', 'MainApplication']
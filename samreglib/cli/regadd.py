@@ -1,9 +1,14 @@
+import os
 import sys
+import time
+import queue
 import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from core.db import get_db_connection, store_document
-from core.extractor import extract_metadata_from_xml
-from core.xml_to_json import xml_to_json
+from core.config import INGEST_WORKERS, INGEST_BATCH_SIZE, INGEST_QUEUE_SIZE
+from core.db import get_db_connection, store_document, store_documents, build_document
+from core.ingest import ingest_xml
 
 def add_file_to_db(file_path: Path, method_name: str, verbose: bool = False) -> bool:
     """Add an XML file to the database."""
@@ -19,10 +24,9 @@ def add_file_to_db(file_path: Path, method_name: str, verbose: bool = False) ->
         return False
 
     try:
-        metadata, extract_result = extract_metadata_from_xml(file_path)
-        json_data, json_result = xml_to_json(file_path)
+        metadata, json_data, ingest_result = ingest_xml(file_path)
         if verbose:
-            print(extract_result, json_result)
+            print(ingest_result)
 
         store_result = store_document(db, method_name, file_path.name, json_data, metadata)
         if verbose:
@@ -34,16 +38,87 @@ def add_file_to_db(file_path: Path, method_name: str, verbose: bool = False) ->
         print(f"Error: {e}")
         return False
 
-def process_directory(directory: Path, method_name: str, verbose: bool):
-    """Process all XML files in a directory."""
-    success, failed = 0, 0
-    for file_path in directory.glob("*.xml"):
-        print(f"Processing {file_path.name}...")
-        if add_file_to_db(file_path, method_name, verbose):
-            success += 1
-        else:
-            failed += 1
-    print(f"Batch complete: {success} added, {failed} failed")
+def parse_file(file_path: Path):
+    """Parse one XML file in a worker; returns (name, size, document, error)."""
+    size = file_path.stat().st_size
+    try:
+        metadata, json_data, _ = ingest_xml(file_path)
+        return file_path.name, size, build_document(file_path.name, json_data, metadata), None
+    except Exception as e:
+        return file_path.name, size, None, str(e)
+
+def write_batches(db, method_name, batches, counts, verbose):
+    """Writer thread: insert queued batches until the None sentinel arrives."""
+    while True:
+        batch = batches.get()
+        if batch is None:
+            return
+        stored, store_result = store_documents(db, method_name, batch)
+        counts["added"] += stored
+        counts["failed"] += len(batch) - stored
+        if verbose or stored < len(batch):
+            print(store_result)
+
+def process_directory(directory: Path, method_name: str, verbose: bool, workers: int = INGEST_WORKERS):
+    """Process all XML files in a directory on a parser pool with one DB writer; returns (added, failed)."""
+    db, db_result = get_db_connection()
+    if verbose:
+        print(db_result)
+    if db is None:
+        print("Database connection failed")
+        return 0, 0
+
+    files = iter(sorted(directory.glob("*.xml")))
+    workers = workers or os.cpu_count() or 1
+    counts = {"added": 0, "failed": 0}  # Updated by the writer thread only
+    parse_failures = 0
+    total_bytes = 0
+    start = time.perf_counter()
+
+    # A full queue blocks this thread, so no new files are parsed until the writer catches up
+    batches = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    writer = threading.Thread(target=write_batches, args=(db, method_name, batches, counts, verbose))
+    writer.start()
+    batch = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            while True:
+                # Keep a bounded window of files in flight
+                for file_path in files:
+                    pending.add(pool.submit(parse_file, file_path))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, size, document, error = future.result()
+                    total_bytes += size
+                    if error is not None:
+                        print(f"Error: {name}: {error}")
+                        parse_failures += 1
+                        continue
+                    if verbose:
+                        print(f"Parsed {name}")
+                    batch.append(document)
+                    if len(batch) >= INGEST_BATCH_SIZE:
+                        batches.put(batch)
+                        batch = []
+    finally:
+        if batch:
+            batches.put(batch)
+        batches.put(None)
+        writer.join()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    failed = counts["failed"] + parse_failures
+    processed = counts["added"] + failed
+    print(f"Batch complete: {counts['added']} added, {failed} failed "
+          f"in {elapsed:.2f}s ({processed / elapsed:.1f} files/s, "
+          f"{total_bytes / elapsed / (1024 * 1024):.2f} MB/s)")
+    return counts["added"], failed
 
 def main():
     parser = argparse.ArgumentParser(description="Add XML files to the SAM Registry database")
@@ -51,11 +126,13 @@ def main():
     parser.add_argument("method_name", help="Method name for storage")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable detailed output")
     parser.add_argument("-b", "--batch", action="store_true", help="Process all XML files in a directory")
+    parser.add_argument("-j", "--workers", type=int, default=INGEST_WORKERS,
+                        help="Parser processes for --batch (default: CPU count)")
 
     args = parser.parse_args()
 
     if args.file_path.is_dir() and args.batch:
-        process_directory(args.file_path, args.method_name, args.verbose)
+        process_directory(args.file_path, args.method_name, args.verbose, args.workers)
     elif add_file_to_db(args.file_path, args.method_name, args.verbose):
         print("File added successfully")
     else:
@@ -1,22 +1,44 @@
+from threading import Lock
+
 class CaseBuilder:
     def __init__(self):
         self.case_lines = []
+        self._lock = Lock()
     
     def append_line(self, message):
         """Append a new line to the case builder."""
-        message = str(message) if message is not None else "No result message"
-        self.case_lines.append(message)
+        self.append_lines([message])
+    
+    def append_lines(self, messages):
+        """Append several lines as one block, without lines from other threads in between."""
+        messages = [str(message) if message is not None else "No result message" for message in messages]
+        with self._lock:
+            self.case_lines.extend(messages)
     
     def get_all_lines(self):
         """Return all lines as a single string, separated by newlines."""
-        return "\n\n".join(self.case_lines)  # Added extra newline for spacing
+        with self._lock:
+            return "\n\n".join(self.case_lines)  # Added extra newline for spacing
     
     def clear(self):
         """Clear all stored case lines."""
-        self.case_lines = []
+        with self._lock:
+            self.case_lines = []
+    
+    def export_to_stream(self, stream, start=0, footer=()):
+        """
+        Export the case lines from index `start`, then the footer lines, to a text
+        stream such as stdout or an open file. Returns the index to start from next time.
+        """
+        with self._lock:
+            lines = self.case_lines[start:]
+            end = len(self.case_lines)
+        stream.write("\n\n".join(lines + list(footer)) + "\n")
+        stream.flush()
+        return end
     
-    def export_to_tkinter(self, tkinter_instance):
-        """Export the case lines to a Tkinter widget."""
-        tkinter_instance.delete('1.0', tk.END)  # Clear existing content
-        tkinter_instance.insert('1.0', self.get_all_lines())
+    def export_to_tkinter(self, tkinter_instance, footer=()):
+        """Export the case lines, then the footer lines, to a Tkinter widget."""
+        tkinter_instance.delete('1.0', 'end')  # Clear existing content (tk.END)
+        tkinter_instance.insert('1.0', "\n\n".join([self.get_all_lines()] + list(footer)))
         tkinter_instance.yview_moveto(1)  # Scroll to the bottom
@@ -1,27 +1,48 @@
 import re
+from functools import lru_cache
 
-result = ""
+# A leaf element: <TAG>text</TAG> with no attributes, nested tags or line breaks
+_TAG_VALUE = re.compile(r"<([^<>/\s]+)>([^<\n]*)</\1>")
 
-def set_result(message):
-    global result
-    result = message
+@lru_cache(maxsize=64)
+def _tag_scanner(keys):
+    """Compile a leaf-element pattern that only matches the given tags."""
+    return re.compile("<(" + "|".join(re.escape(key) for key in keys) + r")>([^<\n]*)</\1>")
 
-def get_result():
-    return result
+def scan_tags(text, keys=None):
+    """
+    Map leaf tags in an XML string to the text of their first occurrence, in one pass.
+    
+    With `keys`, only those tags are matched and the scan stops once all are found.
+    """
+    if keys is None:
+        scanner, wanted = _TAG_VALUE, None
+    else:
+        keys = tuple(keys)
+        if not keys:
+            return {}
+        scanner, wanted = _tag_scanner(keys), len(set(keys))
+    
+    values = {}
+    for match in scanner.finditer(text):
+        values.setdefault(match.group(1), match.group(2))
+        if len(values) == wanted:
+            break
+    return values
 
-def compare_metadata(reference, extracted, tolerance):
-    """Compare reference metadata with extracted data."""
+def _compare_values(ref_result, extracted, tolerance):
+    """Compare reference result values with one extracted string or dict."""
     comparison = {}
-    ref_result = reference.get("result", {})
+    tags = scan_tags(extracted, ref_result) if isinstance(extracted, str) else None
     
     for key in ref_result:
         ref_val = ref_result.get(key)
         ext_val = None
         
         # Extract value from different input types
-        if isinstance(extracted, str):
-            match = re.search(f"<{key}>(.*?)</{key}>", extracted)
-            ext_val = float(match.group(1).strip()) if match else None
+        if tags is not None:
+            text = tags.get(key)
+            ext_val = float(text.strip()) if text is not None else None
         elif isinstance(extracted, dict):
             ext_val = extracted.get("result", {}).get(key) or extracted.get(key)
         
@@ -36,5 +57,17 @@ def compare_metadata(reference, extracted, tolerance):
         
         comparison[key] = {"percent_diff": percent_diff, "passed": passed}
     
-    set_result("Comparison completed successfully.")
-    return comparison, get_result()
+    return comparison
+
+def compare_metadata(reference, extracted, tolerance):
+    """Compare reference metadata with extracted data."""
+    comparison = _compare_values(reference.get("result", {}), extracted, tolerance)
+    
+    return comparison, "Comparison completed successfully."
+
+def compare_metadata_batch(reference, extracted_items, tolerance):
+    """Compare reference metadata with many extracted strings or dicts at once."""
+    ref_result = reference.get("result", {})
+    comparisons = [_compare_values(ref_result, extracted, tolerance) for extracted in extracted_items]
+    
+    return comparisons, f"{len(comparisons)} comparisons completed successfully."
@@ -7,3 +7,19 @@ DB_NAME = os.getenv("DB_NAME", "samreglib_db")  # MongoDB Database name
 # Tolerance Level for Comparator (Percentage tolerance)
 TOLERANCE_LEVEL = float(os.getenv("TOLERANCE_LEVEL", 0.05))  # Default 5% tolerance
 
+# Batch Ingestion (regadd --batch)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 0))  # Parser processes; 0 uses the CPU count
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 100))  # Documents per insert_many
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 4))  # Parsed batches waiting for the writer
+
+# Reference Cache (metadata looked up by (method_name, filename))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))  # 0 disables the cache
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 300))  # Seconds before a cached entry is re-read
+
+# Output (headless runs write results to a file or stdout instead of opening the Tk window)
+HEADLESS = os.getenv("SAMREGLIB_HEADLESS", "0").lower() in ("1", "true", "yes")  # Skip the GUI entirely
+RESULTS_FILE = os.getenv("SAMREGLIB_RESULTS_FILE")  # Headless results file; stdout when unset
+
+# XML Parser ("auto" uses lxml if installed, otherwise "stdlib")
+XML_BACKEND = os.getenv("XML_BACKEND", "auto")  # "auto", "lxml" or "stdlib"
+
@@ -1,42 +1,58 @@
 import pymongo
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 from core.config import DB_URI, DB_NAME
 
-result = ""
-
-def set_result(message):
-    global result
-    result = message
-
-def get_result():
-    return result
-
 def get_db_connection():
     """Establish MongoDB database connection."""
     try:
         client = MongoClient(DB_URI)
         db = client[DB_NAME]
-        set_result("Connected to MongoDB successfully.")
-        return db, result
+        return db, "Connected to MongoDB successfully."
     except Exception as e:
-        set_result(f"Connection failed: {str(e)}")
-        return None, result
+        return None, f"Connection failed: {str(e)}"
+
+def build_document(document_name, document_data, metadata):
+    """Build the stored form of a document."""
+    return {
+        "name": document_name,
+        "data": document_data,
+        "metadata": metadata
+    }
 
 def store_document(db, collection_name, document_name, document_data, metadata):
     """Store a document with its metadata."""
     try:
         collection = db[collection_name]
-        document = {
-            "name": document_name,
-            "data": document_data,
-            "metadata": metadata
-        }
+        document = build_document(document_name, document_data, metadata)
         collection.insert_one(document)
-        set_result(f"Document '{document_name}' stored successfully.")
-        return result
+        return f"Document '{document_name}' stored successfully."
+    except Exception as e:
+        return f"Error storing document: {str(e)}"
+
+def store_documents(db, collection_name, documents):
+    """Store a batch of built documents in one round trip; returns the number stored."""
+    try:
+        collection = db[collection_name]
+        inserted = len(collection.insert_many(documents, ordered=False).inserted_ids)
+        return inserted, f"{inserted} documents stored successfully."
+    except BulkWriteError as e:
+        inserted = e.details.get("nInserted", 0)
+        return inserted, f"Error storing documents: {inserted} of {len(documents)} stored."
+    except Exception as e:
+        return 0, f"Error storing documents: {str(e)}"
+
+def find_document(db, collection_name, document_name):
+    """Retrieve a document's metadata in a single lookup; None if it does not exist."""
+    try:
+        collection = db[collection_name]
+        query_result = collection.find_one({"name": document_name}, {"_id": 0, "metadata": 1})
+        if query_result is not None:
+            return query_result.get("metadata", {}), f"Document '{document_name}' exists; metadata retrieved."
+        else:
+            return None, f"Document '{document_name}' does not exist."
     except Exception as e:
-        set_result(f"Error storing document: {str(e)}")
-        return result
+        return None, f"Error retrieving document: {str(e)}"
 
 def check_name_exists(db, collection_name, document_name):
     """Check if a document exists in the collection."""
@@ -44,14 +60,11 @@ def check_name_exists(db, collection_name, document_name):
         collection = db[collection_name]
         query_result = collection.find_one({"name": document_name})
         if query_result:
-            set_result(f"Document '{document_name}' exists.")
-            return True, result
+            return True, f"Document '{document_name}' exists."
         else:
-            set_result(f"Document '{document_name}' does not exist.")
-            return False, result
+            return False, f"Document '{document_name}' does not exist."
     except Exception as e:
-        set_result(f"Error checking document: {str(e)}")
-        return False, result
+        return False, f"Error checking document: {str(e)}"
 
 def get_metadata(db, collection_name, document_name):
     """Retrieve metadata for a document."""
@@ -59,11 +72,8 @@ def get_metadata(db, collection_name, document_name):
         collection = db[collection_name]
         query_result = collection.find_one({"name": document_name})
         if query_result:
-            set_result(f"Metadata for '{document_name}' retrieved.")
-            return query_result.get("metadata", {}), result
+            return query_result.get("metadata", {}), f"Metadata for '{document_name}' retrieved."
         else:
-            set_result(f"Document '{document_name}' not found.")
-            return None, result
+            return None, f"Document '{document_name}' not found."
     except Exception as e:
-        set_result(f"Error retrieving metadata: {str(e)}")
-        return None, result
+        return None, f"Error retrieving metadata: {str(e)}"
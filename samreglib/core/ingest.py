@@ -0,0 +1,10 @@
+from core import xml_backend
+from core.extractor import extract_metadata_from_root
+from core.xml_to_json import root_to_json
+
+def ingest_xml(file_path):
+    """Parse an XML file once and return (metadata, raw_json, result) from the same tree."""
+    root = xml_backend.parse(file_path)
+    metadata, _ = extract_metadata_from_root(root)
+    raw_json = root_to_json(root)
+    return metadata, raw_json, "File parsed once: metadata extracted and converted to raw JSON."
@@ -1,46 +1,193 @@
-import xml.etree.ElementTree as ET
+import json
 
-result = ""
+from core import xml_backend
 
-def set_result(message):
-    global result
-    result = message
+def _add_child(child_dict, repeated, tag, value):
+    """Add a child's value under its tag, turning repeated tags into a list."""
+    if tag in repeated:
+        child_dict[tag].append(value)
+    elif tag in child_dict:
+        child_dict[tag] = [child_dict[tag], value]
+        repeated.add(tag)
+    else:
+        child_dict[tag] = value
 
-def get_result():
-    return result
-
-def element_to_dict(elem):
-    """Convert an ElementTree element to a dictionary."""
+def _element_value(elem, child_dict):
+    """Build an element's value once all of its children are converted."""
     d = dict(elem.attrib) if elem.attrib else {}
-    
-    children = list(elem)
-    if children:
-        child_dict = {}
-        for child in children:
-            tag = child.tag
-            child_value = element_to_dict(child)
-            
-            if tag in child_dict:
-                child_dict[tag] = [child_dict[tag], child_value] if not isinstance(child_dict[tag], list) else child_dict[tag] + [child_value]
-            else:
-                child_dict[tag] = child_value
-        
+    if child_dict:
         d.update(child_dict)
     elif elem.text:
         d = elem.text.strip()
-    
     return d
 
+def element_to_dict(elem):
+    """Convert an ElementTree element to a dictionary."""
+    # Iterative post-order walk: nesting depth is not limited by the recursion limit
+    stack = [(elem, iter(elem), {}, set())]
+    while True:
+        node, children, child_dict, repeated = stack[-1]
+        child = next(children, None)
+        if child is not None:
+            stack.append((child, iter(child), {}, set()))
+            continue
+
+        stack.pop()
+        value = _element_value(node, child_dict)
+        if not stack:
+            return value
+        _add_child(stack[-1][2], stack[-1][3], node.tag, value)
+
+def root_to_json(root):
+    """Convert the root element of an already parsed XML file to raw JSON."""
+    return {root.tag: element_to_dict(root)}
+
 def xml_to_json(file_path):
     """Convert XML file to a raw JSON representation."""
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        raw_json = {root.tag: element_to_dict(root)}
+        root = xml_backend.parse(file_path)
+        raw_json = root_to_json(root)
         
-        set_result("XML converted to raw JSON successfully.")
-        return raw_json, get_result()
+        return raw_json, "XML converted to raw JSON successfully."
     
     except Exception as e:
-        set_result(f"Error parsing XML file: {e}")
+        raise ValueError(f"Error parsing XML file: {e}")
+
+def _scan_structure(file_path):
+    """
+    First streaming pass: find the elements whose children repeat a tag, and
+    those that cannot be written incrementally (a repeated tag interleaved with
+    other tags, or a child tag equal to an attribute name). Elements are
+    identified by their position in document order.
+    """
+    repeats, buffered = {}, set()
+    stack = []
+    index = 0
+    for event, elem in xml_backend.iterparse(file_path, events=("start", "end")):
+        if event == "start":
+            if stack:
+                counts, last = stack[-1][1], stack[-1][2]
+                tag = elem.tag
+                if tag != last and tag in counts:
+                    stack[-1][3] = True  # Interleaved with another tag
+                counts[tag] = counts.get(tag, 0) + 1
+                stack[-1][2] = tag
+            stack.append([index, {}, None, False, elem])
+            index += 1
+            continue
+
+        position, counts, _, interleaved, _ = stack.pop()
+        if interleaved or (elem.attrib and any(tag in elem.attrib for tag in counts)):
+            buffered.add(position)
+        else:
+            repeated = {tag for tag, count in counts.items() if count > 1}
+            if repeated:
+                repeats[position] = repeated
+        _release(elem, stack[-1][4] if stack else None)
+    return repeats, buffered
+
+def _release(elem, parent):
+    """Free a finished element and the finished siblings before it."""
+    elem.clear()
+    if parent is not None:
+        del parent[:-1]
+
+class _StreamWriter:
+    """Second streaming pass: write the raw JSON of each element as it is parsed."""
+
+    def __init__(self, out, repeats, buffered):
+        self.out = out
+        self.repeats = repeats
+        self.buffered = buffered
+        self.stack = []  # [element, members written, open list tag, repeated tags, opened]
+        self.buffer_depth = 0
+        self.index = 0
+
+    def _member(self, frame, key):
+        """Start a key/value member of an open object."""
+        if frame[1]:
+            self.out.write(", ")
+        frame[1] += 1
+        self.out.write(json.dumps(key) + ": ")
+
+    def _open(self, frame):
+        """Open an element's object once it turns out to have children."""
+        if not frame[4]:
+            self.out.write("{")
+            for key, value in frame[0].attrib.items():
+                self._member(frame, key)
+                self.out.write(json.dumps(value))
+            frame[4] = True
+
+    def start(self, elem):
+        """Write the key (or list separator) that precedes an element's value."""
+        index = self.index
+        self.index += 1
+        if self.buffer_depth:
+            self.buffer_depth += 1
+            return
+
+        if self.stack:
+            parent = self.stack[-1]
+            self._open(parent)
+            tag = elem.tag
+            if parent[2] is not None and parent[2] != tag:
+                self.out.write("]")
+                parent[2] = None
+            if parent[2] == tag:
+                self.out.write(", ")
+            else:
+                self._member(parent, tag)
+                if tag in parent[3]:
+                    self.out.write("[")
+                    parent[2] = tag
+        else:
+            self.out.write("{" + json.dumps(elem.tag) + ": ")
+
+        if index in self.buffered:
+            self.buffer_depth = 1
+        else:
+            self.stack.append([elem, 0, None, self.repeats.get(index, ()), False])
+
+    def end(self, elem):
+        """Write or close an element's value and free it."""
+        if self.buffer_depth:
+            self.buffer_depth -= 1
+            if self.buffer_depth:
+                return
+            self.out.write(json.dumps(element_to_dict(elem)))
+        else:
+            frame = self.stack.pop()
+            if frame[4]:
+                if frame[2] is not None:
+                    self.out.write("]")
+                self.out.write("}")
+            else:
+                self.out.write(json.dumps(_element_value(elem, None)))
+
+        if not self.stack:
+            self.out.write("}")
+        _release(elem, self.stack[-1][0] if self.stack else None)
+
+def xml_to_json_stream(file_path, out):
+    """
+    Convert an XML file to raw JSON written incrementally to a text file object.
+
+    Writes the same text as json.dump(xml_to_json(file_path)[0], out) without
+    building the whole dictionary: the file is streamed twice, once to learn
+    which tags repeat and once to write. Only subtrees whose children cannot be
+    written in order are held in memory. On error, `out` may hold partial output.
+    """
+    try:
+        repeats, buffered = _scan_structure(file_path)
+        writer = _StreamWriter(out, repeats, buffered)
+        for event, elem in xml_backend.iterparse(file_path, events=("start", "end")):
+            if event == "start":
+                writer.start(elem)
+            else:
+                writer.end(elem)
+
+        return "XML streamed to raw JSON successfully."
+
+    except Exception as e:
         raise ValueError(f"Error parsing XML file: {e}")
@@ -1,60 +1,125 @@
+import copy
 import os
 import sys
-import tkinter as tk
+from threading import Lock
 from core.case_builder import CaseBuilder
-from core.db import get_db_connection, check_name_exists, get_metadata
+from core.cache import TTLCache
+from core.db import get_db_connection, find_document
 from core.comparator import compare_metadata
-from core.config import TOLERANCE_LEVEL
+from core.config import (
+    TOLERANCE_LEVEL, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, HEADLESS, RESULTS_FILE
+)
 
 _app_instance = None
+_app_lock = Lock()
 
 class MainApplication:
-    def __init__(self):
+    def __init__(self, headless=HEADLESS, results_file=RESULTS_FILE):
+        self.headless = headless
+        self.results_file = results_file
+        self.root = None  # Tk window, created on the first display_results()
+        self.exported_lines = 0  # Case lines already written by export_results()
+        self.text_widget = None
         self.case_builder = CaseBuilder()
         self.case_builder.append_line("Application started")
         self.db, db_result = get_db_connection()
         self.case_builder.append_line(db_result)
-        
-        self.root = tk.Tk()
-        self.root.title("SAM Registry File Tester")
-        self.text_widget = tk.Text(self.root, wrap=tk.WORD, height=20, width=80)
-        self.text_widget.pack(padx=10, pady=10)
+        self.reference_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
     
     def test_file(self, filename, method_name, extracted_data):
+        # Lines are collected per call and appended as one block, so files
+        # tested concurrently from several threads do not interleave
+        lines = []
         try:
-            exists, result = check_name_exists(self.db, method_name, filename)
-            self.case_builder.append_line(result)
-            if not exists:
-                self.case_builder.append_line(f"No reference data for '{filename}'")
+            reference_metadata = self.get_reference_metadata(filename, method_name, lines)
+            if reference_metadata is None:
+                lines.append(f"No reference data for '{filename}'")
                 return False
                 
-            reference_metadata, result = get_metadata(self.db, method_name, filename)
-            self.case_builder.append_line(result)
             comparison, result = compare_metadata(reference_metadata, extracted_data, TOLERANCE_LEVEL * 100)
-            self.case_builder.append_line(result)
+            lines.append(result)
             
             all_passed = all(v.get("passed", False) for v in comparison.values())
             for key, value in comparison.items():
                 status = "PASSED" if value.get("passed", False) else "FAILED"
                 percent_diff = value.get('percent_diff')
                 diff = f"{percent_diff:.2f}%" if percent_diff is not None else "N/A"
-                self.case_builder.append_line(f"{key}: {status} (Diff: {diff})")
+                lines.append(f"{key}: {status} (Diff: {diff})")
             
-            self.case_builder.append_line(f"Overall: {'PASSED' if all_passed else 'FAILED'}")
+            lines.append(f"Overall: {'PASSED' if all_passed else 'FAILED'}")
             return all_passed
             
         except Exception as e:
-            self.case_builder.append_line(f"Error: {str(e)}")
+            lines.append(f"Error: {str(e)}")
             return False
+        finally:
+            self.case_builder.append_lines(lines)
+    
+    def get_reference_metadata(self, filename, method_name, lines):
+        """Return a copy of the reference metadata from the cache or a single DB lookup; None if missing."""
+        key = (method_name, filename)
+        cached, reference_metadata = self.reference_cache.get(key)
+        if cached:
+            lines.append(f"Metadata for '{filename}' retrieved from cache.")
+            return copy.deepcopy(reference_metadata)
+
+        reference_metadata, result = find_document(self.db, method_name, filename)
+        lines.append(result)
+        if reference_metadata is None:
+            # Missing references are not cached so newly added ones are seen immediately
+            return None
+        self.reference_cache.put(key, reference_metadata)
+        # Callers get their own copy so they cannot change the cached entry
+        return copy.deepcopy(reference_metadata)
+    
+    def create_window(self):
+        """Create the Tk window on first use; tkinter is only imported here."""
+        if self.root is None:
+            import tkinter as tk
+            self.root = tk.Tk()
+            self.root.title("SAM Registry File Tester")
+            self.text_widget = tk.Text(self.root, wrap=tk.WORD, height=20, width=80)
+            self.text_widget.pack(padx=10, pady=10)
+        return self.root
+    
+    def export_results(self):
+        """
+        Write the results to the results file, or stdout when none is set. Lines
+        exported by an earlier call are not written again; the cache counters are
+        written after the new lines on every call.
+        """
+        footer = [self.reference_cache.stats()]
+        if self.results_file:
+            with open(self.results_file, "a", encoding="utf-8") as stream:
+                self.exported_lines = self.case_builder.export_to_stream(stream, self.exported_lines, footer)
+        else:
+            self.exported_lines = self.case_builder.export_to_stream(sys.stdout, self.exported_lines, footer)
     
     def display_results(self):
-        self.case_builder.export_to_tkinter(self.text_widget)
+        if self.headless:
+            self.export_results()
+            return
+
+        try:
+            self.create_window()
+        except Exception as e:  # No display available (tkinter.TclError) or no tkinter
+            # Stay headless from now on rather than retrying the window on every call
+            self.headless = True
+            self.case_builder.append_line(f"GUI unavailable ({str(e)}); writing results headless")
+            self.export_results()
+            return
+        self.case_builder.export_to_tkinter(self.text_widget, [self.reference_cache.stats()])
         self.root.mainloop()
 
-def get_app_instance():
+def get_app_instance(headless=None, results_file=None):
+    """Return the shared application, creating it with the given output settings."""
     global _app_instance
-    if _app_instance is None:
-        _app_instance = MainApplication()
+    with _app_lock:
+        if _app_instance is None:
+            _app_instance = MainApplication(
+                HEADLESS if headless is None else headless,
+                RESULTS_FILE if results_file is None else results_file,
+            )
     return _app_instance
 
 def test_file(filename, method_name, extracted_data):
@@ -67,7 +132,14 @@ def display_results():
     app = get_app_instance()
     app.display_results()
 
-__all__ = ['test_file', 'display_results', 'MainApplication', 'get_app_instance']
+def set_headless(results_file=None):
+    """Send results to stdout (or results_file) instead of the Tk window."""
+    app = get_app_instance(headless=True, results_file=results_file)
+    app.headless = True
+    if results_file is not None:
+        app.results_file = results_file
+
+__all__ = ['test_file', 'display_results', 'set_headless', 'MainApplication', 'get_app_instance']
 
 if __name__ == "__main__":
     print("SAM Registry Testing Library")
@@ -0,0 +1,104 @@
+"""
+Tests for the reference metadata cache.
+"""
+
+import io
+import os
+import sys
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from core.cache import TTLCache  # noqa: E402
+
+METADATA = {"result": {"WIDTH": 10.0}}
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test cases for TTLCache."""
+
+    def test_entries_expire(self):
+        """Test that an entry is served until its TTL passes."""
+        now = [0.0]
+        cache = TTLCache(10, 5, clock=lambda: now[0])
+        cache.put("a", 1)
+
+        now[0] = 4.9
+        self.assertEqual(cache.get("a"), (True, 1))
+        now[0] = 5.0
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_least_recently_used_evicted(self):
+        """Test that the cache holds max_entries, dropping the least recently used."""
+        cache = TTLCache(2, 60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(cache.get("c"), (True, 3))
+
+    def test_zero_entries_disables(self):
+        """Test that max_entries=0 stores nothing."""
+        cache = TTLCache(0, 60)
+        cache.put("a", 1)
+
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertEqual(len(cache), 0)
+
+
+class TestReferenceCache(unittest.TestCase):
+    """Test cases for the cache in MainApplication."""
+
+    def setUp(self):
+        """Create a headless application on a mocked collection."""
+        self.collection = MagicMock()
+        self.collection.find_one.side_effect = lambda query, projection: (
+            {"metadata": {"result": {"WIDTH": 10.0}}} if query["name"] == "a.xml" else None
+        )
+        with patch.object(main, "get_db_connection", return_value=({"lq": self.collection}, "ok")):
+            self.app = main.MainApplication(headless=True)
+
+    def test_repeated_tests_hit_cache(self):
+        """Test that a second test of the same file does not query the database."""
+        self.assertTrue(self.app.test_file("a.xml", "lq", METADATA))
+        self.assertTrue(self.app.test_file("a.xml", "lq", METADATA))
+
+        self.assertEqual(self.collection.find_one.call_count, 1)
+        self.assertIn("Metadata for 'a.xml' retrieved from cache.", self.app.case_builder.case_lines)
+
+    def test_missing_references_not_cached(self):
+        """Test that every test of a missing reference queries the database again."""
+        self.assertFalse(self.app.test_file("b.xml", "lq", METADATA))
+        self.assertFalse(self.app.test_file("b.xml", "lq", METADATA))
+
+        self.assertEqual(self.collection.find_one.call_count, 2)
+        self.assertEqual(len(self.app.reference_cache), 0)
+
+    def test_callers_get_copies(self):
+        """Test that changing returned metadata does not change the cached entry."""
+        self.app.get_reference_metadata("a.xml", "lq", [])["result"]["WIDTH"] = 0.0
+        cached = self.app.get_reference_metadata("a.xml", "lq", [])
+
+        self.assertEqual(cached["result"]["WIDTH"], 10.0)
+
+    def test_stats_reported(self):
+        """Test that display_results prints the hit and miss counters."""
+        for filename in ("a.xml", "a.xml", "b.xml"):
+            self.app.test_file(filename, "lq", METADATA)
+
+        with patch.object(main.sys, "stdout", io.StringIO()) as stdout:
+            self.app.display_results()
+
+        self.assertIn("Reference cache: 1 hits, 2 misses (33.3% hit rate)", stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Tests for comparing reference metadata with extracted output strings.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.comparator import compare_metadata, compare_metadata_batch, scan_tags  # noqa: E402
+
+REFERENCE = {"result": {"WIDTH": 10.0, "ANGLE": 45.0, "START": 0}}
+
+OUTPUT = """<OUTPUT>
+<RESULT><START>0</START><END>10</END>
+<WIDTH> 10.5 </WIDTH><ANGLE>45.0</ANGLE></RESULT>
+<EXTRA><WIDTH>99</WIDTH></EXTRA>
+</OUTPUT>"""
+
+
+class TestCompareMetadata(unittest.TestCase):
+    """Test cases for compare_metadata with string input."""
+
+    def test_scan_tags_keeps_first_occurrence(self):
+        """Test that one scan maps leaf tags to their first value only."""
+        tags = scan_tags(OUTPUT)
+
+        self.assertEqual(tags["WIDTH"], " 10.5 ")
+        self.assertEqual(tags["END"], "10")
+        self.assertNotIn("RESULT", tags)  # Has nested tags, not a leaf
+        self.assertEqual(scan_tags(OUTPUT, ["WIDTH", "HEIGHT"]), {"WIDTH": " 10.5 "})
+
+    def test_string_input(self):
+        """Test tolerance checks and missing keys on an extracted string."""
+        reference = {"result": dict(REFERENCE["result"], HEIGHT_MEAN=1.0)}
+        comparison, _ = compare_metadata(reference, OUTPUT, 10)
+
+        self.assertAlmostEqual(comparison["WIDTH"]["percent_diff"], 5.0)
+        self.assertTrue(comparison["WIDTH"]["passed"])
+        self.assertEqual(comparison["START"]["percent_diff"], 0.0)
+        self.assertEqual(comparison["HEIGHT_MEAN"]["message"], "Missing value")
+
+    def test_batch_matches_single(self):
+        """Test that the batch variant gives the per-item results."""
+        items = [OUTPUT, OUTPUT.replace("45.0", "50.0"), {"result": {"WIDTH": 10.0}}]
+        comparisons, _ = compare_metadata_batch(REFERENCE, items, 5)
+
+        self.assertEqual(comparisons, [compare_metadata(REFERENCE, item, 5)[0] for item in items])
+        self.assertFalse(comparisons[1]["ANGLE"]["passed"])
+
+
+if __name__ == '__main__':
+    unittest.main()
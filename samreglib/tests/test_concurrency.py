@@ -0,0 +1,149 @@
+"""
+Tests for calling the samreglib core and application from many threads at once.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from core import comparator, db, extractor, ingest, xml_to_json  # noqa: E402
+from core.comparator import compare_metadata  # noqa: E402
+from core.db import find_document  # noqa: E402
+from core.ingest import ingest_xml  # noqa: E402
+
+THREADS = 8
+CALLS = 40
+
+RESULT_TAGS = ["START", "END", "WIDTH", "HEIGHT_MIN", "HEIGHT_MAX", "HEIGHT_MEAN", "ANGLE"]
+
+
+def _output(width):
+    """Build an extracted OUTPUT string whose tags all hold `width`."""
+    tags = "".join(f"<{tag}>{width}</{tag}>" for tag in RESULT_TAGS)
+    return f"<OUTPUT><SLOPE><PosY>1</PosY><Sensor>2</Sensor></SLOPE><RESULT>{tags}</RESULT></OUTPUT>"
+
+
+def _run_concurrently(function, items):
+    """Call function on every item from THREADS threads started together."""
+    barrier = threading.Barrier(THREADS)
+
+    def call(item):
+        if item < THREADS:
+            barrier.wait()  # Start the first call of every thread at the same time
+        return function(item)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        return list(pool.map(call, items))
+
+
+class TestConcurrency(unittest.TestCase):
+    """Test cases for thread safety of the samreglib core."""
+
+    def test_no_module_result_state(self):
+        """Test that status messages are not kept in module globals."""
+        for module in (db, extractor, comparator, xml_to_json, ingest):
+            with self.subTest(module=module.__name__):
+                for name in ("result", "_result_message", "set_result", "get_result"):
+                    self.assertFalse(hasattr(module, name))
+
+    def test_concurrent_comparisons(self):
+        """Test that each caller gets its own comparison and message."""
+        def compare(i):
+            reference = {"result": {tag: float(i + 1) for tag in RESULT_TAGS}}
+            return compare_metadata(reference, _output(i + 1), 0)
+
+        for comparison, message in _run_concurrently(compare, range(THREADS * CALLS)):
+            self.assertTrue(all(value["passed"] for value in comparison.values()))
+            self.assertEqual(message, "Comparison completed successfully.")
+
+    def test_concurrent_ingestion(self):
+        """Test that parallel parses return their own file's data or error."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        paths = []
+        for i in range(THREADS * 4):
+            path = os.path.join(directory.name, f"file{i}.xml")
+            with open(path, "w") as f:
+                # Every fourth file has no Data section and must fail on its own
+                f.write("<Root/>" if i % 4 == 3 else f"<Root><Data>{escape(_output(i))}</Data></Root>")
+            paths.append(path)
+
+        def parse(i):
+            try:
+                return ingest_xml(paths[i])
+            except ValueError as e:
+                return e
+
+        for i, outcome in enumerate(_run_concurrently(parse, range(len(paths)))):
+            if i % 4 == 3:
+                self.assertEqual(str(outcome), "Missing or empty <Data> element")
+                continue
+            metadata, raw_json, message = outcome
+            self.assertEqual(metadata["result"]["WIDTH"], float(i))
+            self.assertIn("Data", raw_json["Root"])
+            self.assertIn("parsed once", message)
+
+    def test_concurrent_lookups(self):
+        """Test that each lookup's message names its own document."""
+        collection = MagicMock()
+        collection.find_one.side_effect = lambda query, projection: (
+            None if query["name"].startswith("missing") else {"metadata": {"name": query["name"]}}
+        )
+        database = {"lq": collection}
+
+        def lookup(i):
+            name = f"missing{i}.xml" if i % 2 else f"file{i}.xml"
+            return name, find_document(database, "lq", name)
+
+        for name, (metadata, message) in _run_concurrently(lookup, range(THREADS * CALLS)):
+            self.assertIn(f"'{name}'", message)
+            self.assertEqual(metadata, None if name.startswith("missing") else {"name": name})
+
+    def test_concurrent_test_file(self):
+        """Test that each file's case lines stay together when tested from threads."""
+        collection = MagicMock()
+        collection.find_one.side_effect = lambda query, projection: {
+            "metadata": {"result": {"WIDTH": float(query["name"][4:-4])}}
+        }
+        with patch.object(main, "get_db_connection", return_value=({"lq": collection}, "ok")):
+            app = main.MainApplication(headless=True)
+
+        passed = _run_concurrently(
+            lambda i: app.test_file(f"file{i}.xml", "lq", _output(i)), range(THREADS * CALLS)
+        )
+
+        self.assertTrue(all(passed))
+        lines = app.case_builder.case_lines[2:]  # After the startup lines
+        self.assertEqual(len(lines), THREADS * CALLS * 4)
+        for start in range(0, len(lines), 4):
+            block = lines[start:start + 4]
+            self.assertRegex(block[0], r"Document 'file(\d+)\.xml' exists")
+            self.assertEqual(block[1:], [
+                "Comparison completed successfully.", "WIDTH: PASSED (Diff: 0.00%)", "Overall: PASSED"
+            ])
+
+    def test_shared_instance_created_once(self):
+        """Test that concurrent first calls share one application instance."""
+        def slow_application(*args):
+            time.sleep(0.01)  # Widen the window for a double initialisation
+            return object()
+
+        with patch.object(main, "_app_instance", None), \
+                patch.object(main, "MainApplication", side_effect=slow_application) as application:
+            instances = _run_concurrently(lambda i: main.get_app_instance(), range(THREADS))
+
+        application.assert_called_once()
+        self.assertEqual(len({id(instance) for instance in instances}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for headless result output.
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+SAMREGLIB = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SAMREGLIB)
+
+import main  # noqa: E402
+from core.case_builder import CaseBuilder  # noqa: E402
+
+METADATA = {"result": {"WIDTH": 10.0}}
+
+
+class TestHeadless(unittest.TestCase):
+    """Test cases for headless mode and the results sinks."""
+
+    def _app(self, **kwargs):
+        collection = MagicMock()
+        collection.find_one.return_value = {"metadata": METADATA}
+        with patch.object(main, "get_db_connection", return_value=({"lq": collection}, "ok")):
+            return main.MainApplication(**kwargs)
+
+    def test_results_file_written_once(self):
+        """Test that repeated displays append only the new lines to the results file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.txt")
+            app = self._app(headless=True, results_file=path)
+
+            app.test_file("a.xml", "lq", METADATA)
+            app.display_results()
+            app.test_file("b.xml", "lq", METADATA)
+            app.display_results()
+
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+
+        self.assertEqual(text.count("Application started"), 1)
+        self.assertEqual(text.count("Overall: PASSED"), 2)
+        self.assertEqual(text.count("Reference cache:"), 2)
+        self.assertTrue(text.endswith("Reference cache: 0 hits, 2 misses (0.0% hit rate)\n"))
+
+    def test_stdout_without_results_file(self):
+        """Test that headless output goes to stdout when no file is set."""
+        app = self._app(headless=True, results_file=None)
+        app.test_file("a.xml", "lq", METADATA)
+
+        with patch.object(main.sys, "stdout", io.StringIO()) as stdout:
+            app.display_results()
+
+        self.assertIn("Overall: PASSED", stdout.getvalue())
+        self.assertIsNone(app.root)
+
+    def test_no_display_falls_back(self):
+        """Test that a failing window falls back to headless output once."""
+        app = self._app(headless=False, results_file=None)
+        app.test_file("a.xml", "lq", METADATA)
+
+        with patch.object(app, "create_window", side_effect=RuntimeError("no display")) as create, \
+                patch.object(main.sys, "stdout", io.StringIO()) as stdout:
+            app.display_results()
+            app.display_results()
+
+        create.assert_called_once()
+        self.assertTrue(app.headless)
+        self.assertEqual(stdout.getvalue().count("GUI unavailable (no display)"), 1)
+        self.assertEqual(stdout.getvalue().count("Overall: PASSED"), 1)
+
+    def test_export_to_stream_from_index(self):
+        """Test that export_to_stream starts at the given line and returns the next index."""
+        builder = CaseBuilder()
+        for line in ("one", "two", "three"):
+            builder.append_line(line)
+        stream = io.StringIO()
+
+        self.assertEqual(builder.export_to_stream(stream, 1, ["footer"]), 3)
+        self.assertEqual(stream.getvalue(), "two\n\nthree\n\nfooter\n")
+
+    def test_tkinter_not_imported(self):
+        """Test that a headless run never imports tkinter."""
+        statement = (
+            "import sys\n"
+            "from unittest.mock import patch, MagicMock\n"
+            "import main\n"
+            "with patch.object(main, 'get_db_connection', return_value=(MagicMock(), 'ok')):\n"
+            "    main.set_headless()\n"
+            "    main.test_file('a.xml', 'lq', {})\n"
+            "    main.display_results()\n"
+            "print('tkinter' in sys.modules)\n"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", statement], cwd=SAMREGLIB, capture_output=True, text=True, check=True
+        )
+
+        self.assertEqual(completed.stdout.split()[-1], "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
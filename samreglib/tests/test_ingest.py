@@ -0,0 +1,58 @@
+"""
+Tests for single-parse ingestion.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import ingest, xml_backend  # noqa: E402
+from core.extractor import extract_metadata_from_xml  # noqa: E402
+from core.ingest import ingest_xml  # noqa: E402
+from core.xml_to_json import xml_to_json  # noqa: E402
+
+OUTPUT = (
+    "<OUTPUT><SLOPE><PosY>1</PosY><Sensor>2.5</Sensor></SLOPE><SLOPE><PosY>2</PosY><Sensor>3</Sensor></SLOPE>"
+    "<RESULT><START>0</START><END>10</END><WIDTH>10.0</WIDTH><HEIGHT_MIN>1</HEIGHT_MIN>"
+    "<HEIGHT_MAX>2</HEIGHT_MAX><HEIGHT_MEAN>1.5</HEIGHT_MEAN><ANGLE>45</ANGLE></RESULT></OUTPUT>"
+)
+
+
+class TestIngest(unittest.TestCase):
+    """Test cases for ingest_xml."""
+
+    def _write(self, text):
+        with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False, encoding="utf-8") as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_matches_two_parse_path(self):
+        """Test that one parse gives what extract_metadata_from_xml and xml_to_json give."""
+        path = self._write(
+            "<Root id='1'><Header><Param>a</Param><Param>b</Param></Header>"
+            f"<!-- run --><Data>{escape(OUTPUT)}</Data></Root>"
+        )
+
+        with patch.object(ingest.xml_backend, "parse", wraps=xml_backend.parse) as parse:
+            metadata, raw_json, _ = ingest_xml(path)
+
+        parse.assert_called_once()
+        self.assertEqual(metadata, extract_metadata_from_xml(path)[0])
+        self.assertEqual(raw_json, xml_to_json(path)[0])
+
+    def test_errors_raised(self):
+        """Test that malformed XML and a missing Data section raise like extraction does."""
+        with self.assertRaises(xml_backend.ParseError):
+            ingest_xml(self._write("<Root><Data>"))
+        with self.assertRaisesRegex(ValueError, "Missing or empty <Data> element"):
+            ingest_xml(self._write("<Root><Other/></Root>"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for batch ingestion with regadd.
+"""
+
+import io
+import os
+import queue
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from xml.sax.saxutils import escape
+
+from pymongo.errors import BulkWriteError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import regadd  # noqa: E402
+from core.db import store_documents  # noqa: E402
+
+RESULT_TAGS = ["START", "END", "WIDTH", "HEIGHT_MIN", "HEIGHT_MAX", "HEIGHT_MEAN", "ANGLE"]
+
+
+def _document(width):
+    """Build a regadd input file whose RESULT values are all `width`."""
+    tags = "".join(f"<{tag}>{width}</{tag}>" for tag in RESULT_TAGS)
+    output = f"<OUTPUT><SLOPE><PosY>1</PosY><Sensor>2</Sensor></SLOPE><RESULT>{tags}</RESULT></OUTPUT>"
+    return f"<Root><Data>{escape(output)}</Data></Root>"
+
+
+class TestProcessDirectory(unittest.TestCase):
+    """Test cases for the pooled, batched process_directory."""
+
+    def setUp(self):
+        """Create five valid files and a malformed one."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        for i in range(5):
+            (self.directory / f"file{i}.xml").write_text(_document(i))
+        (self.directory / "bad.xml").write_text("<Root><Data>")
+
+        self.collection = MagicMock()
+        self.collection.insert_many.side_effect = lambda documents, ordered: MagicMock(
+            inserted_ids=list(range(len(documents)))
+        )
+
+    def _process(self):
+        with patch.object(regadd, "get_db_connection", return_value=({"lq": self.collection}, "ok")), \
+                patch.object(regadd, "INGEST_BATCH_SIZE", 2), \
+                patch("sys.stdout", io.StringIO()) as stdout:
+            counts = regadd.process_directory(self.directory, "lq", False, workers=2)
+        return counts, stdout.getvalue()
+
+    def test_batch_with_malformed_file(self):
+        """Test that valid files are bulk-inserted and the malformed one is reported."""
+        counts, output = self._process()
+
+        self.assertEqual(counts, (5, 1))
+        self.assertIn("Error: bad.xml:", output)
+        self.assertIn("Batch complete: 5 added, 1 failed", output)
+        self.assertRegex(output, r"files/s, [\d.]+ MB/s\)")
+
+        documents = [doc for call in self.collection.insert_many.call_args_list for doc in call[0][0]]
+        self.assertEqual(self.collection.insert_many.call_count, 3)  # Batches of 2, 2 and 1
+        self.assertEqual(sorted(doc["name"] for doc in documents), [f"file{i}.xml" for i in range(5)])
+        self.assertEqual(documents[0]["metadata"]["result"]["WIDTH"], float(documents[0]["name"][4]))
+
+    def test_partial_bulk_failure_counted(self):
+        """Test that documents rejected by insert_many count as failed."""
+        self.collection.insert_many.side_effect = BulkWriteError(
+            {"nInserted": 1, "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate"}]}
+        )
+
+        counts, output = self._process()
+
+        self.assertEqual(counts, (3, 3))  # One of each batch of 2 stored, plus bad.xml
+        self.assertIn("Error storing documents: 1 of 2 stored.", output)
+
+    def test_store_documents_partial(self):
+        """Test the stored count reported for a partially failed insert_many."""
+        self.collection.insert_many.side_effect = BulkWriteError({"nInserted": 2, "writeErrors": []})
+
+        self.assertEqual(store_documents({"lq": self.collection}, "lq", [{}] * 3)[0], 2)
+
+    def test_writer_stops_at_sentinel(self):
+        """Test that the writer drains queued batches and exits on None."""
+        batches = queue.Queue(maxsize=2)
+        counts = {"added": 0, "failed": 0}
+        writer = threading.Thread(
+            target=regadd.write_batches, args=({"lq": self.collection}, "lq", batches, counts, False)
+        )
+        writer.start()
+        batches.put([{}, {}])
+        batches.put([{}])
+        batches.put(None)
+        writer.join(timeout=5)
+
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(counts, {"added": 3, "failed": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests for the iterative and streaming raw JSON converters.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import xml_backend  # noqa: E402
+from core.xml_to_json import element_to_dict, xml_to_json, xml_to_json_stream  # noqa: E402
+
+DOCUMENTS = {
+    "records": (
+        "<SAM version='1'><HEADER><Version>1.0</Version></HEADER>"
+        + "".join(f"<RECORD id='{i}'><Pos>{i}</Pos><Flag/></RECORD>" for i in range(5))
+        + "<FOOTER> done </FOOTER></SAM>"
+    ),
+    "interleaved": "<r><a>1</a><b>2</b><a>3</a><c><a>x</a><a>y</a></c></r>",
+    "attribute_clash": "<r name='attr'><name>child</name><name>again</name></r>",
+    "mixed": "<r>text<!-- c --><a k='v'/><a>é \"q\"</a>tail<b> </b></r>",
+}
+
+
+def _recursive(elem):
+    """Reference implementation: the original recursive converter."""
+    d = dict(elem.attrib) if elem.attrib else {}
+    children = list(elem)
+    if children:
+        child_dict = {}
+        for child in children:
+            value = _recursive(child)
+            if child.tag in child_dict:
+                previous = child_dict[child.tag]
+                child_dict[child.tag] = previous + [value] if isinstance(previous, list) else [previous, value]
+            else:
+                child_dict[child.tag] = value
+        d.update(child_dict)
+    elif elem.text:
+        d = elem.text.strip()
+    return d
+
+
+class TestXmlToJson(unittest.TestCase):
+    """Test cases for element_to_dict and xml_to_json_stream."""
+
+    def _write(self, text):
+        with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False, encoding="utf-8") as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_matches_recursive_converter(self):
+        """Test that the iterative converter gives the original output."""
+        for name, document in DOCUMENTS.items():
+            with self.subTest(document=name):
+                root = xml_backend.fromstring(document)
+                self.assertEqual(element_to_dict(root), _recursive(root))
+
+    def test_deep_nesting(self):
+        """Test that nesting deeper than the recursion limit converts."""
+        depth = sys.getrecursionlimit() + 100
+        root = xml_backend.fromstring("<a>" * depth + "x" + "</a>" * depth)
+        value = element_to_dict(root)
+        for _ in range(depth - 1):
+            value = value["a"]
+        self.assertEqual(value, "x")
+
+    def test_stream_matches_json_dump(self):
+        """Test that streaming writes exactly what json.dump of the dict writes."""
+        for name, document in DOCUMENTS.items():
+            with self.subTest(document=name):
+                path = self._write(document)
+                out = io.StringIO()
+                xml_to_json_stream(path, out)
+                self.assertEqual(out.getvalue(), json.dumps(xml_to_json(path)[0]))
+
+    def test_stream_malformed(self):
+        """Test that malformed input raises ValueError like xml_to_json."""
+        with self.assertRaises(ValueError):
+            xml_to_json_stream(self._write("<r><a></r>"), io.StringIO())
+
+
+    def test_external_entities_not_loaded(self):
+        """Test that parsing never reads a file named by an external entity."""
+        secret = self._write("secret")
+        path = self._write(f"<!DOCTYPE r [<!ENTITY x SYSTEM 'file://{secret}'>]><r><a>&x;</a></r>")
+
+        with self.assertRaises(xml_backend.ParseError):
+            xml_backend.parse(path)
+        with self.assertRaises(xml_backend.ParseError):
+            list(xml_backend.iterparse(path))
+
+    def test_declared_entities_expanded(self):
+        """Test that entities declared in the document are expanded like ElementTree does."""
+        path = self._write("<!DOCTYPE r [<!ENTITY v 'value'>]><r><a>&v;</a></r>")
+
+        self.assertEqual(xml_to_json(path)[0], {"r": {"a": "value"}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,38 @@
 Samuel Regression Testing Library
 
 A library for regression testing of XML data processing scripts.
+
+Heavy dependencies (pymongo, xml.etree) are imported on first use, so that
+importing the package stays cheap for short-lived tool invocations.
 """
 
-from .db import Database
-from .extractors import XMLExtractor
-from .comparators import OutputComparator
+import importlib
+from contextlib import contextmanager, nullcontext
+
 from .config import TOLERANCE_THRESHOLD
-import os
+
+# Public helpers that are resolved lazily on first attribute access
+_LAZY_ATTRIBUTES = {
+    "Database": ".db",
+    "XMLExtractor": ".extractors",
+    "OutputComparator": ".comparators",
+    "SnapshotDatabase": ".snapshot",
+    "SharedReferenceStore": ".shared",
+    "Tracer": ".tracer",
+    "MemoryTracker": ".memory",
+    "IsolatedExtractor": ".isolation",
+}
+
+
+def __getattr__(name):
+    """Import heavy submodules only when one of their names is accessed."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
 
 
 class RegressionTest:
@@ -17,53 +42,409 @@ class RegressionTest:
     Provides methods for testing, adding reference data, and retrieving results.
     """
 
-    def __init__(self):
-        """Initialize the regression testing framework."""
-        self.db = Database()
-        self.extractor = XMLExtractor()
-        self.comparator = OutputComparator()
+    def __init__(self, database=None, quick=False, quick_budget=None, quick_time_budget=None,
+                 upcoming=None, trace=None, memory=None, isolate=False,
+                 metrics_json=None, metrics_prom=None, quick_history=None):
+        """
+        Initialize the regression testing framework.
+
+        The database, extractor and comparator are created on first use and
+        the connection is only tested when the first file is tested.
+
+        Args:
+            database: Optional reference backend to use instead of the
+                      MongoDB Database, e.g. a SnapshotDatabase for offline runs
+            quick: Only test a deterministic, stratified sample of the
+                   references of each method (see should_test)
+            quick_budget: Files tested per method in quick mode
+            quick_time_budget: Seconds after which quick mode stops testing
+            upcoming: Optional iterable of (filename, method) tuples in the
+                      order they will be tested; see prefetch()
+            trace: Optional Tracer, or path of a Chrome trace file written by
+                   get_results() ("{pid}" is replaced by the process id)
+            memory: Optional MemoryTracker, or a budget in bytes of traced
+                    Python allocations (0 tracks without a budget); peaks
+                    per phase and file are then added to get_results()
+            isolate: Run extract_file() in a worker process with per-file
+                     wall-clock, CPU and memory limits; an IsolatedExtractor
+                     can be given to choose the limits
+            metrics_json: Optional path of a JSON summary of the database
+                          latencies, written by get_results()
+            metrics_prom: Optional path of a Prometheus textfile with the
+                          database latency histograms, written by get_results()
+            quick_history: Path of the file in which quick mode keeps the
+                           outcome of every tested file, so that later quick
+                           checks favour recent failures (default
+                           QUICK_HISTORY_PATH; no history without one)
+        """
+        self._db = database
+        self._extractor = isolate if hasattr(isolate, "extract_output") else None
+        self._isolate = bool(isolate)
+        self._comparator = None
+        self._connection_checked = False
         self._case_builder = self._CaseBuilder()
 
-        # Test database connection on initialization
-        connection_status = self.db.test_connection()
-        if connection_status:
-            self._case_builder.append_message("Database connection successful")
-        else:
-            self._case_builder.append_message("Database connection unsuccessful")
-            self._case_builder.connection_failed = True
+        self.quick = quick
+        self._quick_budget = quick_budget
+        self._quick_time_budget = quick_time_budget
+        self._quick_history = quick_history
+        self._sampler = None
+
+        self._upcoming = upcoming
+        self._prefetcher = None
+
+        if isinstance(trace, str):
+            from .tracer import Tracer
+            trace = Tracer(trace)
+        self.tracer = trace
+
+        if memory is not None and not hasattr(memory, "phase"):
+            from .memory import MemoryTracker
+            memory = MemoryTracker(budget=memory)
+        self.memory = memory
+        self._memory_handled = False
+
+        self._metrics_json = metrics_json
+        self._metrics_prom = metrics_prom
+
+    @property
+    def db(self):
+        """Database handle, created on first access."""
+        if self._db is None:
+            from .db import Database
+            self._db = Database()
+        return self._db
+
+    @property
+    def extractor(self):
+        """XML extractor, created on first access."""
+        if self._extractor is None:
+            if self._isolate:
+                from .isolation import IsolatedExtractor
+                self._extractor = IsolatedExtractor()
+            else:
+                from .extractors import XMLExtractor
+                self._extractor = XMLExtractor()
+        return self._extractor
+
+    @property
+    def comparator(self):
+        """Output comparator, created on first access."""
+        if self._comparator is None:
+            from .comparators import OutputComparator
+            self._comparator = OutputComparator()
+        return self._comparator
+
+    @property
+    def sampler(self):
+        """Quick check sampler, created on first access."""
+        if self._sampler is None:
+            from .sampling import QuickSampler
+            self._sampler = QuickSampler(
+                self.db, budget=self._quick_budget, time_budget=self._quick_time_budget,
+                history_path=self._quick_history,
+            )
+        return self._sampler
 
-    def test_file(self, filename, method, output_data):
+    def _ensure_connection(self):
+        """
+        Test the database connection once, on first use.
+
+        Returns:
+            True if the connection is usable, False otherwise
+        """
+        if not self._connection_checked:
+            self._connection_checked = True
+            with self.span("connect"):
+                connected = self.db.test_connection()
+            if connected:
+                self._case_builder.append_message("Database connection successful")
+            else:
+                self._case_builder.append_message("Database connection unsuccessful")
+                self._case_builder.connection_failed = True
+
+        if self._upcoming is not None and not self._case_builder.connection_failed:
+            from .prefetch import ReferencePrefetcher
+            self._prefetcher = ReferencePrefetcher(self.db, self._upcoming, tracer=self.tracer)
+            self._upcoming = None
+
+        return not self._case_builder.connection_failed
+
+    def span(self, name, **args):
+        """
+        Trace a block of work as a span, when tracing is on.
+
+        Use it to put the caller's own work on the timeline, e.g.
+        `with rt.span("extract", filename=name): output = run_script(name)`.
+
+        Args:
+            name: Span name
+            **args: Details shown with the span
+
+        Returns:
+            Context manager timing the block, and tracking its peak memory
+            when memory tracking is on (does nothing without either)
+        """
+        if self.memory is not None:
+            return self._memory_span(name, args)
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.span(name, **args)
+
+    @contextmanager
+    def _memory_span(self, name, args):
+        """Track the peak memory of a span, and trace it when tracing is on."""
+        with self.memory.phase(name, **args):
+            if self.tracer is None:
+                yield
+            else:
+                with self.tracer.span(name, **args):
+                    yield
+
+    def _check_memory_budget(self):
+        """
+        React once to an exceeded memory budget.
+
+        Returns:
+            False if testing has to stop, True otherwise
+        """
+        if self.memory is None or not self.memory.exceeded:
+            return True
+
+        if not self._memory_handled:
+            self._memory_handled = True
+            from .memory import ACTION_STREAM, format_bytes
+
+            budget = format_bytes(self.memory.budget)
+            if self.memory.action == ACTION_STREAM:
+                # Drop buffered references and keep results on disk from now on
+                if self._prefetcher is not None:
+                    self._prefetcher.stop()
+                    self._prefetcher = None
+                self._upcoming = None
+                self._case_builder.append_message(
+                    f"Memory budget of {budget} exceeded; continuing without prefetching "
+                    "and with results spooled to disk"
+                )
+                self._case_builder.spool()
+            else:
+                self._case_builder.append_message(
+                    f"Memory budget of {budget} exceeded; remaining files were not tested"
+                )
+                self._case_builder.memory_exceeded = True
+
+        return not self._case_builder.memory_exceeded
+
+    def prefetch(self, upcoming, method=None):
+        """
+        Hint the files that will be tested next, in order.
+
+        References are then fetched in batches on a background thread, a
+        window ahead of the test_file calls. Calls for files outside the
+        hint still work and fetch their reference directly.
+
+        Args:
+            upcoming: Iterable of filenames (with method) or of
+                      (filename, method) tuples; may be a lazy iterator
+            method: Method name of all the filenames, if they share one
+
+        Returns:
+            Self (for method chaining)
+        """
+        if method is not None:
+            upcoming = ((filename, method) for filename in upcoming)
+
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+        self._upcoming = upcoming
+        return self
+
+    def _get_reference_data(self, filename, method, output_data):
+        """
+        Get reference data, from the prefetch buffer when possible.
+
+        Outside the prefetch buffer, only the fingerprint stored with the
+        reference is fetched first; the full reference is fetched only when
+        the fingerprint differs from that of the output, or when the output
+        would not pass compared with itself (e.g. a RESULT value of None or
+        NaN), so that an identical output fails wherever a comparison fails.
+
+        Returns:
+            Tuple of (reference_data, identical). reference_data is None if
+            no reference exists or the output is identical to it.
+        """
+        if self._prefetcher is not None:
+            from .prefetch import MISSING
+
+            hit, reference_data = self._prefetcher.get(filename, method)
+            if hit:
+                return (None if reference_data is MISSING else reference_data), False
+
+        if hasattr(self.db, "get_reference_fingerprint"):
+            from .comparators import output_fingerprint
+
+            try:
+                fingerprint = output_fingerprint(output_data)
+            except (TypeError, ValueError):
+                fingerprint = None  # Not JSON serializable; compare in full
+
+            if fingerprint is not None:
+                exists, reference_fingerprint = self.db.get_reference_fingerprint(filename, method)
+                if not exists:
+                    return None, False
+                if reference_fingerprint == fingerprint and self.comparator.compare(
+                    output_data, output_data, TOLERANCE_THRESHOLD
+                )["overall_passed"]:
+                    return None, True
+
+        return self.db.get_reference_data(filename, method), False
+
+    def should_test(self, filename, method):
+        """
+        Check whether a file will be tested.
+
+        Always True unless quick mode is on. In quick mode, call this before
+        running the script under test so that outputs are only produced for
+        sampled files.
+
+        Args:
+            filename: Name of the input file
+            method: Method name (e.g., "lq")
+
+        Returns:
+            True if test_file will compare this file
+        """
+        if not self.quick:
+            return True
+        if not self._ensure_connection():
+            return False
+        return self.sampler.should_test(filename, method)
+
+    def extract_file(self, filename, method, xml_data):
+        """
+        Extract the output data of an XML file produced by the script under test.
+
+        A file that cannot be extracted, or exceeds a limit of isolated
+        extraction, is recorded as an ERROR with the reason, so that the
+        run can continue with the next file.
+
+        Args:
+            filename: Name of the input file
+            method: Method name (e.g., "lq")
+            xml_data: XML data as string
+
+        Returns:
+            Extracted output data, or None if extraction failed
+        """
+        try:
+            with self.span("extract", filename=filename, method=method):
+                return self.extractor.extract_output(xml_data)
+        except Exception as e:
+            self._case_builder.append_error(filename, method, getattr(e, "reason", str(e)))
+            return None
+
+    def test_file(self, filename, method, output_data, runtime=None, peak_memory=None):
         """
         Test a single file against reference data.
 
+        When runtime or peak memory are given, they are checked against the
+        rolling baseline stored with the reference and then added to it.
+
         Args:
             filename: Name of the input file
             method: Method name (e.g., "lq")
             output_data: Output data from the script to compare
+            runtime: Optional runtime in seconds of the code that produced
+                     output_data
+            peak_memory: Optional peak memory in bytes of that code
 
         Returns:
             Self (for method chaining)
         """
-        # Skip if connection failed
-        if self._case_builder.connection_failed:
+        # Skip if connection failed or the memory budget stopped the run
+        if not self._ensure_connection() or not self._check_memory_budget():
             return self
 
-        # Check if reference data exists in database
-        reference_data = self.db.get_reference_data(filename, method)
+        # In quick mode, skip files outside the sample
+        if self.quick and not self.sampler.should_test(filename, method):
+            return self
 
-        if reference_data is None:
-            self._case_builder.append_message(
-                f"Warning: No reference data found for file '{filename}' with method '{method}'"
-            )
-            self._case_builder.missing_references.append((filename, method))
+        with self.span("file", filename=filename, method=method):
+            found = self._test_file(filename, method, output_data)
+
+            if found and (runtime is not None or peak_memory is not None):
+                with self.span("performance", filename=filename, method=method):
+                    self._check_performance(
+                        filename, method, {"runtime": runtime, "peak_memory": peak_memory}
+                    )
+
+        self._check_memory_budget()
+        return self
+
+    def _test_file(self, filename, method, output_data):
+        """
+        Look up, compare and report a single file.
+
+        Returns:
+            True if a reference was found, False otherwise
+        """
+        # Check if reference data exists in database
+        with self.span("lookup", filename=filename, method=method):
+            reference_data, identical = self._get_reference_data(filename, method, output_data)
+
+        if identical:
+            with self.span("report", filename=filename, method=method):
+                self._case_builder.append_exact_match(filename, method)
+
+            if self.quick:
+                self.sampler.record(filename, method, True)
+        elif reference_data is None:
+            with self.span("report", filename=filename, method=method):
+                self._case_builder.append_message(
+                    f"Warning: No reference data found for file '{filename}' with method '{method}'"
+                )
+                self._case_builder.missing_references.append((filename, method))
+            return False
         else:
             # Compare output with reference
-            comparison_results = self.comparator.compare(
-                output_data, reference_data, TOLERANCE_THRESHOLD
-            )
-            self._case_builder.append_results(filename, method, comparison_results)
+            with self.span("compare", filename=filename, method=method):
+                comparison_results = self.comparator.compare(
+                    output_data, reference_data, TOLERANCE_THRESHOLD
+                )
+            with self.span("report", filename=filename, method=method):
+                self._case_builder.append_results(filename, method, comparison_results)
 
-        return self
+            if self.quick:
+                self.sampler.record(filename, method, comparison_results['overall_passed'])
+
+        return True
+
+    def _check_performance(self, filename, method, measurements):
+        """
+        Check measurements against the stored baseline and record them.
+
+        Measurements flagged as regressions are not added to the baseline,
+        so that a slowdown keeps failing until it is fixed.
+
+        Args:
+            filename: Name of the input file
+            method: Method name (e.g., "lq")
+            measurements: Dictionary mapping metric name to the new value
+        """
+        # Backends without a performance baseline (e.g. snapshots) skip the check
+        if not hasattr(self.db, "get_performance_baseline"):
+            return
+
+        from .performance import check_performance
+
+        checks = check_performance(self.db.get_performance_baseline(filename, method), measurements)
+        self._case_builder.append_performance(filename, method, checks)
+
+        if hasattr(self.db, "record_performance"):
+            self.db.record_performance(filename, method, {
+                name: check["value"] for name, check in checks.items() if not check["regressed"]
+            })
 
     # No add_file method - this functionality is only available through the CLI
 
@@ -71,19 +452,89 @@ class RegressionTest:
         """
         Get the complete case builder results as a string.
 
+        When tracing to a path, the trace file is written as well, and so
+        are the database latency files given as metrics_json and metrics_prom.
+
         Returns:
             String representation of all results
         """
+        with self.span("results"):
+            result = self._build_results()
+
+        if self.tracer is not None and self.tracer.path:
+            self.tracer.save()
+
+        # Backends without latency metrics (e.g. a SnapshotDatabase) write nothing
+        metrics = getattr(self._db, "metrics", None)
+        if metrics is not None:
+            if self._metrics_json:
+                metrics.write_json(self._metrics_json)
+            if self._metrics_prom:
+                metrics.write_prometheus(self._metrics_prom)
+        return result
+
+    def _build_results(self):
+        """Build the results string of get_results()."""
         result = self._case_builder.get_results()
 
+        # Add the extrapolated quick check summary
+        if self.quick and self._sampler is not None and not self._case_builder.connection_failed:
+            self._sampler.save()
+            result += "\n\n" + "\n".join(self._sampler.summary())
+
         # Add message about adding missing references if needed
         if self._case_builder.missing_references and not self._case_builder.connection_failed:
             result += "\n\nSome files were not found in the reference database. "
             result += "You can add them using the CLI tool:\n"
             result += "python -m samuel_regression_lib.cli add-reference /path/to/file method_name"
 
+        # Add the memory report
+        if self.memory is not None and not self._case_builder.connection_failed:
+            result += "\n\n" + "\n".join(self.memory.summary())
+
+        # Add the files that could not be tested
+        if self._case_builder.errors and not self._case_builder.connection_failed:
+            result += f"\n\n{len(self._case_builder.errors)} file(s) could not be tested:\n"
+            result += "\n".join(
+                f"  {filename} ({method}): {reason}"
+                for filename, method, reason in self._case_builder.errors
+            )
+
+        # Add the performance regressions
+        if self._case_builder.performance_regressions and not self._case_builder.connection_failed:
+            result += "\n\nPerformance regressions detected:\n"
+            result += "\n".join(
+                f"  {filename} ({method}): {', '.join(names)}"
+                for filename, method, names in self._case_builder.performance_regressions
+            )
+
         return result
 
+    def close(self):
+        """
+        Release the resources of the run: the database client, the isolated
+        extraction worker, the reference prefetching thread and allocation
+        tracing of the memory tracker.
+
+        Results stay available; the client and the worker are started again
+        if the run continues afterwards.
+        """
+        if self._db is not None and hasattr(self._db, "close"):
+            self._db.close()
+        if self._extractor is not None and hasattr(self._extractor, "close"):
+            self._extractor.close()
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+        if self.memory is not None:
+            self.memory.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def clear_results(self):
         """
         Clear all test results to start fresh.
@@ -96,6 +547,9 @@ class RegressionTest:
         self._case_builder = self._CaseBuilder()
         self._case_builder.connection_failed = connection_failed
 
+        if not self._connection_checked:
+            return self
+
         if connection_failed:
             self._case_builder.append_message("Database connection unsuccessful")
         else:
@@ -113,10 +567,50 @@ class RegressionTest:
             self.results = []
             self.connection_failed = False
             self.missing_references = []
+            self.performance_regressions = []
+            self.errors = []
+            self.memory_exceeded = False
+            self._spool = None
+
+        def _append(self, result_str):
+            """Keep a result in memory, or write it to the spool file."""
+            if self._spool is not None:
+                self._spool.write("\n" + result_str)
+            else:
+                self.results.append(result_str)
 
         def append_message(self, message):
             """Append a message to the case builder."""
-            self.results.append(message)
+            self._append(message)
+
+        def spool(self):
+            """Write the results to a temporary file from now on, to save memory."""
+            if self._spool is not None:
+                return
+
+            import tempfile
+            self._spool = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+            self._spool.write("\n".join(self.results))
+            self.results.clear()
+
+        def append_exact_match(self, filename, method):
+            """Append a passing result for an output identical to its reference."""
+            result_str = f"\n--- Test Results for '{filename}' with method '{method}' ---\n"
+            result_str += "Output identical to reference (fingerprint match)\n"
+            result_str += "\nOverall Result: PASS\n"
+            result_str += "Average Difference: 0.00%\n"
+
+            self._append(result_str)
+
+        def append_error(self, filename, method, reason):
+            """Append a file that could not be tested to the case builder."""
+            self.errors.append((filename, method, reason))
+
+            result_str = f"\n--- Test Results for '{filename}' with method '{method}' ---\n"
+            result_str += f"Error: {reason}\n"
+            result_str += "\nOverall Result: ERROR\n"
+
+            self._append(result_str)
 
         def append_results(self, filename, method, comparison_results):
             """Append test results to the case builder."""
@@ -137,17 +631,38 @@ class RegressionTest:
             result_str += f"\nOverall Result: {overall_status}\n"
             result_str += f"Average Difference: {comparison_results['average_diff']:.2f}%\n"
 
-            self.results.append(result_str)
+            self._append(result_str)
+
+        def append_performance(self, filename, method, checks):
+            """Append the performance checks of a file to the case builder."""
+            from .performance import format_check
+
+            result_str = f"\n--- Performance Results for '{filename}' with method '{method}' ---\n"
+            for name, check in checks.items():
+                result_str += format_check(name, check) + "\n"
+
+            regressed = [name for name, check in checks.items() if check["regressed"]]
+            if regressed:
+                self.performance_regressions.append((filename, method, regressed))
+            result_str += f"\nPerformance Result: {'FAIL' if regressed else 'PASS'}\n"
+
+            self._append(result_str)
 
         def get_results(self):
             """Get the complete case builder results as a string."""
-            if not self.results:
+            if not self.results and self._spool is None:
                 return "No test results available."
 
             # If connection failed, only return the first message (connection status)
             if self.connection_failed:
                 return self.results[0]
 
+            if self._spool is not None:
+                self._spool.seek(0)
+                result = self._spool.read()
+                self._spool.seek(0, 2)
+                return result
+
             return "\n".join(self.results)
 
 
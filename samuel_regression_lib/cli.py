@@ -8,26 +8,58 @@ import argparse
 import sys
 import os
 import time
+from contextlib import nullcontext
+from datetime import datetime
+from .config import (
+    LIST_PAGE_SIZE, MIGRATION_BATCH_SIZE, MONGO_CONSOLIDATED_COLLECTION,
+    QUICK_FILE_BUDGET, QUICK_SEED, INDEXED_RESULT_FIELDS,
+)
 from .db import Database
+from .metrics import DatabaseMetrics
 from .extractors import XMLExtractor
+from .sampling import QuickSampler
+from .snapshot import SnapshotDatabase, export_snapshot, refresh_snapshot
+from .tracer import Tracer, merge_traces
 
 
-def add_reference_data(filepath, method):
+# Latencies of every Database opened by the command, when they are exported
+_metrics = None
+
+
+def _span(tracer, name, **args):
+    """Trace a block when a tracer is given."""
+    return tracer.span(name, **args) if tracer is not None else nullcontext()
+
+
+def _database():
+    """Open a Database recording into the shared metrics, if any."""
+    return Database(metrics=_metrics)
+
+
+def add_reference_data(filepath, method, tracer=None, isolate=False):
     """
     Add reference data to the database for future testing.
 
     Args:
         filepath: Path to the XML file
         method: Method name (e.g., "lq")
+        tracer: Optional Tracer recording connect, extract and store spans
+        isolate: Extract in a worker process with the EXTRACTION_* limits
 
     Returns:
         Success status message
     """
-    db = Database()
-    extractor = XMLExtractor()
+    db = _database()
+    if isolate:
+        from .isolation import IsolatedExtractor
+        extractor = IsolatedExtractor()
+    else:
+        extractor = XMLExtractor()
 
     # First check database connection
-    if not db.test_connection():
+    with _span(tracer, "connect"):
+        connected = db.test_connection()
+    if not connected:
         return "Error: Database connection failed. Cannot add reference data."
 
     try:
@@ -38,15 +70,20 @@ def add_reference_data(filepath, method):
 
         # Extract and validate output data
         try:
-            output_data = extractor.extract_output(xml_data)
+            with _span(tracer, "extract", filename=filename, method=method):
+                output_data = extractor.extract_output(xml_data)
         except Exception as e:
             return f"Error: Could not extract output data from file: {str(e)}"
+        finally:
+            if isolate:
+                extractor.close()
 
         print(f"Extracted output data from '{filename}'")
 
         # Store in database
         print(f"Storing reference data for '{filename}' with method '{method}'...")
-        success = db.store_reference_data(filename, method, xml_data, output_data)
+        with _span(tracer, "store", filename=filename, method=method):
+            success = db.store_reference_data(filename, method, xml_data, output_data)
 
         if success:
             return f"Successfully added reference data for '{filename}' with method '{method}'"
@@ -58,76 +95,599 @@ def add_reference_data(filepath, method):
         return f"Error: Permission denied when accessing file '{filepath}'"
     except Exception as e:
         return f"Error adding reference data: {str(e)}"
+    finally:
+        db.close()
 
 
-def list_references(method=None):
+def save_reference_input(filename, method, output_path):
     """
-    List all reference data in the database, optionally filtered by method.
+    Write the stored XML input of a reference to a file.
+
+    The input is streamed chunk by chunk, so large inputs are never held
+    in memory as a whole. It is written to a temporary file next to
+    output_path, which only replaces output_path once the whole input was
+    read, so a missing reference or a failed read leaves no partial file.
 
     Args:
-        method: Optional method name to filter by
+        filename: Name of the reference file
+        method: Method name (e.g., "lq")
+        output_path: Path of the file to write
 
     Returns:
-        List of reference data entries
+        Status message
+    """
+    db = _database()
+
+    if not db.test_connection():
+        return "Error: Database connection failed. Cannot read reference input."
+
+    written = 0
+    # Same directory, so os.replace stays atomic; open() keeps the usual mode
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as out:
+            for chunk in db.iter_reference_input(filename, method):
+                out.write(chunk)
+                written += len(chunk)
+        if written:
+            os.replace(temp_path, output_path)
+            temp_path = None
+    except (OSError, ValueError) as e:
+        return f"Error reading reference input: {str(e)}"
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+        db.close()
+
+    if not written:
+        return f"No stored input found for '{filename}' with method '{method}'"
+    return f"Wrote {written} bytes to '{output_path}'"
+
+
+def watch_directory(directory, method, poll_interval=None, isolate=False):
+    """
+    Test the outputs in a directory, then re-test them whenever they change.
+
+    Args:
+        directory: Directory holding the outputs of the script under test
+        method: Method name (e.g., "lq")
+        poll_interval: Poll every this many seconds instead of using inotify
+        isolate: Extract in a worker process with the EXTRACTION_* limits
+
+    Returns:
+        Final summary message
+    """
+    from .watch import watch
+
+    db = _database()
+
+    if not db.test_connection():
+        return "Error: Database connection failed. Cannot watch for changes."
+
+    extractor = None
+    if isolate:
+        from .isolation import IsolatedExtractor
+        extractor = IsolatedExtractor()
+
+    try:
+        session = watch(directory, method, db, extractor, poll_interval)
+        return f"Stopped watching '{directory}': {session.summary()}"
+    except OSError as e:
+        return f"Error watching '{directory}': {str(e)}"
+    finally:
+        if extractor is not None:
+            extractor.close()
+        db.close()
+
+
+def positive_int(value):
     """
-    db = Database()
+    Parse a count or page number that must be at least 1.
+
+    Args:
+        value: String value from the command line
+
+    Returns:
+        The value as an int
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid value '{value}' (expected a positive integer)")
+    return number
+
+
+def parse_since(value):
+    """
+    Parse a --since value given as epoch seconds or an ISO 8601 date/time.
+
+    Args:
+        value: String value from the command line
+
+    Returns:
+        Timestamp in seconds since the epoch
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid --since value '{value}' (expected epoch seconds or ISO date)"
+        )
+
+
+def iter_references(method=None, since=None, page=None, page_size=LIST_PAGE_SIZE):
+    """
+    Stream the reference data listing, one formatted entry at a time.
+
+    Args:
+        method: Optional method name to filter by
+        since: Optional timestamp; only entries updated at or after it
+        page: Optional 1-based page number; lists everything when None
+        page_size: Number of entries per page
+
+    Yields:
+        Formatted chunks of the listing
+    """
+    db = _database()
 
     # Check connection
     if not db.test_connection():
-        return "Error: Database connection failed. Cannot list references."
+        yield "Error: Database connection failed. Cannot list references.\n"
+        return
+
+    skip, limit = 0, None
+    if page is not None:
+        skip, limit = (page - 1) * page_size, page_size
 
     try:
-        references = db.list_reference_data(method)
+        found = False
+        for ref in db.iter_reference_data(method, since=since, skip=skip, limit=limit):
+            if not found:
+                found = True
+                yield "Reference data in database:\n----------------------------\n"
 
-        if not references:
+            created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ref['created_at']))
+            yield (
+                f"Filename: {ref['filename']}\n"
+                f"Method: {ref['method']}\n"
+                f"Created: {created}\n"
+                "----------------------------\n"
+            )
+
+        if not found:
             if method:
-                return f"No reference data found for method '{method}'"
+                yield f"No reference data found for method '{method}'\n"
             else:
-                return "No reference data found in the database"
+                yield "No reference data found in the database\n"
+    except Exception as e:
+        yield f"Error listing reference data: {str(e)}\n"
+    finally:
+        db.close()
 
-        # Format the output
-        result = "Reference data in database:\n"
-        result += "----------------------------\n"
 
-        for ref in references:
-            created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ref['created_at']))
-            result += f"Filename: {ref['filename']}\n"
-            result += f"Method: {ref['method']}\n"
-            result += f"Created: {created}\n"
-            result += "----------------------------\n"
+def list_references(method=None, since=None, page=None, page_size=LIST_PAGE_SIZE):
+    """
+    List all reference data in the database, optionally filtered by method.
+
+    Args:
+        method: Optional method name to filter by
+        since: Optional timestamp; only entries updated at or after it
+        page: Optional 1-based page number; lists everything when None
+        page_size: Number of entries per page
+
+    Returns:
+        List of reference data entries
+    """
+    return "".join(iter_references(method, since, page, page_size))
+
+
+def count_references(method=None, since=None):
+    """
+    Count reference data per method, computed server-side.
+
+    Args:
+        method: Optional method name to filter by
+        since: Optional timestamp; only entries updated at or after it
+
+    Returns:
+        Formatted per-method counts
+    """
+    db = _database()
+
+    if not db.test_connection():
+        return "Error: Database connection failed. Cannot count references."
+
+    try:
+        counts = db.count_reference_data(method, since=since)
+        if not counts:
+            return "No reference data found in the database"
+
+        width = max(len(name) for name in counts)
+        lines = [f"{name:{width}} | {count}" for name, count in counts.items()]
+        lines.append(f"{'Total':{width}} | {sum(counts.values())}")
+        return "\n".join(lines)
+    finally:
+        db.close()
+
+
+def parse_range(value):
+    """
+    Parse a --range value of the form FIELD=MIN:MAX.
+
+    Either bound may be left out for an open range, e.g. "ANGLE=:45".
+
+    Args:
+        value: String value from the command line
+
+    Returns:
+        Tuple of (field, (minimum, maximum))
+    """
+    try:
+        field, bounds = value.split("=", 1)
+        minimum, maximum = bounds.split(":", 1)
+        return field.strip(), (
+            float(minimum) if minimum.strip() else None,
+            float(maximum) if maximum.strip() else None,
+        )
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid --range value '{value}' (expected FIELD=MIN:MAX)"
+        )
+
+
+def iter_query_results(ranges, method=None):
+    """
+    Stream the filenames of the references whose RESULT values are in range.
+
+    Args:
+        ranges: Dictionary mapping a RESULT field name to (minimum, maximum)
+        method: Optional method name to filter by
+
+    Yields:
+        Output lines: the filename, preceded by the method when no method
+        was given
+    """
+    db = _database()
+
+    if not db.test_connection():
+        yield "Error: Database connection failed. Cannot query references.\n"
+        return
+
+    try:
+        for filename, method_name in db.query_reference_data(ranges, method):
+            yield f"{filename}\n" if method else f"{method_name}\t{filename}\n"
+    except ValueError as e:
+        yield f"Error: {str(e)}\n"
+    finally:
+        db.close()
+
+
+def create_result_indexes(fields=INDEXED_RESULT_FIELDS, method=None):
+    """
+    Create the indexes used by range queries over RESULT values.
+
+    Args:
+        fields: Names of output_data.RESULT fields to index
+        method: Optional method name to restrict to
+
+    Returns:
+        Summary message
+    """
+    db = _database()
+
+    if not db.test_connection():
+        return "Error: Database connection failed. Cannot create indexes."
+
+    try:
+        created = db.ensure_result_indexes(fields, method)
+        if not created:
+            return "No reference collections to index"
+        return "\n".join(f"{collection}: {index}" for collection, index in created)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    finally:
+        db.close()
+
+
+def migrate_references(batch_size=MIGRATION_BATCH_SIZE, resume=True):
+    """
+    Migrate per-method reference collections to the consolidated layout.
+
+    Args:
+        batch_size: Number of documents copied per bulk write
+        resume: Continue from the checkpoints of a previous run
+
+    Returns:
+        Summary message
+    """
+    db = _database()
+
+    if not db.test_connection():
+        return "Error: Database connection failed. Cannot migrate references."
+
+    def report(method, copied, total):
+        print(f"Migrating '{method}': {copied}/{total} documents copied")
+
+    try:
+        copied = db.migrate_to_consolidated(batch_size=batch_size, resume=resume, progress=report)
+        if not copied:
+            return "No per-method reference collections to migrate"
+
+        return (
+            f"Migration complete: {sum(copied.values())} documents in "
+            f"{len(copied)} method(s) copied to '{MONGO_CONSOLIDATED_COLLECTION}'.\n"
+            "Set MONGO_LAYOUT = \"consolidated\" in the config to use the new layout."
+        )
+    finally:
+        db.close()
 
-        return result
+
+def snapshot_references(action, path, methods=None):
+    """
+    Export, refresh or describe a reference snapshot file.
+
+    Args:
+        action: "export", "refresh" or "info"
+        path: Path to the snapshot file
+        methods: Optional list of method names to export
+
+    Returns:
+        Summary message
+    """
+    if action == "info":
+        snapshot = SnapshotDatabase(path)
+        if not snapshot.test_connection():
+            return f"Error: '{path}' is not a readable snapshot"
+        try:
+            counts = snapshot.count_reference_data()
+            updated = time.strftime(
+                '%Y-%m-%d %H:%M:%S', time.localtime(snapshot.metadata.get("max_updated_at", 0))
+            )
+            lines = [f"Snapshot: {path}", f"Latest update: {updated}"]
+            lines += [f"{method}: {count}" for method, count in counts.items()]
+            return "\n".join(lines)
+        finally:
+            snapshot.close()
+
+    db = _database()
+
+    if not db.test_connection():
+        return "Error: Database connection failed. Cannot build snapshot."
+
+    try:
+        if action == "export":
+            written = export_snapshot(db, path, methods)
+            return f"Exported {written} references to '{path}'"
+
+        written, updated = refresh_snapshot(db, path)
+        return f"Refreshed '{path}': {updated} updated, {written} references in total"
+    except (OSError, ValueError) as e:
+        return f"Error writing snapshot: {str(e)}"
     except Exception as e:
         return f"Error listing reference data: {str(e)}"
+    finally:
+        db.close()
+
+
+def sample_references(method, budget=QUICK_FILE_BUDGET, seed=QUICK_SEED, history_path=None):
+    """
+    Pick the quick check sample of a method.
+
+    Args:
+        method: Method name to sample
+        budget: Number of files to pick
+        seed: Seed of the deterministic sample
+        history_path: Optional quick check history favouring recent failures
+
+    Returns:
+        Sampled filenames, one per line
+    """
+    db = _database()
+
+    if not db.test_connection():
+        return "Error: Database connection failed. Cannot sample references."
+
+    try:
+        sampler = QuickSampler(db, budget=budget, seed=seed, history_path=history_path)
+        return "\n".join(sorted(sampler.sample(method)))
+    except Exception as e:
+        return f"Error listing reference data: {str(e)}"
+    finally:
+        db.close()
 
 
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(description="Samuel Regression Testing Library CLI")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Write a Chrome trace of the command to PATH")
+    parser.add_argument("--metrics-json", metavar="PATH",
+                        help="Write the database latency summary of the command to PATH as JSON")
+    parser.add_argument("--metrics-prom", metavar="PATH",
+                        help="Write the database latency histograms to PATH as a Prometheus textfile")
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
 
     # Add reference data command
     add_parser = subparsers.add_parser("add-reference", help="Add reference data to the database")
     add_parser.add_argument("filepath", help="Path to the XML file")
     add_parser.add_argument("method", help="Method name (e.g., 'lq')")
+    add_parser.add_argument("--isolate", action="store_true",
+                            help="Extract in a worker process with time and memory limits")
+
+    # Read back a stored input command
+    input_parser = subparsers.add_parser(
+        "get-input", help="Write the stored XML input of a reference"
+    )
+    input_parser.add_argument("filename", help="Name of the reference file")
+    input_parser.add_argument("method", help="Method name (e.g., 'lq')")
+    input_parser.add_argument("output", help="Path of the file to write")
+
+    # Watch an output directory command
+    watch_parser = subparsers.add_parser(
+        "watch", help="Re-test the outputs in a directory whenever they change"
+    )
+    watch_parser.add_argument("directory", help="Directory with the outputs of the script under test")
+    watch_parser.add_argument("method", help="Method name (e.g., 'lq')")
+    watch_parser.add_argument("--poll", type=float, metavar="SECONDS",
+                              help="Poll for changes instead of using inotify")
+    watch_parser.add_argument("--isolate", action="store_true",
+                              help="Extract in a worker process with time and memory limits")
+
+    # Combine trace files command
+    merge_parser = subparsers.add_parser(
+        "trace-merge", help="Combine Chrome trace files of several processes into one"
+    )
+    merge_parser.add_argument("output", help="Path of the combined trace")
+    merge_parser.add_argument("traces", nargs="+", help="Trace files to combine")
 
     # List reference data command
     list_parser = subparsers.add_parser("list", help="List reference data in the database")
     list_parser.add_argument("--method", "-m", help="Filter by method name")
+    list_parser.add_argument("--since", type=parse_since,
+                             help="Only entries updated since this time (epoch seconds or ISO date)")
+    list_parser.add_argument("--count", action="store_true",
+                             help="Only print the number of entries per method")
+    list_parser.add_argument("--page", type=positive_int, help="Page number to show (1-based)")
+    list_parser.add_argument("--page-size", type=positive_int, default=LIST_PAGE_SIZE,
+                             help=f"Entries per page (default: {LIST_PAGE_SIZE})")
+
+    # Range query over RESULT values command
+    query_parser = subparsers.add_parser(
+        "query", help="List references whose RESULT values fall in given ranges"
+    )
+    query_parser.add_argument("--range", "-r", type=parse_range, action="append", required=True,
+                              dest="ranges", metavar="FIELD=MIN:MAX",
+                              help="Inclusive range of a RESULT field, e.g. WIDTH=10:20 (repeatable)")
+    query_parser.add_argument("--method", "-m", help="Filter by method name")
+
+    # Create indexes for range queries command
+    index_parser = subparsers.add_parser(
+        "index", help="Create the indexes used by range queries"
+    )
+    index_parser.add_argument("--field", "-f", action="append", dest="fields",
+                              help=f"RESULT field to index (default: {', '.join(INDEXED_RESULT_FIELDS)})")
+    index_parser.add_argument("--method", "-m", help="Only index this method's collection")
+
+    # Quick check sample command
+    sample_parser = subparsers.add_parser(
+        "sample", help="Print the quick check sample of a method, one filename per line"
+    )
+    sample_parser.add_argument("method", help="Method name to sample")
+    sample_parser.add_argument("--budget", type=int, default=QUICK_FILE_BUDGET,
+                               help=f"Number of files to pick (default: {QUICK_FILE_BUDGET})")
+    sample_parser.add_argument("--seed", default=QUICK_SEED, help="Seed of the sample")
+    sample_parser.add_argument("--history", metavar="PATH",
+                               help="Quick check history file of the runs to sample for")
+
+    # Migrate to the consolidated layout command
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Copy per-method collections into the consolidated collection"
+    )
+    migrate_parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE,
+                                help=f"Documents per bulk write (default: {MIGRATION_BATCH_SIZE})")
+    migrate_parser.add_argument("--restart", action="store_true",
+                                help="Ignore checkpoints from a previous run and copy everything")
+
+    # Snapshot commands
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help="Export references to a memory-mapped file for offline runs"
+    )
+    snapshot_subparsers = snapshot_parser.add_subparsers(dest="snapshot_command")
+    export_parser = snapshot_subparsers.add_parser("export", help="Write a new snapshot")
+    export_parser.add_argument("path", help="Path to the snapshot file")
+    export_parser.add_argument("--method", "-m", action="append", dest="methods",
+                               help="Method to export (repeatable; default: all)")
+    refresh_parser = snapshot_subparsers.add_parser(
+        "refresh", help="Add references updated since the snapshot was written"
+    )
+    refresh_parser.add_argument("path", help="Path to the snapshot file")
+    info_parser = snapshot_subparsers.add_parser("info", help="Describe a snapshot")
+    info_parser.add_argument("path", help="Path to the snapshot file")
 
     args = parser.parse_args()
 
+    tracer = None
+    if args.trace:
+        tracer = Tracer(args.trace, process_name=f"samuel-regression {args.command}")
+
+    global _metrics
+    _metrics = DatabaseMetrics() if args.metrics_json or args.metrics_prom else None
+
+    try:
+        with _span(tracer, args.command or "help"):
+            _run_command(args, parser, snapshot_parser, tracer)
+    finally:
+        if tracer is not None:
+            tracer.save()
+        if args.metrics_json:
+            _metrics.write_json(args.metrics_json)
+        if args.metrics_prom:
+            _metrics.write_prometheus(args.metrics_prom)
+
+
+def _run_command(args, parser, snapshot_parser, tracer):
+    """Run the command selected on the command line."""
     if args.command == "add-reference":
         if not os.path.isfile(args.filepath):
             print(f"Error: File '{args.filepath}' does not exist or is not accessible")
             sys.exit(1)
 
-        result = add_reference_data(args.filepath, args.method)
+        result = add_reference_data(args.filepath, args.method, tracer, args.isolate)
         print(result)
 
+    elif args.command == "watch":
+        if not os.path.isdir(args.directory):
+            print(f"Error: Directory '{args.directory}' does not exist")
+            sys.exit(1)
+
+        print(watch_directory(args.directory, args.method, args.poll, args.isolate))
+
+    elif args.command == "trace-merge":
+        try:
+            count = merge_traces(args.traces, args.output)
+            print(f"Wrote {count} events to '{args.output}'")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error merging traces: {str(e)}")
+
+    elif args.command == "get-input":
+        print(save_reference_input(args.filename, args.method, args.output))
+
     elif args.command == "list":
-        result = list_references(args.method if hasattr(args, 'method') else None)
-        print(result)
+        if args.count:
+            print(count_references(args.method, args.since))
+        else:
+            for chunk in iter_references(args.method, args.since, args.page, args.page_size):
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+
+    elif args.command == "query":
+        for line in iter_query_results(dict(args.ranges), args.method):
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+    elif args.command == "index":
+        print(create_result_indexes(args.fields or INDEXED_RESULT_FIELDS, args.method))
+
+    elif args.command == "sample":
+        print(sample_references(args.method, args.budget, args.seed, args.history))
+
+    elif args.command == "migrate":
+        print(migrate_references(args.batch_size, resume=not args.restart))
+
+    elif args.command == "snapshot" and args.snapshot_command:
+        print(snapshot_references(
+            args.snapshot_command, args.path, getattr(args, "methods", None)
+        ))
+
+    elif args.command == "snapshot":
+        snapshot_parser.print_help()
 
     else:
         parser.print_help()
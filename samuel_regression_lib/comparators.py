@@ -2,6 +2,50 @@
 Output comparison logic.
 """
 
+import hashlib
+import json
+from collections.abc import Mapping, Sequence
+
+
+def _json_default(value):
+    """Serialize mappings and sequences that are not dicts or lists."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def canonical_json(output_data):
+    """
+    Serialize output data to canonical JSON bytes.
+
+    Args:
+        output_data: Extracted output data
+
+    Returns:
+        UTF-8 encoded JSON with sorted keys and no insignificant whitespace
+    """
+    return json.dumps(
+        output_data, sort_keys=True, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+def output_fingerprint(output_data):
+    """
+    Compute the fingerprint of output data.
+
+    Two outputs have the same fingerprint exactly when their canonical JSON
+    is identical, i.e. they are bit-identical up to key order.
+
+    Args:
+        output_data: Extracted output data
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON
+    """
+    return hashlib.sha256(canonical_json(output_data)).hexdigest()
+
 
 class OutputComparator:
     """
@@ -7,8 +7,75 @@ MONGO_URI = "mongodb://localhost:27017/"
 MONGO_DB_NAME = "samuel_regression"
 MONGO_COLLECTION_PREFIX = "reference_data_"  # Will be combined with method name
 
+# Reference storage layout: "per_method" uses one collection per method
+# (MONGO_COLLECTION_PREFIX + method), "consolidated" stores every method in
+# MONGO_CONSOLIDATED_COLLECTION with a unique (method, filename) index
+MONGO_LAYOUT = "per_method"
+MONGO_CONSOLIDATED_COLLECTION = "references"
+MONGO_MIGRATION_COLLECTION = "migration_state"  # Checkpoints for resumable migration
+MIGRATION_BATCH_SIZE = 500  # Documents copied per bulk write during migration
+# Opt-in: return lookups and listings as lazily decoded, read-only raw BSON
+# documents instead of dicts. Only for callers that read a few fields and do
+# not modify or serialize the documents; full comparisons gain little
+MONGO_RAW_BSON = False
+
+# Inputs larger than this are stored in GridFS instead of inside the reference
+# document (MongoDB documents are limited to 16 MB)
+GRIDFS_THRESHOLD_BYTES = 8 * 1024 * 1024
+GRIDFS_BUCKET = "reference_inputs"  # GridFS bucket holding large inputs
+GRIDFS_CHUNK_SIZE = 255 * 1024  # Bytes per GridFS chunk
+
+# XML parsing settings
+XML_BACKEND = "auto"  # XML parser: "auto" (lxml if installed), "lxml" or "stdlib"
+
+# Listing settings
+LIST_BATCH_SIZE = 1000  # Documents fetched per cursor round trip when listing
+LIST_PAGE_SIZE = 100  # Default number of entries per page for paginated listing
+
+# Result query settings
+INDEXED_RESULT_FIELDS = ("WIDTH", "ANGLE", "HEIGHT_MEAN")  # output_data.RESULT fields with range query indexes
+
+# Database metrics settings
+SLOW_OPERATION_SECONDS = 0.5  # Database operations slower than this are logged (0 = never)
+LATENCY_BUCKETS = (  # Upper bounds in seconds of the latency histogram buckets
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Memory tracking settings (RegressionTest(memory=...))
+MEMORY_BUDGET_ACTION = "fail"  # On exceeding the memory budget: "fail" (stop testing) or "stream" (low-memory path)
+MEMORY_TOP_SITES = 10  # Allocation sites named in memory reports
+MEMORY_TOP_FILES = 10  # Files with the largest peaks named in memory reports
+
+# Isolated extraction settings (RegressionTest(isolate=True), add-reference --isolate)
+EXTRACTION_TIMEOUT = 60.0  # Wall-clock seconds allowed to extract one file (0 = no limit)
+EXTRACTION_CPU_LIMIT = 30  # CPU seconds allowed to extract one file (0 = no limit; POSIX only)
+EXTRACTION_MEMORY_LIMIT = 2 * 1024 * 1024 * 1024  # Address space of an extraction worker in bytes (POSIX only)
+
+# Watch mode settings (cli watch)
+WATCH_PATTERN = "*.xml"  # Output files watched for changes
+WATCH_POLL_INTERVAL = 0.5  # Seconds between scans when inotify is unavailable
+WATCH_DEBOUNCE_SECONDS = 0.05  # Quiet time that ends a burst of changes
+
 # Testing threshold settings
 TOLERANCE_THRESHOLD = 0.01  # 1% tolerance for numerical comparisons
+PERFORMANCE_TOLERANCE = 0.25  # 25% tolerance for runtime and peak memory over the baseline mean
+PERFORMANCE_Z_THRESHOLD = 3.0  # z-score above which a slowdown is statistically significant
+PERFORMANCE_MIN_SAMPLES = 5  # Baseline measurements needed before slowdowns are flagged
+PERFORMANCE_BASELINE_SIZE = 20  # Most recent measurements kept as the rolling baseline
+
+# Prefetch settings (background fetching of upcoming references)
+PREFETCH_WINDOW = 256  # Maximum references buffered or in flight ahead of the caller
+PREFETCH_BATCH_SIZE = 32  # Maximum references fetched per query
+PREFETCH_STOP_TIMEOUT = 5.0  # Seconds stop() waits for the prefetching thread to exit
+
+# Quick check settings (stratified sample of references per method)
+QUICK_FILE_BUDGET = 25  # Files tested per method in quick mode
+QUICK_TIME_BUDGET = 30.0  # Seconds after which quick mode stops testing (0 = no limit)
+QUICK_SEED = "samuel-regression"  # Seed of the deterministic sample
+QUICK_HISTORY_PATH = None  # Path of the local outcome history (None = no history)
+QUICK_FAILURE_WEIGHT = 8.0  # Sampling weight multiplier for recently failing files
+QUICK_CHANGE_WEIGHT = 4.0  # Sampling weight multiplier for recently changed references
+QUICK_RECENT_SECONDS = 7 * 24 * 3600  # What counts as "recent" for the weights
 
 # Logging settings
 ENABLE_DEBUG_LOGGING = False
\ No newline at end of file
@@ -2,38 +2,127 @@
 Database operations for Samuel Regression Testing Library.
 """
 
+import hashlib
+import io
+import re
 import time
-import pymongo
-from pymongo.errors import ConnectionFailure, OperationFailure
-from .config import MONGO_URI, MONGO_DB_NAME, MONGO_COLLECTION_PREFIX
+from .comparators import output_fingerprint
+from .lazy import LazyDocument
+from .metrics import DatabaseMetrics
+from .config import (
+    MONGO_URI, MONGO_DB_NAME, MONGO_COLLECTION_PREFIX, MONGO_LAYOUT,
+    MONGO_CONSOLIDATED_COLLECTION, MONGO_MIGRATION_COLLECTION,
+    LIST_BATCH_SIZE, MIGRATION_BATCH_SIZE, MONGO_RAW_BSON,
+    GRIDFS_THRESHOLD_BYTES, GRIDFS_BUCKET, GRIDFS_CHUNK_SIZE,
+    PERFORMANCE_BASELINE_SIZE, INDEXED_RESULT_FIELDS,
+)
+
+LAYOUT_PER_METHOD = "per_method"
+LAYOUT_CONSOLIDATED = "consolidated"
+
+# Names accepted as output_data.RESULT fields in range queries
+_RESULT_FIELD = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _output_data(document):
+    """Get the output_data of a reference document, decoding raw BSON lazily."""
+    return LazyDocument.from_raw(document).get("output_data")
 
 
 class Database:
     """
     Handles all database operations.
+
+    pymongo is imported and the client is created on first use. The client
+    is then kept open and reused by later operations until close() is called.
+
+    References are stored either in one collection per method
+    ("per_method") or in a single collection keyed by a unique
+    (method, filename) index ("consolidated"). Writes and listings use the
+    configured layout. With the consolidated layout, lookups fall back to the
+    per-method collections until every one of them has been migrated.
+
+    Inputs larger than GRIDFS_THRESHOLD_BYTES are stored in GridFS; the
+    reference document then only holds the file id, size and SHA-256 of the
+    input. iter_reference_input() streams an input back chunk by chunk.
+
+    The time every operation spends waiting on MongoDB is recorded in
+    self.metrics (see metrics.DatabaseMetrics), per operation type,
+    collection and method.
+
+    With raw_bson (MONGO_RAW_BSON), lookups and listings return raw BSON
+    documents: the bytes received from the server are kept as they are and
+    a field is decoded only when it is accessed. They behave as read-only
+    mappings, so this is opt-in and off by default: lookups and listings
+    then return dicts. It mainly helps callers that read a few fields of
+    each document; a full comparison reads most of output_data anyway.
     """
 
-    def __init__(self):
-        """Initialize the database manager."""
+    def __init__(self, layout=None, raw_bson=None, metrics=None):
+        """
+        Initialize the database manager.
+
+        Args:
+            layout: Storage layout, "per_method" or "consolidated"
+                    (defaults to MONGO_LAYOUT from the config)
+            raw_bson: Return lookups and listings as raw BSON documents
+                      (defaults to MONGO_RAW_BSON from the config)
+            metrics: DatabaseMetrics to record latencies in, e.g. to share
+                     them between instances (default: a new one)
+        """
+        self.layout = layout or MONGO_LAYOUT
+        if self.layout not in (LAYOUT_PER_METHOD, LAYOUT_CONSOLIDATED):
+            raise ValueError(f"Unknown reference layout '{self.layout}'")
+
+        self.raw_bson = MONGO_RAW_BSON if raw_bson is None else raw_bson
+        self.metrics = metrics if metrics is not None else DatabaseMetrics()
         self.client = None
         self.db = None
+        self._read_db = None
+        self._consolidated_index_ready = False
+        self._migration_complete = None
 
     def _connect(self):
         """
-        Connect to MongoDB.
+        Connect to MongoDB, reusing the existing client if there is one.
 
         Returns:
             True if connection successful, False otherwise
         """
+        if self.client is not None:
+            return True
+
+        # Deferred so that importing the library does not pay for pymongo
+        import pymongo
+        from pymongo.errors import ConnectionFailure, OperationFailure
+
         try:
             # Create a client with connection timeout
             self.client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
             self.db = self.client[MONGO_DB_NAME]
+
+            # Read paths decode lazily; writes and migration use plain dicts
+            if self.raw_bson:
+                from bson.raw_bson import DEFAULT_RAW_BSON_OPTIONS
+                self._read_db = self.db.with_options(codec_options=DEFAULT_RAW_BSON_OPTIONS)
+            else:
+                self._read_db = self.db
             return True
         except (ConnectionFailure, OperationFailure) as e:
             print(f"Database connection error: {e}")
+            self.client = None
+            self.db = None
+            self._read_db = None
             return False
 
+    def close(self):
+        """Close the client, if one is open."""
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self.db = None
+        self._read_db = None
+
     def test_connection(self):
         """
         Test the database connection.
@@ -52,6 +141,95 @@ class Database:
 
         return success
 
+    def _consolidated_collection(self, ensure_index=False):
+        """
+        Get the consolidated reference collection.
+
+        Args:
+            ensure_index: Create the unique (method, filename) index if it
+                          has not been created by this instance yet
+
+        Returns:
+            The consolidated collection
+        """
+        collection = self.db[MONGO_CONSOLIDATED_COLLECTION]
+        if ensure_index and not self._consolidated_index_ready:
+            collection.create_index(
+                [("method", 1), ("filename", 1)], unique=True, name="method_filename"
+            )
+            self._consolidated_index_ready = True
+        return collection
+
+    def _lookup_layouts(self):
+        """
+        Get the layouts to read from, configured layout first.
+
+        The per-method layout never needs the consolidated collection, which
+        is only filled by migrating. The consolidated layout also reads the
+        per-method collections until migrate_to_consolidated() has synced
+        every one of them, so a miss then costs a single query.
+        """
+        if self.layout == LAYOUT_PER_METHOD:
+            return (LAYOUT_PER_METHOD,)
+        if self._migration_complete is None:
+            self._migration_complete = self._check_migration_complete()
+        if self._migration_complete:
+            return (LAYOUT_CONSOLIDATED,)
+        return (LAYOUT_CONSOLIDATED, LAYOUT_PER_METHOD)
+
+    def _check_migration_complete(self):
+        """
+        Check whether every per-method collection has been migrated.
+
+        Returns:
+            True if no per-method collection lacks a finished migration pass
+        """
+        names = [name for _, name in self._reference_collection_names()]
+        if not names:
+            return True
+        synced = self.db[MONGO_MIGRATION_COLLECTION].count_documents(
+            {"_id": {"$in": names}, "synced_at": {"$exists": True}}
+        )
+        return synced == len(names)
+
+    def _reference_locations(self, filename, method):
+        """
+        Get where a reference may be stored, configured layout first.
+
+        Args:
+            filename: Name of the file
+            method: Method name (e.g., "lq")
+
+        Returns:
+            List of (collection name, filter) tuples
+        """
+        locations = []
+        for layout in self._lookup_layouts():
+            if layout == LAYOUT_CONSOLIDATED:
+                locations.append((MONGO_CONSOLIDATED_COLLECTION, {"method": method, "filename": filename}))
+            else:
+                locations.append((f"{MONGO_COLLECTION_PREFIX}{method}", {"filename": filename}))
+        return locations
+
+    def _find_one_reference(self, filename, method, projection=None):
+        """
+        Find a reference document in the layouts to read from.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+            projection: Optional projection for the query
+
+        Returns:
+            The reference document if found, None otherwise
+        """
+        for collection_name, query in self._reference_locations(filename, method):
+            with self.metrics.timed("lookup", collection_name, method, query):
+                result = self._read_db[collection_name].find_one(query, projection)
+            if result:
+                return result
+        return None
+
     def get_reference_data(self, filename, method):
         """
         Get reference data for a specific file and method.
@@ -66,21 +244,175 @@ class Database:
         if not self._connect():
             return None
 
-        collection_name = f"{MONGO_COLLECTION_PREFIX}{method}"
-
         try:
-            collection = self.db[collection_name]
-            result = collection.find_one({"filename": filename})
+            result = self._find_one_reference(filename, method, {"output_data": 1})
 
             if result:
-                return result.get("output_data")
+                return _output_data(result)
             return None
         except Exception as e:
             print(f"Error retrieving reference data: {e}")
             return None
-        finally:
-            if self.client:
-                self.client.close()
+
+    def get_reference_fingerprint(self, filename, method):
+        """
+        Get only the output fingerprint stored with a reference.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Returns:
+            Tuple of (exists, fingerprint); fingerprint is None for
+            references stored before fingerprints were recorded
+        """
+        if not self._connect():
+            return False, None
+
+        try:
+            result = self._find_one_reference(filename, method, {"output_fingerprint": 1})
+
+            if result:
+                return True, result.get("output_fingerprint")
+            return False, None
+        except Exception as e:
+            print(f"Error retrieving reference fingerprint: {e}")
+            return False, None
+
+    def get_performance_baseline(self, filename, method):
+        """
+        Get the rolling performance baseline stored with a reference.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Returns:
+            Dictionary mapping metric name (e.g., "runtime") to the most
+            recent measurements, oldest first; empty if none were recorded
+        """
+        if not self._connect():
+            return {}
+
+        try:
+            result = self._find_one_reference(filename, method, {"performance": 1})
+
+            performance = LazyDocument.from_raw(result).get("performance") if result else None
+            if not performance:
+                return {}
+            return {name: list(samples) for name, samples in performance.items()}
+        except Exception as e:
+            print(f"Error retrieving performance baseline: {e}")
+            return {}
+
+    def record_performance(self, filename, method, measurements):
+        """
+        Append measurements to the rolling performance baseline of a reference.
+
+        Only the last PERFORMANCE_BASELINE_SIZE measurements of each metric
+        are kept. Nothing is stored for files without a reference.
+
+        Args:
+            filename: Name of the file
+            method: Method name (e.g., "lq")
+            measurements: Dictionary mapping metric name to the new value
+
+        Returns:
+            True if the measurements were stored, False otherwise
+        """
+        if not measurements or not self._connect():
+            return False
+
+        update = {
+            "$push": {
+                f"performance.{name}": {"$each": [value], "$slice": -PERFORMANCE_BASELINE_SIZE}
+                for name, value in measurements.items()
+            }
+        }
+
+        try:
+            for collection_name, query in self._reference_locations(filename, method):
+                with self.metrics.timed("store_performance", collection_name, method, query):
+                    result = self.db[collection_name].update_one(query, update)
+                if result.matched_count:
+                    return True
+            return False
+        except Exception as e:
+            print(f"Error storing performance measurements: {e}")
+            return False
+
+    def get_reference_data_many(self, keys):
+        """
+        Get reference data for many files, possibly across methods.
+
+        With the consolidated layout every method is served by a single
+        indexed query; the per-method layout needs one query per method.
+
+        Args:
+            keys: Iterable of (filename, method) tuples
+
+        Returns:
+            Dictionary mapping (filename, method) to reference output data,
+            containing only the references that were found
+
+        Raises:
+            ConnectionError: If the database cannot be reached
+            Errors of the driver if a query fails, so that callers caching
+            the result never take an unanswered lookup for a missing reference
+        """
+        if not self._connect():
+            raise ConnectionError("Database connection failed")
+
+        missing = {}
+        for filename, method in keys:
+            missing.setdefault(method, set()).add(filename)
+
+        found = {}
+        for layout in self._lookup_layouts():
+            if not missing:
+                break
+
+            if layout == LAYOUT_CONSOLIDATED:
+                query = {"$or": [
+                    {"method": method, "filename": {"$in": sorted(filenames)}}
+                    for method, filenames in missing.items()
+                ]}
+                cursor = self.metrics.timed_cursor(
+                    lambda: self._read_db[MONGO_CONSOLIDATED_COLLECTION].find(
+                        query, {"filename": 1, "method": 1, "output_data": 1}
+                    ),
+                    "lookup_many", MONGO_CONSOLIDATED_COLLECTION, query=query,
+                )
+                documents = (
+                    (doc["method"], doc) for doc in map(LazyDocument.from_raw, cursor)
+                )
+            else:
+                documents = (
+                    (method, doc)
+                    for method, filenames in list(missing.items())
+                    for doc in self._find_many(method, sorted(filenames))
+                )
+
+            for method, doc in documents:
+                found[(doc["filename"], method)] = _output_data(doc)
+
+            for method in list(missing):
+                missing[method] = {
+                    filename for filename in missing[method] if (filename, method) not in found
+                }
+                if not missing[method]:
+                    del missing[method]
+
+        return found
+
+    def _find_many(self, method, filenames):
+        """Find the references of several files in a per-method collection."""
+        collection_name = f"{MONGO_COLLECTION_PREFIX}{method}"
+        query = {"filename": {"$in": filenames}}
+        return self.metrics.timed_cursor(
+            lambda: self._read_db[collection_name].find(query, {"filename": 1, "output_data": 1}),
+            "lookup_many", collection_name, method, query,
+        )
 
     def store_reference_data(self, filename, method, xml_data, output_data):
         """
@@ -99,82 +431,618 @@ class Database:
         if not self._connect():
             return False
 
+        if self.layout == LAYOUT_CONSOLIDATED:
+            return self._store_consolidated(filename, method, xml_data, output_data)
+
         collection_name = f"{MONGO_COLLECTION_PREFIX}{method}"
 
         try:
             collection = self.db[collection_name]
+            input_fields, stale_fields = self._store_input(xml_data)
 
-            # Check if entry already exists
-            existing = collection.find_one({"filename": filename})
+            with self.metrics.timed("store", collection_name, method, {"filename": filename}):
+                # Check if entry already exists
+                existing = collection.find_one({"filename": filename}, {"_id": 1})
 
-            if existing:
-                # Update existing entry
-                collection.update_one(
-                    {"filename": filename},
-                    {"$set": {
-                        "xml_data": xml_data,
+                if existing:
+                    # Update existing entry
+                    collection.update_one(
+                        {"filename": filename},
+                        {
+                            "$set": {
+                                **input_fields,
+                                "output_data": output_data,
+                                "output_fingerprint": output_fingerprint(output_data),
+                                "updated_at": time.time()
+                            },
+                            # A re-added reference starts a new performance baseline
+                            "$unset": {**stale_fields, "performance": ""}
+                        }
+                    )
+                else:
+                    # Create new entry
+                    collection.insert_one({
+                        "filename": filename,
+                        "method": method,  # Store method name for easier querying
+                        **input_fields,
                         "output_data": output_data,
+                        "output_fingerprint": output_fingerprint(output_data),
+                        "created_at": time.time(),
                         "updated_at": time.time()
-                    }}
-                )
-            else:
-                # Create new entry
-                collection.insert_one({
-                    "filename": filename,
-                    "method": method,  # Store method name for easier querying
-                    "xml_data": xml_data,
-                    "output_data": output_data,
-                    "created_at": time.time(),
-                    "updated_at": time.time()
-                })
+                    })
 
             return True
         except Exception as e:
             print(f"Error storing reference data: {e}")
             return False
-        finally:
-            if self.client:
-                self.client.close()
+
+    def _store_consolidated(self, filename, method, xml_data, output_data):
+        """
+        Store reference data in the consolidated collection with one upsert.
+
+        Args:
+            filename: Name of the file
+            method: Method name (e.g., "lq")
+            xml_data: Full XML data as string
+            output_data: Extracted output data
+
+        Returns:
+            True if storage successful, False otherwise
+        """
+        try:
+            now = time.time()
+            input_fields, stale_fields = self._store_input(xml_data)
+            query = {"method": method, "filename": filename}
+            collection = self._consolidated_collection(ensure_index=True)
+            with self.metrics.timed("store", MONGO_CONSOLIDATED_COLLECTION, method, query):
+                collection.update_one(
+                    query,
+                    {
+                        "$set": {
+                            **input_fields,
+                            "output_data": output_data,
+                            "output_fingerprint": output_fingerprint(output_data),
+                            "updated_at": now
+                        },
+                        # A re-added reference starts a new performance baseline
+                        "$unset": {**stale_fields, "performance": ""},
+                        "$setOnInsert": {"created_at": now}
+                    },
+                    upsert=True
+                )
+            return True
+        except Exception as e:
+            print(f"Error storing reference data: {e}")
+            return False
+
+    def _input_bucket(self):
+        """Get the GridFS bucket holding large inputs."""
+        import gridfs
+        return gridfs.GridFSBucket(
+            self.db, bucket_name=GRIDFS_BUCKET, chunk_size_bytes=GRIDFS_CHUNK_SIZE
+        )
+
+    def _store_input(self, xml_data):
+        """
+        Prepare the input fields of a reference document.
+
+        Inputs up to GRIDFS_THRESHOLD_BYTES are embedded in the document.
+        Larger inputs are uploaded to GridFS, named by their SHA-256 so that
+        identical content is stored once, and only referenced.
+
+        Args:
+            xml_data: Full XML data as string or bytes
+
+        Returns:
+            Tuple of (fields to set, fields to unset) for the document
+        """
+        data = xml_data.encode("utf-8") if isinstance(xml_data, str) else xml_data
+        digest = hashlib.sha256(data).hexdigest()
+        fields = {"xml_sha256": digest, "xml_size": len(data)}
+
+        if len(data) <= GRIDFS_THRESHOLD_BYTES:
+            fields["xml_data"] = xml_data
+            return fields, {"xml_file_id": ""}
+
+        with self.metrics.timed("store_input", GRIDFS_BUCKET, query={"filename": digest}):
+            existing = self.db[f"{GRIDFS_BUCKET}.files"].find_one({"filename": digest}, {"_id": 1})
+            if existing:
+                fields["xml_file_id"] = existing["_id"]
+            else:
+                fields["xml_file_id"] = self._input_bucket().upload_from_stream(
+                    digest, io.BytesIO(data), metadata={"sha256": digest}
+                )
+        return fields, {"xml_data": ""}
+
+    def iter_reference_input(self, filename, method):
+        """
+        Stream the stored XML input of a reference.
+
+        Inputs stored in GridFS are read one chunk at a time and checked
+        against their SHA-256, so memory stays bounded for large inputs.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Yields:
+            Chunks of the input as bytes
+
+        Raises:
+            ValueError: If a GridFS input does not match its stored hash
+        """
+        if not self._connect():
+            return
+
+        try:
+            doc = self._find_one_reference(
+                filename, method, {"xml_data": 1, "xml_file_id": 1, "xml_sha256": 1}
+            )
+        except Exception as e:
+            print(f"Error retrieving reference input: {e}")
+            return
+
+        if doc is None:
+            return
+        doc = LazyDocument.from_raw(doc)
+
+        file_id = doc.get("xml_file_id")
+        if file_id is None:
+            data = doc.get("xml_data") or ""
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            for start in range(0, len(data), GRIDFS_CHUNK_SIZE):
+                yield data[start:start + GRIDFS_CHUNK_SIZE]
+            return
+
+        def read_chunks(download):
+            with download as stream:
+                yield from iter(stream.readchunk, b"")
+
+        digest = hashlib.sha256()
+        chunks = self.metrics.timed_cursor(
+            lambda: read_chunks(self._input_bucket().open_download_stream(file_id)),
+            "read_input", GRIDFS_BUCKET, method, {"_id": file_id},
+        )
+        for chunk in chunks:
+            digest.update(chunk)
+            yield chunk
+
+        expected = doc.get("xml_sha256")
+        if expected and digest.hexdigest() != expected:
+            raise ValueError(
+                f"Stored input of '{filename}' with method '{method}' does not match its hash"
+            )
+
+    def _reference_collection_names(self, method=None):
+        """
+        Get the names of the per-method reference collections.
+
+        The prefix filter is applied server-side, so unrelated collections
+        are never transferred.
+
+        Args:
+            method: Optional method name to restrict to
+
+        Returns:
+            Sorted list of (method, collection_name) tuples
+        """
+        if method:
+            names = self.db.list_collection_names(
+                filter={"name": f"{MONGO_COLLECTION_PREFIX}{method}"}
+            )
+        else:
+            names = self.db.list_collection_names(
+                filter={"name": {"$regex": f"^{re.escape(MONGO_COLLECTION_PREFIX)}"}}
+            )
+
+        return sorted(
+            (name[len(MONGO_COLLECTION_PREFIX):], name) for name in names
+        )
+
+    @staticmethod
+    def _union_stages(collections, build_pipeline):
+        """
+        Build aggregation stages that read several collections as one stream.
+
+        The first collection's pipeline runs directly and every other
+        collection is appended with $unionWith, so the whole union is a
+        single server-side aggregation.
+
+        Args:
+            collections: List of (method, collection_name) tuples
+            build_pipeline: Callable returning the pipeline for a method
+
+        Returns:
+            List of aggregation stages to run on the first collection
+        """
+        stages = []
+        for index, (method_name, collection_name) in enumerate(collections):
+            pipeline = build_pipeline(method_name)
+            if index == 0:
+                stages.extend(pipeline)
+            else:
+                stages.append({"$unionWith": {"coll": collection_name, "pipeline": pipeline}})
+        return stages
+
+    @staticmethod
+    def _since_filter(since):
+        """Build the query filter for entries updated at or after `since`."""
+        return {"updated_at": {"$gte": since}} if since is not None else {}
+
+    def iter_reference_data(self, method=None, since=None, skip=0, limit=None, include_output=False):
+        """
+        Stream reference data entries through a server-side cursor.
+
+        All method collections are read through one aggregation using
+        $unionWith, so pagination is applied by the server across methods.
+        This method is only used by the CLI tool.
+
+        Args:
+            method: Optional method name to filter by
+            since: Optional timestamp; only entries updated at or after it
+            skip: Number of entries to skip (for pagination)
+            limit: Maximum number of entries to return, or None for all
+            include_output: Also return the output_data of each entry
+
+        Yields:
+            Reference data entries with basic metadata (read-only mappings
+            that decode their fields on access when raw_bson is set)
+
+        Raises:
+            Errors of the driver if the listing fails part-way, so that a
+            partial listing is never taken for a complete one
+        """
+        if not self._connect():
+            return
+
+        query = self._since_filter(since)
+        projection = {"filename": 1, "created_at": 1, "updated_at": 1}
+        if include_output:
+            projection["output_data"] = 1
+
+        if self.layout == LAYOUT_CONSOLIDATED:
+            if method:
+                query["method"] = method
+            def open_cursor():
+                cursor = self._read_db[MONGO_CONSOLIDATED_COLLECTION].find(
+                    query,
+                    dict(projection, method=1),
+                    batch_size=LIST_BATCH_SIZE,
+                ).sort("_id", 1).skip(skip)
+                return cursor.limit(limit) if limit is not None else cursor
+
+            for doc in self.metrics.timed_cursor(
+                open_cursor, "list", MONGO_CONSOLIDATED_COLLECTION, method, query
+            ):
+                yield LazyDocument.from_raw(doc)
+            return
+
+        collections = self._reference_collection_names(method)
+        if not collections:
+            return
+
+        stages = self._union_stages(collections, lambda method_name: [
+            {"$match": query},
+            {"$sort": {"_id": 1}},
+            {"$project": dict(projection, method={"$literal": method_name})},
+        ])
+
+        if skip:
+            stages.append({"$skip": skip})
+        if limit is not None:
+            stages.append({"$limit": limit})
+
+        first_collection = self._read_db[collections[0][1]]
+        collection_label = collections[0][1] if len(collections) == 1 else (
+            f"{MONGO_COLLECTION_PREFIX}*"
+        )
+        for doc in self.metrics.timed_cursor(
+            lambda: first_collection.aggregate(stages, batchSize=LIST_BATCH_SIZE),
+            "list", collection_label, method, query,
+        ):
+            yield LazyDocument.from_raw(doc)
+
+    def ensure_result_indexes(self, fields=INDEXED_RESULT_FIELDS, method=None):
+        """
+        Create the secondary indexes used by query_reference_data().
+
+        Every index also holds the filename (and the method in the
+        consolidated layout), so a range query on one RESULT field is
+        answered from the index alone without reading the reference
+        documents. The consolidated layout gets two indexes per field:
+        one led by the method for queries of a single method, and one led
+        by the RESULT field for queries across all methods.
+
+        Args:
+            fields: Names of output_data.RESULT fields to index
+            method: Optional method name to restrict to (per-method layout)
+
+        Returns:
+            List of (collection name, index name) tuples
+
+        Raises:
+            ValueError: If a field name is not a plain RESULT field name
+        """
+        fields = [self._result_field(field) for field in fields]
+        if not self._connect():
+            return []
+
+        created = []
+        try:
+            if self.layout == LAYOUT_CONSOLIDATED:
+                collections = [(None, MONGO_CONSOLIDATED_COLLECTION)]
+            else:
+                collections = self._reference_collection_names(method)
+
+            for _, collection_name in collections:
+                for field in fields:
+                    value = (f"output_data.RESULT.{field}", 1)
+                    if self.layout == LAYOUT_CONSOLIDATED:
+                        indexes = [
+                            (f"result_{field}", [("method", 1), value, ("filename", 1)]),
+                            (f"result_{field}_all", [value, ("method", 1), ("filename", 1)]),
+                        ]
+                    else:
+                        indexes = [(f"result_{field}", [value, ("filename", 1)])]
+
+                    for index_name, keys in indexes:
+                        with self.metrics.timed("create_index", collection_name, method):
+                            name = self.db[collection_name].create_index(keys, name=index_name)
+                        created.append((collection_name, name))
+        except Exception as e:
+            print(f"Error creating result indexes: {e}")
+        return created
+
+    @staticmethod
+    def _result_field(field):
+        """Validate the name of an output_data.RESULT field."""
+        if not _RESULT_FIELD.match(field):
+            raise ValueError(f"Invalid RESULT field name '{field}'")
+        return field
+
+    @classmethod
+    def _range_filter(cls, ranges):
+        """
+        Build the query filter for value ranges of RESULT fields.
+
+        Args:
+            ranges: Dictionary mapping a RESULT field name to a
+                    (minimum, maximum) tuple; either bound may be None
+
+        Returns:
+            Query filter
+        """
+        query = {}
+        for field, (minimum, maximum) in ranges.items():
+            condition = {}
+            if minimum is not None:
+                condition["$gte"] = minimum
+            if maximum is not None:
+                condition["$lte"] = maximum
+            # Without bounds, only require a numeric value
+            query[f"output_data.RESULT.{cls._result_field(field)}"] = condition or {"$type": "number"}
+        return query
+
+    def query_reference_data(self, ranges, method=None):
+        """
+        Stream the references whose RESULT values fall in the given ranges.
+
+        The ranges are filtered server-side. With the indexes of
+        ensure_result_indexes(), a range on a single field is answered
+        from the index alone. With ranges on several fields, MongoDB uses
+        the index of one of them and reads the matching references to
+        check the other ranges.
+
+        Args:
+            ranges: Dictionary mapping a RESULT field name (e.g., "WIDTH")
+                    to an inclusive (minimum, maximum) tuple; either bound
+                    may be None
+            method: Optional method name to filter by
+
+        Yields:
+            (filename, method) tuples
+
+        Raises:
+            ValueError: If a field name is not a plain RESULT field name
+        """
+        query = self._range_filter(ranges)
+        if not self._connect():
+            return
+
+        try:
+            projection = {"_id": 0, "filename": 1}
+
+            if self.layout == LAYOUT_CONSOLIDATED:
+                if method:
+                    query["method"] = method
+                for doc in self.metrics.timed_cursor(
+                    lambda: self._read_db[MONGO_CONSOLIDATED_COLLECTION].find(
+                        query, dict(projection, method=1), batch_size=LIST_BATCH_SIZE
+                    ),
+                    "query", MONGO_CONSOLIDATED_COLLECTION, method, query,
+                ):
+                    yield doc["filename"], doc["method"]
+                return
+
+            for method_name, collection_name in self._reference_collection_names(method):
+                for doc in self.metrics.timed_cursor(
+                    lambda: self._read_db[collection_name].find(
+                        query, projection, batch_size=LIST_BATCH_SIZE
+                    ),
+                    "query", collection_name, method_name, query,
+                ):
+                    yield doc["filename"], method_name
+        except Exception as e:
+            print(f"Error querying reference data: {e}")
+
+    def count_reference_data(self, method=None, since=None):
+        """
+        Count reference data entries per method in a single aggregation.
+
+        Args:
+            method: Optional method name to filter by
+            since: Optional timestamp; only entries updated at or after it
+
+        Returns:
+            Dictionary mapping method name to number of entries
+        """
+        if not self._connect():
+            return {}
+
+        query = self._since_filter(since)
+
+        try:
+            if self.layout == LAYOUT_CONSOLIDATED:
+                if method:
+                    query["method"] = method
+                with self.metrics.timed("count", MONGO_CONSOLIDATED_COLLECTION, method, query):
+                    cursor = self._consolidated_collection().aggregate([
+                        {"$match": query},
+                        {"$group": {"_id": "$method", "count": {"$sum": 1}}},
+                        {"$sort": {"_id": 1}},
+                    ])
+                    return {doc["_id"]: doc["count"] for doc in cursor}
+
+            collections = self._reference_collection_names(method)
+            if not collections:
+                return {}
+
+            stages = self._union_stages(collections, lambda method_name: [
+                {"$match": query},
+                {"$project": {"_id": 0, "method": {"$literal": method_name}}},
+            ])
+            stages.append({"$group": {"_id": "$method", "count": {"$sum": 1}}})
+            stages.append({"$sort": {"_id": 1}})
+
+            first_collection = self.db[collections[0][1]]
+            with self.metrics.timed("count", f"{MONGO_COLLECTION_PREFIX}*", method, query):
+                return {doc["_id"]: doc["count"] for doc in first_collection.aggregate(stages)}
+        except Exception as e:
+            print(f"Error counting reference data: {e}")
+            return {}
 
     def list_reference_data(self, method=None):
         """
         List all reference data in the database, optionally filtered by method.
         This method is only used by the CLI tool.
 
+        Prefer iter_reference_data() for large databases, which streams
+        entries instead of materializing them all.
+
         Args:
             method: Optional method name to filter by
 
         Returns:
             List of reference data entries with basic metadata
         """
+        return list(self.iter_reference_data(method))
+
+    def migrate_to_consolidated(self, batch_size=MIGRATION_BATCH_SIZE, resume=True, progress=None):
+        """
+        Copy every per-method collection into the consolidated collection.
+
+        The migration runs online: documents are upserted in batches in _id
+        order and a checkpoint per source collection is kept in
+        MONGO_MIGRATION_COLLECTION, so an interrupted run resumes where it
+        stopped. Each run finishes with a catch-up pass that re-copies
+        documents updated since the previous run started, so writes that
+        happened during the migration are not lost. Deletions in the source
+        collections are not propagated.
+
+        Args:
+            batch_size: Number of documents copied per bulk write
+            resume: Continue from the stored checkpoints; when False the
+                    checkpoints are discarded and everything is copied again
+            progress: Optional callable(method, copied, total) called after
+                      every batch
+
+        Returns:
+            Dictionary mapping method name to number of documents copied
+        """
         if not self._connect():
-            return []
+            return {}
+
+        from pymongo import ReplaceOne
+        from pymongo.errors import BulkWriteError
+
+        target = self._consolidated_collection(ensure_index=True)
+        state_collection = self.db[MONGO_MIGRATION_COLLECTION]
+        copied_by_method = {}
+        self._migration_complete = None
 
-        results = []
+        def copy_batch(method, documents):
+            requests = []
+            for doc in documents:
+                doc.pop("_id", None)
+                doc["method"] = method
+                # Never replace a document written to the consolidated layout
+                # after this copy of it was read
+                requests.append(ReplaceOne(
+                    {"method": method, "filename": doc["filename"],
+                     "updated_at": {"$lt": doc.get("updated_at", 0.0)}},
+                    doc, upsert=True,
+                ))
+            if not requests:
+                return
+            try:
+                target.bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                # A newer document makes the upsert hit the unique index
+                errors = e.details.get("writeErrors", [])
+                if e.details.get("writeConcernErrors") or any(
+                    error.get("code") != 11000 for error in errors
+                ):
+                    raise
 
         try:
-            if method:
-                # Query a specific collection
-                collection_name = f"{MONGO_COLLECTION_PREFIX}{method}"
-                if collection_name in self.db.list_collection_names():
-                    collection = self.db[collection_name]
-                    for doc in collection.find({}, {"filename": 1, "created_at": 1, "updated_at": 1}):
-                        doc["method"] = method
-                        results.append(doc)
-            else:
-                # Query all collections
-                for collection_name in self.db.list_collection_names():
-                    if collection_name.startswith(MONGO_COLLECTION_PREFIX):
-                        method = collection_name[len(MONGO_COLLECTION_PREFIX):]
-                        collection = self.db[collection_name]
-                        for doc in collection.find({}, {"filename": 1, "created_at": 1, "updated_at": 1}):
-                            doc["method"] = method
-                            results.append(doc)
-
-            return results
+            for method, collection_name in self._reference_collection_names():
+                source = self.db[collection_name]
+                pass_started_at = time.time()
+
+                state = state_collection.find_one({"_id": collection_name}) if resume else None
+                if state is None:
+                    state = {"_id": collection_name, "started_at": pass_started_at, "copied": 0}
+                    state_collection.replace_one({"_id": collection_name}, state, upsert=True)
+
+                total = source.estimated_document_count()
+                copied = state["copied"]
+
+                # Bulk copy, checkpointed on the last copied _id
+                while True:
+                    query = {"_id": {"$gt": state["last_id"]}} if "last_id" in state else {}
+                    batch = list(source.find(query).sort("_id", 1).limit(batch_size))
+                    if not batch:
+                        break
+
+                    last_id = batch[-1]["_id"]
+                    copy_batch(method, batch)
+                    copied += len(batch)
+                    state.update(last_id=last_id, copied=copied)
+                    state_collection.update_one(
+                        {"_id": collection_name},
+                        {"$set": {"last_id": last_id, "copied": copied}}
+                    )
+                    if progress:
+                        progress(method, copied, total)
+
+                # Catch up with documents updated since the migration started
+                catch_up_since = state.get("synced_at", state["started_at"])
+                cursor = source.find({"updated_at": {"$gte": catch_up_since}}, batch_size=batch_size)
+                batch = []
+                for doc in cursor:
+                    batch.append(doc)
+                    if len(batch) >= batch_size:
+                        copy_batch(method, batch)
+                        batch = []
+                copy_batch(method, batch)
+
+                state_collection.update_one(
+                    {"_id": collection_name}, {"$set": {"synced_at": pass_started_at}}
+                )
+                copied_by_method[method] = copied
+
+            return copied_by_method
         except Exception as e:
-            print(f"Error listing reference data: {e}")
-            return []
-        finally:
-            if self.client:
-                self.client.close()
\ No newline at end of file
+            print(f"Error migrating reference data: {e}")
+            return copied_by_method
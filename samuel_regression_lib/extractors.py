@@ -2,9 +2,10 @@
 XML data extraction functionality for embedded XML-like text.
 """
 
-import xml.etree.ElementTree as ET
 import re
 
+from . import xml_backend
+
 class XMLExtractor:
     """
     Extracts data from XML files with embedded XML-like text.
@@ -23,7 +24,7 @@ class XMLExtractor:
         """
         try:
             # Parse the main XML
-            root = ET.fromstring(xml_data)
+            root = xml_backend.fromstring(xml_data)
             
             # Find Data section
             data_section = root.find(".//Data")
@@ -0,0 +1,187 @@
+"""
+Isolated extraction with per-file resource limits.
+
+An IsolatedExtractor runs XMLExtractor.extract_output in a worker process
+with a wall-clock limit, and on POSIX systems a CPU time and an address
+space limit, for every file. A pathological input (deeply nested
+elements, entity expansion, a <Data> blob with catastrophic regex
+backtracking) then fails with an ExtractionError naming the limit, and the
+next file is extracted by a fresh worker, instead of stalling the run.
+
+Workers are started with the "spawn" method, so scripts using isolated
+extraction must guard their entry point with `if __name__ == "__main__":`.
+"""
+
+import math
+import multiprocessing
+import signal
+
+from .config import EXTRACTION_TIMEOUT, EXTRACTION_CPU_LIMIT, EXTRACTION_MEMORY_LIMIT
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; only the wall-clock limit applies
+    resource = None
+
+
+class ExtractionError(Exception):
+    """Extraction of a file failed or exceeded one of its limits."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _limit_cpu(cpu_seconds):
+    """Let the worker use cpu_seconds more CPU time before SIGXCPU kills it."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker(connection, cpu_seconds, memory_bytes):
+    """
+    Extract the XML documents received on a connection until it is closed.
+
+    Sends ("ok", output_data) or ("error", reason) for every document.
+    """
+    from .extractors import XMLExtractor
+
+    if resource is not None and memory_bytes:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            memory_bytes = min(memory_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+
+    extractor = XMLExtractor()
+    while True:
+        try:
+            xml_data = connection.recv()
+            if resource is not None and cpu_seconds:
+                _limit_cpu(cpu_seconds)
+            connection.send(("ok", extractor.extract_output(xml_data)))
+        except EOFError:
+            return
+        except MemoryError:
+            connection.send(("error", "Memory limit exceeded"))
+            return  # The heap may be fragmented; let the next file start fresh
+        except RecursionError:
+            connection.send(("error", "Recursion limit exceeded (input nested too deeply)"))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class IsolatedExtractor:
+    """
+    Extracts output data in a worker process with per-file limits.
+
+    Has the extract_output() interface of XMLExtractor. The worker is
+    started on first use and reused until a file exceeds a limit.
+    """
+
+    def __init__(self, timeout=EXTRACTION_TIMEOUT, cpu_seconds=EXTRACTION_CPU_LIMIT,
+                 memory_bytes=EXTRACTION_MEMORY_LIMIT):
+        """
+        Initialize the extractor without starting a worker.
+
+        Args:
+            timeout: Wall-clock seconds allowed per file (0 = no limit)
+            cpu_seconds: CPU seconds allowed per file (0 = no limit; POSIX only)
+            memory_bytes: Address space of the worker in bytes (0 = no limit;
+                          POSIX only)
+        """
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._connection = None
+
+    def _start(self):
+        """Start a worker process."""
+        self._connection, child_connection = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker,
+            args=(child_connection, self.cpu_seconds, self.memory_bytes),
+            name="isolated-extractor",
+            daemon=True,
+        )
+        self._process.start()
+        child_connection.close()
+
+    def _discard_worker(self):
+        """Kill the worker, e.g. after it exceeded a limit."""
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join()
+            self._connection.close()
+        self._process = None
+        self._connection = None
+
+    def _exit_reason(self):
+        """Describe why the worker died."""
+        # The worker may have reported an error before closing the pipe
+        try:
+            if self._connection.poll(0):
+                status, value = self._connection.recv()
+                if status == "error":
+                    return value
+        except (EOFError, OSError):
+            pass
+
+        self._process.join(1.0)
+        exitcode = self._process.exitcode
+        if resource is not None and exitcode == -signal.SIGXCPU:
+            return f"CPU time limit of {self.cpu_seconds}s exceeded"
+        if exitcode == -signal.SIGKILL:
+            return "Worker killed (out of memory)"
+        return f"Worker exited unexpectedly (exit code {exitcode})"
+
+    def extract_output(self, xml_data):
+        """
+        Extract output data from an XML string in the worker process.
+
+        Args:
+            xml_data: XML data as string
+
+        Returns:
+            Dictionary containing extracted output data
+
+        Raises:
+            ExtractionError: If extraction failed or exceeded a limit
+        """
+        if self._process is None or not self._process.is_alive():
+            self._discard_worker()
+            self._start()
+
+        try:
+            self._connection.send(xml_data)
+            if self.timeout and not self._connection.poll(self.timeout):
+                self._discard_worker()
+                raise ExtractionError(f"Wall-clock limit of {self.timeout}s exceeded")
+            status, value = self._connection.recv()
+        except (EOFError, OSError):
+            reason = self._exit_reason()
+            self._discard_worker()
+            raise ExtractionError(reason)
+
+        if status != "ok":
+            raise ExtractionError(value)
+        return value
+
+    def close(self):
+        """Stop the worker process."""
+        if self._process is not None and self._process.is_alive():
+            self._connection.close()
+            self._process.join(1.0)
+        self._discard_worker()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
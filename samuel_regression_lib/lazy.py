@@ -0,0 +1,280 @@
+"""
+Lazily decoded BSON documents.
+
+The database layer receives reference documents as raw BSON bytes. A
+LazyDocument only scans the top-level element headers of those bytes and
+decodes a field when it is first accessed, so lookups that read a few
+RESULT scalars never pay for decoding the rest of the document. Arrays are
+counted without being decoded; their elements are decoded on first access.
+
+Documents holding element types the scanner does not know (deprecated ones
+such as undefined, regular expressions or DBPointers) are decoded as a whole
+with bson.decode instead.
+
+This is opt-in: Database only returns LazyDocuments with raw_bson
+(MONGO_RAW_BSON), which is off by default, so the default lookup and
+listing paths decode plain dicts and do not use this module. It pays off
+for callers reading a few fields of large documents; for a full comparison,
+which reads every RESULT value and the SLOPES, the gain is small (see
+benchmarks/bench_bson_decoding.py).
+"""
+
+import struct
+from collections.abc import Mapping, Sequence
+
+import bson
+
+_INT32 = struct.Struct("<i")
+
+# Size of fixed-size BSON values by element type
+_FIXED_SIZES = {
+    0x01: 8,  # double
+    0x07: 12,  # ObjectId
+    0x08: 1,  # boolean
+    0x09: 8,  # UTC datetime
+    0x0A: 0,  # null
+    0x10: 4,  # int32
+    0x11: 8,  # timestamp
+    0x12: 8,  # int64
+    0x13: 16,  # decimal128
+    0xFF: 0,  # min key
+    0x7F: 0,  # max key
+}
+# Types whose value starts with its int32 length (plus a fixed extra)
+_SIZED_TYPES = {
+    0x02: 4,  # string: length excludes the length field itself
+    0x0D: 4,  # JavaScript code
+    0x0E: 4,  # symbol
+    0x05: 5,  # binary: length excludes the length field and subtype
+    0x03: 0,  # embedded document: length includes itself
+    0x04: 0,  # array
+    0x0F: 0,  # code with scope
+}
+_DOCUMENT = 0x03
+_ARRAY = 0x04
+
+# Embedded documents up to this size are decoded in one C call on access,
+# which is cheaper than scanning them (e.g. RESULT with a few scalars)
+_EAGER_DOCUMENT_SIZE = 512
+
+
+class _UnsupportedType(ValueError):
+    """Raised by the scanner for element types whose size it cannot tell."""
+
+
+def _scan(data, start, end):
+    """
+    Locate the elements of a BSON document.
+
+    Args:
+        data: Bytes containing the document
+        start: Offset of the document's int32 length
+        end: Offset just past the document
+
+    Returns:
+        List of (name, type, element_start, value_start, element_end)
+    """
+    elements = []
+    position = start + 4
+    last = end - 1  # Trailing NUL of the document
+    while position < last:
+        element_type = data[position]
+        name_end = data.index(b"\x00", position + 1)
+        value_start = name_end + 1
+
+        size = _FIXED_SIZES.get(element_type)
+        if size is None:
+            extra = _SIZED_TYPES.get(element_type)
+            if extra is None:
+                raise _UnsupportedType(f"Unsupported BSON element type 0x{element_type:02x}")
+            size = _INT32.unpack_from(data, value_start)[0] + extra
+
+        element_end = value_start + size
+        elements.append((
+            data[position + 1:name_end].decode("utf-8"),
+            element_type, position, value_start, element_end,
+        ))
+        position = element_end
+    return elements
+
+
+def _count_array(data, start, end):
+    """
+    Count the elements of a BSON array without decoding them.
+
+    Array keys are the indexes "0", "1", ..., so the key lengths are known
+    and only the value sizes have to be read.
+    """
+    count = 0
+    position = start + 4
+    last = end - 1
+    unpack = _INT32.unpack_from
+    while position < last:
+        element_type = data[position]
+        value_start = position + len(str(count)) + 2
+
+        size = _FIXED_SIZES.get(element_type)
+        if size is None:
+            extra = _SIZED_TYPES.get(element_type)
+            if extra is None:
+                raise _UnsupportedType(f"Unsupported BSON element type 0x{element_type:02x}")
+            size = unpack(data, value_start)[0] + extra
+
+        position = value_start + size
+        count += 1
+    return count
+
+
+def _decode_element(data, element_start, element_end):
+    """Decode a single element into its Python value."""
+    element = data[element_start:element_end]
+    document = _INT32.pack(len(element) + 5) + element + b"\x00"
+    return next(iter(bson.decode(document).values()))
+
+
+class LazyArray(Sequence):
+    """
+    Read-only list of a BSON array that is decoded on first element access.
+
+    len() only walks the element headers.
+    """
+
+    __slots__ = ("_data", "_start", "_end", "_length", "_items")
+
+    def __init__(self, data, start, end):
+        self._data = data
+        self._start = start
+        self._end = end
+        self._length = None
+        self._items = None
+
+    def _decoded(self):
+        if self._items is None:
+            self._items = list(bson.decode(self._data[self._start:self._end]).values())
+        return self._items
+
+    def __len__(self):
+        if self._items is not None:
+            return len(self._items)
+        if self._length is None:
+            try:
+                self._length = _count_array(self._data, self._start, self._end)
+            except _UnsupportedType:
+                return len(self._decoded())
+        return self._length
+
+    def __getitem__(self, index):
+        return self._decoded()[index]
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return self._decoded() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._decoded())
+
+    def __reduce__(self):
+        return list, (self._decoded(),)
+
+
+class LazyDocument(Mapping):
+    """
+    Read-only mapping over a raw BSON document.
+
+    Large embedded documents are themselves LazyDocuments and arrays are
+    LazyArrays; scalars and small embedded documents are decoded when
+    accessed and then cached.
+    """
+
+    __slots__ = ("_data", "_start", "_end", "_elements", "_values")
+
+    def __init__(self, data, start=0, end=None):
+        """
+        Initialize the document.
+
+        Args:
+            data: Bytes containing the BSON document
+            start: Offset of the document within data
+            end: Offset just past the document (default: end of data)
+        """
+        self._data = data
+        self._start = start
+        self._end = len(data) if end is None else end
+        self._elements = None
+        self._values = {}
+
+    @classmethod
+    def from_raw(cls, document):
+        """
+        Wrap a raw BSON document returned by pymongo.
+
+        Args:
+            document: RawBSONDocument, or None
+
+        Returns:
+            LazyDocument over the same bytes; other values are returned as-is
+        """
+        raw = getattr(document, "raw", None)
+        if isinstance(raw, memoryview):
+            raw = raw.tobytes()  # Large documents are views into the reply
+        if isinstance(raw, bytes):
+            return cls(raw)
+        return document
+
+    def _index(self):
+        if self._elements is None:
+            try:
+                self._elements = {
+                    name: (element_type, element_start, value_start, element_end)
+                    for name, element_type, element_start, value_start, element_end
+                    in _scan(self._data, self._start, self._end)
+                }
+            except _UnsupportedType:
+                # Decode everything; __getitem__ then only reads self._values
+                self._values = bson.decode(self._data[self._start:self._end])
+                self._elements = dict.fromkeys(self._values)
+        return self._elements
+
+    def __getitem__(self, key):
+        elements = self._index()
+        if key in self._values:
+            return self._values[key]
+
+        element_type, element_start, value_start, element_end = elements[key]
+        if element_type == _DOCUMENT and element_end - value_start > _EAGER_DOCUMENT_SIZE:
+            value = LazyDocument(self._data, value_start, element_end)
+        elif element_type == _ARRAY:
+            value = LazyArray(self._data, value_start, element_end)
+        else:
+            value = _decode_element(self._data, element_start, element_end)
+
+        self._values[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __len__(self):
+        return len(self._index())
+
+    def __contains__(self, key):
+        return key in self._index()
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        return bson.decode, (self._data[self._start:self._end],)
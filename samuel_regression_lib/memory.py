@@ -0,0 +1,212 @@
+"""
+Memory tracking of regression runs with tracemalloc.
+
+A MemoryTracker records the peak of traced Python allocations per phase
+(connect, lookup, compare, report, and the caller's own spans such as
+extract) and per tested file. It names the top allocation sites when the
+run is summarized or a memory budget is exceeded, so that a run killed for
+running out of memory can be traced back to the stage responsible.
+
+tracemalloc slows allocation-heavy code down noticeably, so tracking is
+only on when a tracker is created.
+"""
+
+import heapq
+import linecache
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+from .config import MEMORY_BUDGET_ACTION, MEMORY_TOP_SITES, MEMORY_TOP_FILES
+
+ACTION_FAIL = "fail"
+ACTION_STREAM = "stream"
+
+# Phase whose peak counts as the peak of the file it carries
+FILE_PHASE = "file"
+
+# Allocations of the tracking itself are left out of the top sites
+_IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, "<frozen importlib._bootstrap>",
+                  "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def _reset_peak():
+    """
+    Reset the traced peak to the current size.
+
+    tracemalloc.reset_peak needs Python 3.9. Older versions clear the traces
+    instead, which resets both the current size and the peak to zero: peaks
+    are then measured from the start of each phase, and allocation sites only
+    cover what was allocated since.
+    """
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
+
+
+def format_bytes(size):
+    """Format a size in bytes for reports."""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024.0
+    return f"{size:.1f} GB"
+
+
+class MemoryTracker:
+    """
+    Peak traced allocations per phase and per file, with an optional budget.
+    """
+
+    def __init__(self, budget=0, action=MEMORY_BUDGET_ACTION, top_sites=MEMORY_TOP_SITES,
+                 top_files=MEMORY_TOP_FILES):
+        """
+        Start tracing allocations.
+
+        Args:
+            budget: Peak traced allocations in bytes above which the budget
+                    is exceeded (0 tracks without a budget)
+            action: What the run does once the budget is exceeded: "fail"
+                    stops testing further files, "stream" switches to the
+                    lower-memory path (no prefetching, results spooled to disk)
+            top_sites: Number of allocation sites named in reports
+            top_files: Number of files with the largest peaks kept for reports
+        """
+        if action not in (ACTION_FAIL, ACTION_STREAM):
+            raise ValueError(f"Unknown memory budget action '{action}'")
+
+        self.budget = budget
+        self.action = action
+        self.top_sites = top_sites
+        self.top_files = top_files
+
+        self.peak = 0
+        self.phase_peaks = {}
+        self.exceeded = False
+        self.exceeded_in = None
+        self.exceeded_sites = []
+        self._largest_files = []  # Min-heap of (peak, filename, method)
+        self._stack = []
+        self._lock = threading.Lock()
+
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        _reset_peak()
+
+    def stop(self):
+        """Stop tracing allocations, if this tracker started it."""
+        if self._started and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started = False
+
+    @contextmanager
+    def phase(self, name, **args):
+        """
+        Record the peak allocations of the enclosed block as one phase.
+
+        Phases may be nested; the peak of a nested phase counts towards the
+        phases enclosing it. The peak of a "file" phase (the file span of
+        RegressionTest.test_file) also counts as the peak of its file.
+
+        Args:
+            name: Phase name (e.g., "lookup")
+            **args: Details of the phase, e.g. filename and method
+        """
+        with self._lock:
+            current_peak = tracemalloc.get_traced_memory()[1]
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], current_peak)
+            _reset_peak()
+            entry = [name, 0]
+            self._stack.append(entry)
+        try:
+            yield
+        finally:
+            with self._lock:
+                peak = max(entry[1], tracemalloc.get_traced_memory()[1])
+                self._stack.pop()
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+                self.peak = max(self.peak, peak)
+                self.phase_peaks[name] = max(self.phase_peaks.get(name, 0), peak)
+
+                if name == FILE_PHASE:
+                    item = (peak, args.get("filename"), args.get("method"))
+                    if len(self._largest_files) < self.top_files:
+                        heapq.heappush(self._largest_files, item)
+                    elif item > self._largest_files[0]:
+                        heapq.heapreplace(self._largest_files, item)
+
+                over_budget = bool(self.budget) and peak > self.budget and not self.exceeded
+                if over_budget:
+                    self.exceeded = True
+                    self.exceeded_in = (name, args)
+
+            if over_budget:
+                self.exceeded_sites = self.allocation_sites()
+
+    @property
+    def largest_files(self):
+        """List of (peak, filename, method) tuples, largest peak first."""
+        with self._lock:
+            return sorted(self._largest_files, reverse=True)
+
+    def allocation_sites(self, limit=None):
+        """
+        Get the source lines holding the most traced memory right now.
+
+        Args:
+            limit: Number of sites (default: top_sites)
+
+        Returns:
+            List of (location, size in bytes, allocation count) tuples
+        """
+        if not tracemalloc.is_tracing():
+            return []
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        )
+        sites = []
+        for stat in snapshot.statistics("lineno")[:limit or self.top_sites]:
+            frame = stat.traceback[0]
+            sites.append((f"{frame.filename}:{frame.lineno}", stat.size, stat.count))
+        return sites
+
+    def summary(self):
+        """
+        Summarize the tracked peaks.
+
+        Returns:
+            List of report lines
+        """
+        budget = f" (budget {format_bytes(self.budget)})" if self.budget else ""
+        lines = [f"Memory: peak traced allocations {format_bytes(self.peak)}{budget}"]
+
+        if self.exceeded:
+            name, args = self.exceeded_in
+            details = ", ".join(f"{key}={value}" for key, value in args.items())
+            lines.append(f"  Budget exceeded in phase '{name}'" + (f" ({details})" if details else ""))
+
+        if self.phase_peaks:
+            lines.append("  Peak per phase:")
+            for name, peak in sorted(self.phase_peaks.items(), key=lambda item: -item[1]):
+                lines.append(f"    {name:15} {format_bytes(peak):>10}")
+
+        largest_files = self.largest_files
+        if largest_files:
+            lines.append("  Largest files:")
+            for peak, filename, method in largest_files:
+                lines.append(f"    {format_bytes(peak):>10}  {filename} ({method})")
+
+        sites = self.exceeded_sites if self.exceeded else self.allocation_sites()
+        if sites:
+            when = "when the budget was exceeded" if self.exceeded else "at the end of the run"
+            lines.append(f"  Top allocation sites {when}:")
+            for location, size, count in sites:
+                lines.append(f"    {format_bytes(size):>10} in {count:6} blocks  {location}")
+
+        return lines
@@ -0,0 +1,297 @@
+"""
+Latency metrics for database operations.
+
+Every Database records how long each operation waited on MongoDB in a
+histogram per (operation, collection, method). Operations slower than
+SLOW_OPERATION_SECONDS are also logged with their collection and filter.
+The histograms can be exported as a JSON summary or as a Prometheus
+textfile (for the node_exporter textfile collector), so that database-side
+slowdowns can be told apart from slowdowns in the code under test.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import SLOW_OPERATION_SECONDS, LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAME = "samuel_regression_db_operation_seconds"
+SLOW_METRIC_NAME = "samuel_regression_db_slow_operations_total"
+
+# Longest filter representation written to the slow-operation log
+_MAX_FILTER_LENGTH = 500
+
+_END = object()
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            bounds: Sorted upper bounds of the buckets in seconds; an
+                    implicit +Inf bucket follows the last one
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+    def observe(self, seconds):
+        """Record one observation."""
+        index = 0
+        while index < len(self.bounds) and seconds > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by interpolating within its bucket.
+
+        Args:
+            q: Quantile between 0.0 and 1.0
+
+        Returns:
+            Estimated latency in seconds (0.0 without observations)
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * max(0.0, rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+
+def _escape_label(value):
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_bound(bound):
+    """Format a bucket bound the way Prometheus clients do."""
+    return repr(float(bound))
+
+
+def _write_atomic(path, text):
+    """Write a file so that readers never see it half written."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+class DatabaseMetrics:
+    """
+    Thread-safe latency histograms per (operation, collection, method).
+    """
+
+    def __init__(self, slow_threshold=None, bounds=LATENCY_BUCKETS):
+        """
+        Initialize empty metrics.
+
+        Args:
+            slow_threshold: Seconds above which an operation is logged as
+                            slow (default SLOW_OPERATION_SECONDS; 0 disables)
+            bounds: Histogram bucket bounds in seconds
+        """
+        self.slow_threshold = SLOW_OPERATION_SECONDS if slow_threshold is None else slow_threshold
+        self.bounds = tuple(bounds)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation, collection, seconds, method=None, query=None):
+        """
+        Record the latency of one operation.
+
+        Args:
+            operation: Operation type (e.g., "lookup", "store", "list")
+            collection: Name of the collection the operation ran on
+            seconds: Time spent waiting on the database
+            method: Optional method name the operation was for
+            query: Optional filter, written to the log for slow operations
+        """
+        key = (operation, collection, method or "")
+        slow = bool(self.slow_threshold) and seconds >= self.slow_threshold
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram(self.bounds)
+            histogram.observe(seconds)
+            if slow:
+                histogram.slow += 1
+
+        if slow:
+            filter_text = repr(query)
+            if len(filter_text) > _MAX_FILTER_LENGTH:
+                filter_text = filter_text[:_MAX_FILTER_LENGTH] + "..."
+            logger.warning(
+                "Slow %s on '%s' took %.3fs (filter: %s)",
+                operation, collection, seconds, filter_text,
+            )
+
+    @contextmanager
+    def timed(self, operation, collection, method=None, query=None):
+        """Record the duration of the enclosed block as one operation."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, collection, time.perf_counter() - start, method, query)
+
+    def timed_cursor(self, open_cursor, operation, collection, method=None, query=None):
+        """
+        Iterate a cursor, recording only the time spent waiting on it.
+
+        Time the caller spends between items is not counted, so a slow
+        consumer does not show up as a slow database. The cursor is closed
+        when iteration ends or is abandoned.
+
+        Args:
+            open_cursor: Callable returning the cursor (its time is counted)
+            operation: Operation type (e.g., "list")
+            collection: Name of the collection the cursor reads
+            method: Optional method name the operation was for
+            query: Optional filter, written to the log for slow operations
+
+        Yields:
+            The items of the cursor
+        """
+        start = time.perf_counter()
+        cursor = open_cursor()
+        elapsed = time.perf_counter() - start
+        try:
+            iterator = iter(cursor)
+            while True:
+                start = time.perf_counter()
+                item = next(iterator, _END)
+                elapsed += time.perf_counter() - start
+                if item is _END:
+                    break
+                yield item
+        finally:
+            close = getattr(cursor, "close", None)
+            if close is not None:
+                close()
+            self.observe(operation, collection, elapsed, method, query)
+
+    def reset(self):
+        """Drop all recorded observations."""
+        with self._lock:
+            self._histograms.clear()
+
+    def _snapshot(self):
+        """Get a sorted copy of the histograms taken under the lock."""
+        with self._lock:
+            return sorted(
+                (key, histogram.counts[:], histogram.count, histogram.sum,
+                 histogram.max, histogram.slow)
+                for key, histogram in self._histograms.items()
+            )
+
+    def summary(self):
+        """
+        Summarize the recorded latencies.
+
+        Returns:
+            Dictionary with the slow threshold and one entry per
+            (operation, collection, method) with counts and quantiles
+        """
+        operations = []
+        for key, counts, count, total, maximum, slow in self._snapshot():
+            histogram = LatencyHistogram(self.bounds)
+            histogram.counts, histogram.count, histogram.sum, histogram.max = (
+                counts, count, total, maximum
+            )
+            operation, collection, method = key
+            operations.append({
+                "operation": operation,
+                "collection": collection,
+                "method": method or None,
+                "count": count,
+                "slow": slow,
+                "total_seconds": total,
+                "mean_seconds": total / count if count else 0.0,
+                "max_seconds": maximum,
+                "p50_seconds": histogram.quantile(0.50),
+                "p95_seconds": histogram.quantile(0.95),
+                "p99_seconds": histogram.quantile(0.99),
+            })
+
+        return {"slow_threshold_seconds": self.slow_threshold, "operations": operations}
+
+    def write_json(self, path):
+        """
+        Write the summary as JSON.
+
+        Args:
+            path: Path of the JSON file
+        """
+        _write_atomic(path, json.dumps(self.summary(), indent=2) + "\n")
+
+    def prometheus_text(self):
+        """
+        Render the histograms in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        snapshot = self._snapshot()
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent waiting on MongoDB per operation.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for (operation, collection, method), counts, count, total, _, _ in snapshot:
+            labels = (
+                f'operation="{_escape_label(operation)}",'
+                f'collection="{_escape_label(collection)}",'
+                f'method="{_escape_label(method)}"'
+            )
+            cumulative = 0
+            for bound, bucket_count in zip(self.bounds, counts):
+                cumulative += bucket_count
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {total!r}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {count}")
+
+        lines.append(f"# HELP {SLOW_METRIC_NAME} Operations slower than the slow threshold.")
+        lines.append(f"# TYPE {SLOW_METRIC_NAME} counter")
+        for (operation, collection, method), _, _, _, _, slow in snapshot:
+            lines.append(
+                f'{SLOW_METRIC_NAME}{{operation="{_escape_label(operation)}",'
+                f'collection="{_escape_label(collection)}",'
+                f'method="{_escape_label(method)}"}} {slow}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Write the histograms as a Prometheus textfile.
+
+        Args:
+            path: Path of the .prom file (written atomically)
+        """
+        _write_atomic(path, self.prometheus_text())
@@ -0,0 +1,116 @@
+"""
+Performance regression checks for the scripts under test.
+
+Runtime and peak memory measurements are kept as a rolling baseline with
+each reference. A new measurement is a regression when it is both
+statistically significant (its z-score against the baseline exceeds
+PERFORMANCE_Z_THRESHOLD) and practically significant (it exceeds the
+baseline mean by more than PERFORMANCE_TOLERANCE).
+"""
+
+import statistics
+
+from .config import PERFORMANCE_TOLERANCE, PERFORMANCE_Z_THRESHOLD, PERFORMANCE_MIN_SAMPLES
+
+# Measurements checked against the baseline, with their display units
+METRICS = {
+    "runtime": ("s", 1.0),
+    "peak_memory": ("MB", 1024.0 * 1024.0),
+}
+
+
+def check_measurement(samples, value, tolerance=PERFORMANCE_TOLERANCE,
+                      z_threshold=PERFORMANCE_Z_THRESHOLD, min_samples=PERFORMANCE_MIN_SAMPLES):
+    """
+    Check a measurement against its baseline samples.
+
+    Args:
+        samples: Previous measurements (the rolling baseline)
+        value: New measurement
+        tolerance: Allowed relative increase over the baseline mean
+        z_threshold: z-score above which an increase is significant
+        min_samples: Baseline size needed before anything is flagged
+
+    Returns:
+        Dictionary with the baseline statistics, the ratio and z-score of
+        the measurement, and whether it is a regression ("checked" is False
+        while the baseline is too small)
+    """
+    result = {
+        "value": value,
+        "samples": len(samples),
+        "mean": None,
+        "stdev": None,
+        "ratio": None,
+        "z_score": None,
+        "checked": len(samples) >= max(1, min_samples),
+        "regressed": False,
+    }
+    if not samples:
+        return result
+
+    mean = sum(samples) / len(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    result["mean"] = mean
+    result["stdev"] = stdev
+    if mean > 0:
+        result["ratio"] = value / mean
+    if stdev > 0:
+        result["z_score"] = (value - mean) / stdev
+
+    if result["checked"]:
+        exceeds_tolerance = value > mean * (1.0 + tolerance)
+        # A perfectly stable baseline makes every increase significant
+        significant = result["z_score"] is None or result["z_score"] > z_threshold
+        result["regressed"] = exceeds_tolerance and significant
+
+    return result
+
+
+def check_performance(baseline, measurements):
+    """
+    Check several measurements against a stored baseline.
+
+    Args:
+        baseline: Dictionary mapping metric name to previous measurements
+        measurements: Dictionary mapping metric name to the new value;
+                      None values are skipped
+
+    Returns:
+        Dictionary mapping metric name to the check_measurement() result
+    """
+    return {
+        name: check_measurement(baseline.get(name, []), value)
+        for name, value in measurements.items()
+        if value is not None
+    }
+
+
+def format_check(name, check):
+    """
+    Format a measurement check for the case builder.
+
+    Args:
+        name: Metric name ("runtime" or "peak_memory")
+        check: Result of check_measurement()
+
+    Returns:
+        One line describing the check
+    """
+    unit, scale = METRICS.get(name, ("", 1.0))
+    value = f"{check['value'] / scale:.3f}{unit}"
+
+    if not check["checked"]:
+        return (
+            f"{name:15} | Actual: {value:>10} | Baseline: {check['samples']} of "
+            f"{PERFORMANCE_MIN_SAMPLES} samples, not checked"
+        )
+
+    status = "FAIL" if check["regressed"] else "PASS"
+    z_score = f"{check['z_score']:.1f}" if check["z_score"] is not None else "n/a"
+    ratio = f"{check['ratio']:.2f}x" if check["ratio"] is not None else "n/a"
+    return (
+        f"{name:15} | Baseline: {check['mean'] / scale:.3f}{unit} "
+        f"± {check['stdev'] / scale:.3f}{unit} (n={check['samples']}) | "
+        f"Actual: {value} | {ratio}, z={z_score} | {status}"
+    )
@@ -0,0 +1,215 @@
+"""
+Background prefetching of reference data for sequential test_file calls.
+
+When the caller knows which files it will test next, a background thread
+fetches their references a window ahead in batched queries, so database
+latency overlaps with the caller's own computation.
+"""
+
+import threading
+from collections import OrderedDict
+
+from .config import PREFETCH_WINDOW, PREFETCH_BATCH_SIZE, PREFETCH_STOP_TIMEOUT
+
+# Marks a reference that was fetched and does not exist
+MISSING = object()
+
+
+class ReferencePrefetcher:
+    """
+    Fetches upcoming references on a background thread into a bounded buffer.
+
+    Up to `window` upcoming keys are read ahead of the fetches, and at most
+    `window` references are buffered or in flight at any time. A reference
+    is handed out once; references that the caller skips past are dropped.
+    A key that is not among the keys read ahead is a miss right away, so the
+    caller never waits for files outside the hint.
+    """
+
+    def __init__(self, database, upcoming, window=PREFETCH_WINDOW, batch_size=PREFETCH_BATCH_SIZE,
+                 tracer=None):
+        """
+        Initialize the prefetcher and start its thread.
+
+        Args:
+            database: Connected reference backend with get_reference_data_many
+            upcoming: Iterable of (filename, method) tuples in test order
+            window: Maximum number of references buffered or in flight, and
+                    of upcoming keys read ahead of them
+            batch_size: Maximum number of references fetched per query
+            tracer: Optional Tracer recording a span per fetched batch
+        """
+        self.database = database
+        self.window = max(1, window)
+        self.batch_size = max(1, batch_size)
+        self.tracer = tracer
+        self.hits = 0
+        self.misses = 0
+
+        self._upcoming = iter(upcoming)
+        self._cond = threading.Condition()
+        self._buffer = {}  # key -> (sequence, output_data or MISSING)
+        self._inflight = {}  # key -> sequence
+        self._pending = OrderedDict()  # key -> sequence, read but not fetched yet
+        self._skip = set()  # keys already served directly to the caller
+        self._sequence = 0
+        self._reading = True  # The thread starts by reading upcoming keys
+        self._upcoming_done = False
+        self._stopped = False
+
+        self._thread = threading.Thread(target=self._run, name="reference-prefetch", daemon=True)
+        self._thread.start()
+
+    def _occupancy(self):
+        return len(self._buffer) + len(self._inflight)
+
+    def _next_step(self):
+        """
+        Choose the next step of the thread; called with the lock held.
+
+        Returns:
+            ("read", count), ("fetch", keys) or None when nothing is left
+        """
+        while not self._stopped:
+            can_read = not self._upcoming_done and len(self._pending) < self.window
+            room = min(self.batch_size, self.window - self._occupancy())
+            can_fetch = bool(self._pending) and room > 0
+
+            # Keys are read first, so that the keys read ahead stay in front
+            # of the caller even when it skips files
+            if can_read:
+                self._reading = True
+                return "read", min(self.batch_size, self.window - len(self._pending))
+
+            self._reading = False
+            if can_fetch:
+                batch = []
+                while self._pending and len(batch) < room:
+                    key, sequence = self._pending.popitem(last=False)
+                    self._inflight[key] = sequence
+                    batch.append(key)
+                return "fetch", batch
+
+            if self._upcoming_done and not self._pending:
+                return None
+            self._cond.wait()
+
+        self._reading = False
+        return None
+
+    def _run(self):
+        """Read upcoming keys ahead and fetch them batch by batch."""
+        try:
+            while True:
+                with self._cond:
+                    step = self._next_step()
+                if step is None:
+                    return
+                action, argument = step
+
+                if action == "read":
+                    # The iterator may be slow, so it is read outside the lock
+                    keys = []
+                    for key in self._upcoming:
+                        keys.append(tuple(key))
+                        if len(keys) >= argument:
+                            break
+
+                    with self._cond:
+                        self._reading = False
+                        if len(keys) < argument:
+                            self._upcoming_done = True
+                        for key in keys:
+                            if key in self._skip:
+                                self._skip.discard(key)
+                            elif key not in self._inflight and key not in self._buffer \
+                                    and key not in self._pending:
+                                self._pending[key] = self._sequence
+                                self._sequence += 1
+                        self._cond.notify_all()
+                    continue
+
+                found = self._fetch(argument)
+
+                with self._cond:
+                    for key in argument:
+                        sequence = self._inflight.pop(key)
+                        if not self._stopped:
+                            self._buffer[key] = (sequence, found.get(key, MISSING))
+                    self._cond.notify_all()
+        except Exception as e:
+            # Nothing of the failed batch is buffered: the caller looks those
+            # files up itself instead of taking them as missing
+            print(f"Error prefetching reference data: {e}")
+            with self._cond:
+                self._inflight.clear()
+                self._pending.clear()
+                self._reading = False
+                self._upcoming_done = True
+                self._cond.notify_all()
+
+    def _fetch(self, batch):
+        """Fetch one batch of references, traced when there is a tracer."""
+        if self.tracer is None:
+            return self.database.get_reference_data_many(batch)
+        with self.tracer.span("prefetch", references=len(batch)):
+            return self.database.get_reference_data_many(batch)
+
+    def _drop_before(self, sequence):
+        """Drop the references the caller skipped past; called with the lock held."""
+        for stale in [k for k, (s, _) in self._buffer.items() if s < sequence]:
+            del self._buffer[stale]
+        for stale in [k for k, s in self._pending.items() if s < sequence]:
+            del self._pending[stale]
+        self._cond.notify_all()
+
+    def get(self, filename, method):
+        """
+        Take a prefetched reference, waiting for it if it is on its way.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Returns:
+            Tuple of (hit, output_data). On a hit, output_data is the
+            reference or MISSING if it does not exist. On a miss the caller
+            must fetch the reference itself.
+        """
+        key = (filename, method)
+        with self._cond:
+            while True:
+                if key in self._buffer:
+                    sequence, output_data = self._buffer.pop(key)
+                    self._drop_before(sequence)
+                    self.hits += 1
+                    return True, output_data
+
+                sequence = self._inflight.get(key, self._pending.get(key))
+                if sequence is None and (self._stopped or not self._reading):
+                    # Not among the upcoming keys read so far: the caller
+                    # fetches it directly instead of waiting
+                    self._skip.add(key)
+                    self.misses += 1
+                    return False, None
+
+                if sequence is not None:
+                    # Make room for it, in case the window is full
+                    self._drop_before(sequence)
+                self._cond.wait()
+
+    def stop(self, timeout=PREFETCH_STOP_TIMEOUT):
+        """
+        Stop prefetching, drop the buffer and wait for the thread to exit.
+
+        Args:
+            timeout: Seconds to wait for a fetch or read in progress
+        """
+        with self._cond:
+            self._stopped = True
+            self._buffer.clear()
+            self._pending.clear()
+            self._cond.notify_all()
+
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
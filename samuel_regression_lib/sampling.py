@@ -0,0 +1,256 @@
+"""
+Stratified sampling for quick regression checks.
+
+A quick check tests a deterministic sample of the references of each method
+(each method is one stratum) instead of every reference. Files that failed
+recently or whose reference changed recently are more likely to be picked.
+When a history file is given, the outcome of every tested file is kept in
+it so that later quick checks can favour recent failures.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+
+from .config import (
+    QUICK_FILE_BUDGET, QUICK_TIME_BUDGET, QUICK_SEED, QUICK_HISTORY_PATH,
+    QUICK_FAILURE_WEIGHT, QUICK_CHANGE_WEIGHT, QUICK_RECENT_SECONDS,
+)
+
+# z-score of the two-sided 95% interval used for the extrapolated bound
+CONFIDENCE_Z = 1.96
+
+
+def load_history(path):
+    """
+    Load the local test history.
+
+    Args:
+        path: Path to the history file
+
+    Returns:
+        Dictionary mapping method to {filename: history entry}
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_history(path, history):
+    """
+    Save the local test history.
+
+    Args:
+        path: Path to the history file
+        history: Dictionary mapping method to {filename: history entry}
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(history, f)
+    os.replace(temp_path, path)
+
+
+def sample_weight(reference, history_entry, now):
+    """
+    Get the sampling weight of a reference.
+
+    Args:
+        reference: Reference listing entry with "updated_at"
+        history_entry: History entry of the file, or None
+        now: Current timestamp
+
+    Returns:
+        Positive weight; higher weights are more likely to be sampled
+    """
+    weight = 1.0
+    if history_entry and now - history_entry.get("failed_at", 0) <= QUICK_RECENT_SECONDS:
+        weight *= QUICK_FAILURE_WEIGHT
+    if now - reference.get("updated_at", 0) <= QUICK_RECENT_SECONDS:
+        weight *= QUICK_CHANGE_WEIGHT
+    return weight
+
+
+def select_sample(references, budget, seed, history, now):
+    """
+    Deterministically pick a weighted sample without replacement.
+
+    Uses weighted reservoir keys (u ** (1 / weight)) where u is derived from
+    a hash of the seed and key, so the same inputs always give the same
+    sample.
+
+    Args:
+        references: List of reference listing entries of one method
+        budget: Maximum number of files to pick
+        seed: Seed string
+        history: History of the method, {filename: history entry}
+        now: Current timestamp
+
+    Returns:
+        Set of sampled filenames
+    """
+    keyed = []
+    for reference in references:
+        filename = reference["filename"]
+        digest = hashlib.sha256(
+            f"{seed}:{reference['method']}:{filename}".encode("utf-8")
+        ).digest()
+        u = (int.from_bytes(digest[:8], "big") + 1) / (2 ** 64 + 2)
+        weight = sample_weight(reference, history.get(filename), now)
+        keyed.append((u ** (1.0 / weight), filename))
+
+    keyed.sort(reverse=True)
+    return {filename for _, filename in keyed[:budget]}
+
+
+def failure_upper_bound(failures, tested, population):
+    """
+    Upper bound of the failure rate among untested references.
+
+    Wilson score interval with a finite population correction. Because the
+    sample is weighted toward risky files, the bound is conservative.
+
+    Args:
+        failures: Number of failed files in the sample
+        tested: Number of tested files
+        population: Number of references of the method
+
+    Returns:
+        Upper bound of the failure rate (0.0 to 1.0)
+    """
+    if tested == 0:
+        return 1.0
+    if population <= 1 or tested >= population:
+        return failures / tested
+
+    rate = failures / tested
+    z2 = CONFIDENCE_Z ** 2
+    correction = math.sqrt((population - tested) / (population - 1))
+    margin = CONFIDENCE_Z * math.sqrt(rate * (1 - rate) / tested + z2 / (4 * tested ** 2))
+    upper = (rate + z2 / (2 * tested) + margin * correction) / (1 + z2 / tested)
+    return min(1.0, upper)
+
+
+class QuickSampler:
+    """
+    Selects and tracks the files tested by a quick check.
+    """
+
+    def __init__(self, database, budget=None, time_budget=None, seed=None, history_path=None):
+        """
+        Initialize the sampler.
+
+        Args:
+            database: Reference backend used to list the references
+            budget: Files tested per method (default QUICK_FILE_BUDGET)
+            time_budget: Seconds after the first test after which no more
+                         files are tested (default QUICK_TIME_BUDGET)
+            seed: Seed of the deterministic sample (default QUICK_SEED)
+            history_path: Path of the local history file (default
+                          QUICK_HISTORY_PATH); without one, no history is
+                          read or written
+        """
+        self.database = database
+        self.budget = budget if budget is not None else QUICK_FILE_BUDGET
+        self.time_budget = time_budget if time_budget is not None else QUICK_TIME_BUDGET
+        self.seed = seed if seed is not None else QUICK_SEED
+        self.history_path = history_path or QUICK_HISTORY_PATH
+        self.history = load_history(self.history_path) if self.history_path else {}
+        self._history_changed = False
+
+        self._samples = {}
+        self._population = {}
+        self._tested = {}
+        self._failed = {}
+        self._deadline = None
+
+    def sample(self, method):
+        """
+        Get the sampled filenames of a method.
+
+        Args:
+            method: Method name (e.g., "lq")
+
+        Returns:
+            Set of filenames to test
+        """
+        if method not in self._samples:
+            references = list(self.database.iter_reference_data(method))
+            self._population[method] = len(references)
+            self._samples[method] = select_sample(
+                references, self.budget, self.seed, self.history.get(method, {}), time.time()
+            )
+        return self._samples[method]
+
+    def should_test(self, filename, method):
+        """
+        Check whether a file is part of the quick check.
+
+        Call this before producing the output of a file to avoid computing
+        outputs that will not be tested.
+
+        Args:
+            filename: Name of the input file
+            method: Method name (e.g., "lq")
+
+        Returns:
+            True if the file is sampled and the time budget is not used up
+        """
+        if self._deadline is None:
+            self._deadline = time.time() + self.time_budget if self.time_budget else float("inf")
+        elif time.time() > self._deadline:
+            return False
+
+        return filename in self.sample(method)
+
+    def record(self, filename, method, passed):
+        """
+        Record the outcome of a tested file.
+
+        Args:
+            filename: Name of the input file
+            method: Method name (e.g., "lq")
+            passed: Whether the comparison passed
+        """
+        self._tested[method] = self._tested.get(method, 0) + 1
+        entry = self.history.setdefault(method, {}).setdefault(filename, {})
+        entry["tested_at"] = time.time()
+        self._history_changed = True
+        if not passed:
+            self._failed[method] = self._failed.get(method, 0) + 1
+            entry["failed_at"] = entry["tested_at"]
+
+    def save(self):
+        """Persist the history of this run, if there is a history file and it changed."""
+        if not self.history_path or not self._history_changed:
+            return
+        try:
+            save_history(self.history_path, self.history)
+            self._history_changed = False
+        except OSError as e:
+            print(f"Could not save quick check history: {e}")
+
+    def summary(self):
+        """
+        Summarize the quick check per method.
+
+        Returns:
+            List of summary lines
+        """
+        lines = []
+        for method in sorted(self._samples):
+            population = self._population[method]
+            tested = self._tested.get(method, 0)
+            failed = self._failed.get(method, 0)
+            untested = population - tested
+            upper = failed + math.ceil(failure_upper_bound(failed, tested, population) * untested)
+
+            lines.append(
+                f"Quick check '{method}': tested {tested} of {population} references, "
+                f"{failed} failed. 95% confidence that at most {upper} of {population} "
+                f"references fail ({untested} untested)."
+            )
+        return lines
@@ -0,0 +1,387 @@
+"""
+Shared-memory reference store for multi-process regression runs.
+
+The parent process decodes the references once into a single
+multiprocessing.shared_memory block of float64 values. Each reference
+occupies a contiguous run of values:
+
+    RESULT values (in RESULT_KEYS order) | SLOPES as (Pos, Sensor) pairs
+
+An offset index maps (filename, method) to its run. Workers attach to the
+block by name and read references through zero-copy views, so no worker
+fetches or decodes references itself and the data exists once in memory.
+
+Typical use:
+
+    with SharedReferenceStore.from_database(Database(), methods=["lq"]) as store:
+        with multiprocessing.Pool(initializer=init_worker, initargs=(store.handle,)) as pool:
+            pool.map(run_file, files)
+
+where each worker builds RegressionTest(database=worker_store()).
+
+multiprocessing.shared_memory needs Python 3.8. On older versions the
+store keeps the block in a private buffer and the handle carries a copy of
+it, so each worker holds its own copy of the decoded references.
+"""
+
+import math
+from array import array
+from collections.abc import Mapping, Sequence
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+RESULT_KEYS = ("START", "END", "WIDTH", "HEIGHT_MIN", "HEIGHT_MAX", "HEIGHT_MEAN", "ANGLE")
+SLOPE_KEYS = ("Pos", "Sensor")
+
+# Integers up to this magnitude round-trip exactly through float64
+_MAX_EXACT_INT = 2 ** 53
+
+_worker_store = None
+
+
+class _ProcessBlock:
+    """Per-process stand-in for a SharedMemory block (Python < 3.8)."""
+
+    name = None
+
+    def __init__(self, data):
+        self.buf = bytearray(data)
+
+    def close(self):
+        pass
+
+    def unlink(self):
+        pass
+
+
+class _Entry:
+    """Index entry of one reference in the shared block."""
+
+    __slots__ = ("offset", "result_keys", "slope_count", "int_mask", "extras", "fallback")
+
+    def __init__(self, offset, result_keys, slope_count, int_mask, extras, fallback=None):
+        self.offset = offset
+        self.result_keys = result_keys
+        self.slope_count = slope_count  # None when the reference has no SLOPES
+        self.int_mask = int_mask  # Bit i set: value i was an int
+        self.extras = extras  # Non-numeric values by position, or None
+        self.fallback = fallback  # Whole output_data when it is not in the flat layout
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+def _is_flat(output_data):
+    """Check whether output data fits the flat RESULT/SLOPES layout."""
+    if not isinstance(output_data, Mapping) or set(output_data) - {"RESULT", "SLOPES"}:
+        return False
+    if not isinstance(output_data.get("RESULT", {}), Mapping):
+        return False
+    slopes = output_data.get("SLOPES", [])
+    return isinstance(slopes, Sequence) and not isinstance(slopes, str) and all(
+        isinstance(slope, Mapping) and tuple(slope) == SLOPE_KEYS for slope in slopes
+    )
+
+
+def _encode(output_data, values):
+    """
+    Append the values of a reference to the flat array.
+
+    Args:
+        output_data: Reference output data
+        values: array('d') to append to
+
+    Returns:
+        _Entry describing where the reference was stored
+    """
+    offset = len(values)
+    if not _is_flat(output_data):
+        return _Entry(offset, (), None, 0, None, fallback=output_data)
+
+    result = output_data.get("RESULT", {})
+    result_keys = tuple(result)
+    if result_keys == RESULT_KEYS:
+        result_keys = RESULT_KEYS  # Share one tuple so the index pickles compactly
+
+    flat = [result[key] for key in result_keys]
+    slopes = output_data.get("SLOPES")
+    if slopes is not None:
+        for slope in slopes:
+            flat.append(slope["Pos"])
+            flat.append(slope["Sensor"])
+
+    int_mask = 0
+    extras = None
+    for position, value in enumerate(flat):
+        if isinstance(value, float):
+            values.append(value)
+        elif isinstance(value, int) and not isinstance(value, bool) and abs(value) <= _MAX_EXACT_INT:
+            values.append(float(value))
+            int_mask |= 1 << position
+        else:
+            values.append(math.nan)
+            if extras is None:
+                extras = {}
+            extras[position] = value
+
+    return _Entry(
+        offset, result_keys, len(slopes) if slopes is not None else None, int_mask, extras
+    )
+
+
+class _SlopesView(Sequence):
+    """Zero-copy sequence view of the SLOPES of one reference."""
+
+    def __init__(self, view, entry):
+        self._view = view
+        self._entry = entry
+
+    def __len__(self):
+        return self._entry.slope_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("slope index out of range")
+
+        position = len(self._entry.result_keys) + 2 * index
+        return {
+            "Pos": _value(self._view, self._entry, position),
+            "Sensor": _value(self._view, self._entry, position + 1),
+        }
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+
+def _value(view, entry, position):
+    """Decode the value at a position of a reference."""
+    if entry.extras is not None and position in entry.extras:
+        return entry.extras[position]
+    value = view[entry.offset + position]
+    return int(value) if entry.int_mask >> position & 1 else value
+
+
+class ReferenceView(Mapping):
+    """
+    Read-only output data of one reference backed by the shared block.
+
+    Behaves like the output_data dictionary stored in the database.
+    """
+
+    def __init__(self, view, entry):
+        self._view = view
+        self._entry = entry
+
+    def __getitem__(self, key):
+        entry = self._entry
+        if key == "RESULT":
+            return {
+                name: _value(self._view, entry, position)
+                for position, name in enumerate(entry.result_keys)
+            }
+        if key == "SLOPES" and entry.slope_count is not None:
+            return _SlopesView(self._view, entry)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield "RESULT"
+        if self._entry.slope_count is not None:
+            yield "SLOPES"
+
+    def __len__(self):
+        return 1 if self._entry.slope_count is None else 2
+
+
+class SharedReferenceStore:
+    """
+    References decoded once into shared memory and read zero-copy.
+
+    Provides the lookup methods of Database, so an attached store can be
+    passed to RegressionTest(database=...) in worker processes.
+    """
+
+    def __init__(self, shm, index, owner):
+        """
+        Initialize the store; use create(), from_database() or attach().
+
+        Args:
+            shm: SharedMemory block holding the values
+            index: Dictionary mapping (filename, method) to _Entry
+            owner: Whether this process created (and must unlink) the block
+        """
+        self._shm = shm
+        self._index = index
+        self._owner = owner
+        self._values = memoryview(shm.buf).cast("d")
+
+    @classmethod
+    def create(cls, references):
+        """
+        Decode references into a new shared memory block.
+
+        Args:
+            references: Iterable of ((filename, method), output_data)
+
+        Returns:
+            SharedReferenceStore owning the block
+        """
+        values = array("d")
+        index = {}
+        for key, output_data in references:
+            index[key] = _encode(output_data, values)
+
+        if shared_memory is None:
+            return cls(_ProcessBlock(values.tobytes()), index, owner=True)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(values) * values.itemsize))
+        shm.buf[:len(values) * values.itemsize] = values.tobytes()
+        return cls(shm, index, owner=True)
+
+    @classmethod
+    def from_database(cls, database, keys=None, methods=None):
+        """
+        Load references from a database into a new shared memory block.
+
+        Args:
+            database: Reference backend (Database or SnapshotDatabase)
+            keys: Optional iterable of (filename, method) tuples to load
+            methods: Optional list of methods to load completely; used when
+                     keys is None (default: all methods)
+
+        Returns:
+            SharedReferenceStore owning the block
+        """
+        if keys is not None:
+            return cls.create(database.get_reference_data_many(keys).items())
+
+        def references():
+            for method in methods or [None]:
+                for doc in database.iter_reference_data(method, include_output=True):
+                    yield (doc["filename"], doc["method"]), doc.get("output_data")
+
+        return cls.create(references())
+
+    @property
+    def handle(self):
+        """Picklable handle for attach() in worker processes."""
+        if self._shm.name is None:
+            return None, self._index, bytes(self._shm.buf)  # Copy for each worker
+        return self._shm.name, self._index
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Attach to a store created by another process.
+
+        Args:
+            handle: Value of the creating store's handle property
+
+        Returns:
+            SharedReferenceStore reading the same block
+        """
+        name, index = handle[:2]
+        if name is None:
+            return cls(_ProcessBlock(handle[2]), index, owner=False)
+        return cls(shared_memory.SharedMemory(name=name), index, owner=False)
+
+    def __len__(self):
+        return len(self._index)
+
+    def test_connection(self):
+        """The store is always available once created or attached."""
+        return True
+
+    def get_reference_data(self, filename, method):
+        """
+        Get reference data for a specific file and method.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Returns:
+            ReferenceView over the shared block if found, None otherwise
+        """
+        entry = self._index.get((filename, method))
+        if entry is None:
+            return None
+        if entry.fallback is not None:
+            return entry.fallback
+        return ReferenceView(self._values, entry)
+
+    def get_reference_data_many(self, keys):
+        """
+        Get reference data for many files.
+
+        Args:
+            keys: Iterable of (filename, method) tuples
+
+        Returns:
+            Dictionary mapping (filename, method) to reference output data,
+            containing only the references that were found
+        """
+        found = {}
+        for filename, method in keys:
+            output_data = self.get_reference_data(filename, method)
+            if output_data is not None:
+                found[(filename, method)] = output_data
+        return found
+
+    def close(self):
+        """Detach from the block, and free it if this process created it."""
+        if self._shm is None:
+            return
+
+        self._values.release()
+        try:
+            self._shm.close()
+        except BufferError:
+            # Views handed out are still alive; the mapping goes with them
+            pass
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def init_worker(handle):
+    """
+    Pool initializer that attaches the worker to a shared store.
+
+    Args:
+        handle: Value of SharedReferenceStore.handle from the parent
+    """
+    global _worker_store
+    _worker_store = SharedReferenceStore.attach(handle)
+
+
+def worker_store():
+    """
+    Get the store attached by init_worker in this worker process.
+
+    Returns:
+        The attached SharedReferenceStore
+    """
+    if _worker_store is None:
+        raise RuntimeError("init_worker() has not been called in this process")
+    return _worker_store
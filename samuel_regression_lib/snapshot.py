@@ -0,0 +1,463 @@
+"""
+Memory-mapped reference snapshots for running without a MongoDB server.
+
+A snapshot file holds the reference output data for a set of methods in a
+compact, indexed layout that is read through mmap:
+
+    header | data records | sorted index | metadata (JSON)
+
+The header is HEADER_FORMAT. Each data record is the UTF-8 key
+("<method>\\0<filename>") followed by the canonical JSON of output_data.
+The index is a table of INDEX_FORMAT entries sorted by key, so a lookup is a
+binary search over the mapped file and only the requested record is decoded.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+from .comparators import canonical_json
+
+SNAPSHOT_MAGIC = b"SRSNAP01"
+SNAPSHOT_VERSION = 1
+
+# magic, version, entry count, index offset, metadata offset, metadata length
+HEADER_FORMAT = "<8sIIQQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# key offset, key length, data offset, data length, created_at, updated_at
+INDEX_FORMAT = "<QIQIdd"
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_FORMAT)
+
+KEY_SEPARATOR = b"\0"
+
+
+def _make_key(filename, method):
+    """Build the sort key of a reference."""
+    return method.encode("utf-8") + KEY_SEPARATOR + filename.encode("utf-8")
+
+
+def _split_key(key):
+    """Split a sort key into (filename, method)."""
+    method, filename = key.split(KEY_SEPARATOR, 1)
+    return filename.decode("utf-8"), method.decode("utf-8")
+
+
+class SnapshotDatabase:
+    """
+    Read-only reference backend over a memory-mapped snapshot file.
+
+    Provides the lookup and listing methods of Database, so it can be passed
+    to RegressionTest in place of a MongoDB connection.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the snapshot backend.
+
+        Args:
+            path: Path to the snapshot file
+        """
+        self.path = path
+        self.metadata = {}
+        self.entry_count = 0
+        self._file = None
+        self._map = None
+        self._index_offset = 0
+
+    def _open(self):
+        """
+        Map the snapshot file, if it is not mapped yet.
+
+        Returns:
+            True if the snapshot is readable, False otherwise
+        """
+        if self._map is not None:
+            return True
+
+        try:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, version, count, index_offset, meta_offset, meta_length = struct.unpack_from(
+                HEADER_FORMAT, self._map, 0
+            )
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"'{self.path}' is not a version {SNAPSHOT_VERSION} snapshot")
+
+            self.entry_count = count
+            self._index_offset = index_offset
+            self.metadata = json.loads(self._map[meta_offset:meta_offset + meta_length])
+            return True
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Snapshot error: {e}")
+            self.close()
+            return False
+
+    def close(self):
+        """Unmap and close the snapshot file."""
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = None
+        self._file = None
+
+    def test_connection(self):
+        """
+        Test that the snapshot can be read.
+
+        Returns:
+            True if the snapshot is readable, False otherwise
+        """
+        success = self._open()
+        if success:
+            print(f"Snapshot '{self.path}' loaded ({self.entry_count} references)")
+        else:
+            print(f"Snapshot '{self.path}' could not be loaded")
+        return success
+
+    def _entry(self, position):
+        """Read the index entry at a position."""
+        return struct.unpack_from(
+            INDEX_FORMAT, self._map, self._index_offset + position * INDEX_ENTRY_SIZE
+        )
+
+    def _key(self, entry):
+        """Read the key of an index entry."""
+        return self._map[entry[0]:entry[0] + entry[1]]
+
+    def _find(self, key):
+        """
+        Binary search the index for a key.
+
+        Args:
+            key: Sort key to look for
+
+        Returns:
+            Position of the first entry whose key is >= key
+        """
+        low, high = 0, self.entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(self._entry(middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get_reference_bytes(self, filename, method):
+        """
+        Get the raw canonical JSON of a reference without decoding it.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Returns:
+            JSON bytes if found, None otherwise
+        """
+        if not self._open():
+            return None
+
+        key = _make_key(filename, method)
+        position = self._find(key)
+        if position >= self.entry_count:
+            return None
+
+        entry = self._entry(position)
+        if self._key(entry) != key:
+            return None
+        return self._map[entry[2]:entry[2] + entry[3]]
+
+    def get_reference_fingerprint(self, filename, method):
+        """
+        Get the output fingerprint of a reference without decoding it.
+
+        Records are stored as canonical JSON, so the fingerprint is the hash
+        of the stored bytes.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Returns:
+            Tuple of (exists, fingerprint)
+        """
+        data = self.get_reference_bytes(filename, method)
+        if data is None:
+            return False, None
+        return True, hashlib.sha256(data).hexdigest()
+
+    def get_reference_data(self, filename, method):
+        """
+        Get reference data for a specific file and method.
+
+        Args:
+            filename: Name of the file to look up
+            method: Method name (e.g., "lq")
+
+        Returns:
+            Reference output data if found, None otherwise
+        """
+        data = self.get_reference_bytes(filename, method)
+        return json.loads(data) if data is not None else None
+
+    def get_reference_data_many(self, keys):
+        """
+        Get reference data for many files, possibly across methods.
+
+        Args:
+            keys: Iterable of (filename, method) tuples
+
+        Returns:
+            Dictionary mapping (filename, method) to reference output data,
+            containing only the references that were found
+        """
+        found = {}
+        for filename, method in keys:
+            output_data = self.get_reference_data(filename, method)
+            if output_data is not None:
+                found[(filename, method)] = output_data
+        return found
+
+    def _iter_entries(self, method=None):
+        """
+        Iterate index entries in key order, optionally for one method.
+
+        Yields:
+            Tuples of (filename, method, index entry)
+        """
+        position = 0
+        prefix = None
+        if method:
+            prefix = method.encode("utf-8") + KEY_SEPARATOR
+            position = self._find(prefix)
+
+        for position in range(position, self.entry_count):
+            entry = self._entry(position)
+            key = self._key(entry)
+            if prefix is not None and not key.startswith(prefix):
+                break
+            filename, entry_method = _split_key(key)
+            yield filename, entry_method, entry
+
+    def iter_reference_data(self, method=None, since=None, skip=0, limit=None, include_output=False):
+        """
+        Stream reference data entries in (method, filename) order.
+
+        Args:
+            method: Optional method name to filter by
+            since: Optional timestamp; only entries updated at or after it
+            skip: Number of entries to skip (for pagination)
+            limit: Maximum number of entries to return, or None for all
+            include_output: Also return the output_data of each entry
+
+        Yields:
+            Reference data entries with basic metadata
+        """
+        if not self._open():
+            return
+
+        returned = 0
+        for filename, entry_method, entry in self._iter_entries(method):
+            if since is not None and entry[5] < since:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            if limit is not None and returned >= limit:
+                break
+
+            doc = {
+                "filename": filename,
+                "method": entry_method,
+                "created_at": entry[4],
+                "updated_at": entry[5],
+            }
+            if include_output:
+                doc["output_data"] = json.loads(self._map[entry[2]:entry[2] + entry[3]])
+            returned += 1
+            yield doc
+
+    def count_reference_data(self, method=None, since=None):
+        """
+        Count reference data entries per method.
+
+        Args:
+            method: Optional method name to filter by
+            since: Optional timestamp; only entries updated at or after it
+
+        Returns:
+            Dictionary mapping method name to number of entries
+        """
+        if not self._open():
+            return {}
+
+        counts = {}
+        for _, entry_method, entry in self._iter_entries(method):
+            if since is None or entry[5] >= since:
+                counts[entry_method] = counts.get(entry_method, 0) + 1
+        return counts
+
+    def list_reference_data(self, method=None):
+        """
+        List all reference data in the snapshot, optionally filtered by method.
+
+        Args:
+            method: Optional method name to filter by
+
+        Returns:
+            List of reference data entries with basic metadata
+        """
+        return list(self.iter_reference_data(method))
+
+
+def _write_snapshot(path, records, metadata):
+    """
+    Write a snapshot file.
+
+    Args:
+        path: Destination path
+        records: Iterable of (key, data_bytes, created_at, updated_at); a
+                 later record replaces an earlier one with the same key
+        metadata: JSON-serializable metadata to store
+
+    Returns:
+        Number of references written
+    """
+    index = {}
+
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER_SIZE)
+
+        for key, data, created_at, updated_at in records:
+            key_offset = f.tell()
+            f.write(key)
+            data_offset = f.tell()
+            f.write(data)
+            index[key] = (key_offset, len(key), data_offset, len(data), created_at, updated_at)
+
+        index_offset = f.tell()
+        for key in sorted(index):
+            f.write(struct.pack(INDEX_FORMAT, *index[key]))
+
+        meta_offset = f.tell()
+        meta = json.dumps(metadata).encode("utf-8")
+        f.write(meta)
+
+        f.seek(0)
+        f.write(struct.pack(
+            HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(index),
+            index_offset, meta_offset, len(meta)
+        ))
+
+    return len(index)
+
+
+def _database_records(database, methods, since=None):
+    """
+    Stream snapshot records from a database.
+
+    Args:
+        database: Source Database
+        methods: List of method names, or None for all methods
+        since: Optional timestamp; only entries updated at or after it
+
+    Yields:
+        Tuples of (key, data_bytes, created_at, updated_at)
+    """
+    for method in methods or [None]:
+        for doc in database.iter_reference_data(method, since=since, include_output=True):
+            yield (
+                _make_key(doc["filename"], doc["method"]),
+                canonical_json(doc.get("output_data")),
+                doc.get("created_at", 0.0),
+                doc.get("updated_at", 0.0),
+            )
+
+
+def export_snapshot(database, path, methods=None):
+    """
+    Export the references of the given methods to a snapshot file.
+
+    Args:
+        database: Source Database
+        path: Destination snapshot path
+        methods: List of method names, or None for all methods
+
+    Returns:
+        Number of references written
+    """
+    metadata = {"methods": methods, "exported_at": time.time(), "max_updated_at": 0.0}
+
+    def records():
+        for record in _database_records(database, methods):
+            metadata["max_updated_at"] = max(metadata["max_updated_at"], record[3])
+            yield record
+
+    temp_path = f"{path}.tmp"
+    written = _write_snapshot(temp_path, records(), metadata)
+    os.replace(temp_path, path)
+    return written
+
+
+def refresh_snapshot(database, path):
+    """
+    Refresh a snapshot with the references updated since it was written.
+
+    Unchanged records are copied from the existing file without decoding
+    them; the old records of updated references are left out, so the new
+    file holds no dead bytes. References deleted from the database are not
+    removed.
+
+    The delta is queried from the newest updated_at in the snapshot
+    inclusive, so that references written in the same instant are not
+    missed; references already stored with that updated_at are skipped.
+
+    Args:
+        database: Source Database
+        path: Snapshot path to refresh in place
+
+    Returns:
+        Tuple of (number of references written, number of updated references)
+    """
+    snapshot = SnapshotDatabase(path)
+    if not snapshot._open():
+        raise ValueError(f"Cannot refresh unreadable snapshot '{path}'")
+
+    try:
+        metadata = dict(snapshot.metadata)
+        updates = {}
+        for record in _database_records(
+            database, metadata.get("methods"), since=metadata.get("max_updated_at")
+        ):
+            key = record[0]
+            position = snapshot._find(key)
+            if position < snapshot.entry_count:
+                entry = snapshot._entry(position)
+                if snapshot._key(entry) == key and entry[5] == record[3]:
+                    continue
+            updates[key] = record
+
+        def records():
+            for _, _, entry in snapshot._iter_entries():
+                key = snapshot._key(entry)
+                if key not in updates:
+                    yield key, snapshot._map[entry[2]:entry[2] + entry[3]], entry[4], entry[5]
+            for record in updates.values():
+                metadata["max_updated_at"] = max(metadata["max_updated_at"], record[3])
+                yield record
+
+        metadata["exported_at"] = time.time()
+        temp_path = f"{path}.tmp"
+        written = _write_snapshot(temp_path, records(), metadata)
+    finally:
+        snapshot.close()
+
+    # Replaced only once the old file is unmapped
+    os.replace(temp_path, path)
+    return written, len(updates)
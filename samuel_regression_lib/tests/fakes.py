@@ -0,0 +1,108 @@
+"""
+In-memory stand-ins for Database shared by the tests.
+"""
+
+import threading
+import time
+
+from samuel_regression_lib.comparators import output_fingerprint
+
+
+def reference_document(filename, method, output_data, updated_at=0.0):
+    """Build a reference document as Database.iter_reference_data yields it."""
+    return {
+        "filename": filename,
+        "method": method,
+        "output_data": output_data,
+        "created_at": 1.0,
+        "updated_at": updated_at,
+    }
+
+
+class FakeDatabase:
+    """
+    In-memory reference backend.
+
+    Holds reference documents in a list, the last one of a (filename, method)
+    winning, and records the lookups made through it. Batched lookups can be
+    slowed down to stand in for database latency.
+    """
+
+    def __init__(self, references=None, documents=None, delay=0.0):
+        """
+        Initialize the backend.
+
+        Args:
+            references: Optional dictionary mapping (filename, method) to
+                        output data
+            documents: Optional list of reference documents; kept as is, so
+                       tests can change it between calls
+            delay: Seconds get_reference_data_many sleeps before answering
+        """
+        self.documents = documents if documents is not None else []
+        for (filename, method), output_data in (references or {}).items():
+            self.documents.append(reference_document(filename, method, output_data))
+        self.delay = delay
+        self.lookups = 0
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def _find(self, filename, method):
+        for doc in reversed(self.documents):
+            if doc["filename"] == filename and doc["method"] == method:
+                return doc
+        return None
+
+    def test_connection(self):
+        return True
+
+    def get_reference_data(self, filename, method):
+        self.lookups += 1
+        doc = self._find(filename, method)
+        return doc["output_data"] if doc is not None else None
+
+    def get_reference_data_many(self, keys):
+        keys = [tuple(key) for key in keys]
+        time.sleep(self.delay)
+        with self.lock:
+            self.batches.append(keys)
+        found = {}
+        for key in keys:
+            doc = self._find(*key)
+            if doc is not None:
+                found[key] = doc["output_data"]
+        return found
+
+    def iter_reference_data(self, method=None, since=None, skip=0, limit=None, include_output=False):
+        for doc in self.documents:
+            if method and doc["method"] != method:
+                continue
+            if since is not None and doc["updated_at"] < since:
+                continue
+            yield dict(doc)
+
+
+class FingerprintDatabase(FakeDatabase):
+    """In-memory backend that also serves output fingerprints."""
+
+    def get_reference_fingerprint(self, filename, method):
+        doc = self._find(filename, method)
+        if doc is None:
+            return False, None
+        return True, output_fingerprint(doc["output_data"])
+
+
+class PerformanceDatabase(FakeDatabase):
+    """In-memory backend with one performance baseline for every reference."""
+
+    def __init__(self, references=None, baseline=None):
+        super().__init__(references)
+        self.baseline = baseline or {}
+        self.recorded = []
+
+    def get_performance_baseline(self, filename, method):
+        return self.baseline
+
+    def record_performance(self, filename, method, measurements):
+        self.recorded.append(measurements)
+        return True
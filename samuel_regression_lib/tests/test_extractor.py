@@ -0,0 +1,116 @@
+"""
+Tests for output extraction with either XML parser backend.
+"""
+
+import os
+import tempfile
+import threading
+import types
+import unittest
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+from samuel_regression_lib import extractors, xml_backend
+from samuel_regression_lib.extractors import XMLExtractor
+
+EMBEDDED = """
+<OUTPUT>
+<SLOPE><Pos>1</Pos><Sensor>2.5</Sensor></SLOPE>
+<SLOPE><Pos>2</Pos><Sensor>-0.75</Sensor></SLOPE>
+<RESULT><START>0</START><END>10</END><WIDTH>10.0</WIDTH><HEIGHT_MIN>1.0</HEIGHT_MIN>
+<HEIGHT_MAX>2.0</HEIGHT_MAX><HEIGHT_MEAN>1.5</HEIGHT_MEAN><ANGLE>45.0</ANGLE></RESULT>
+</OUTPUT>
+"""
+
+DOCUMENTS = {
+    "plain": "<Root><Data>" + escape(EMBEDDED) + "</Data></Root>",
+    "declaration": (
+        "<?xml version='1.0' encoding='ISO-8859-1'?>\n"
+        "<Root name='Müller'><Data>" + escape(EMBEDDED) + "</Data></Root>"
+    ),
+    "comments": (
+        "<?xml-stylesheet href='a.xsl'?><Root><!-- run 1 --><Meta>x</Meta>"
+        "<Data><![CDATA[" + EMBEDDED + "]]></Data></Root>"
+    ),
+    "entities": "<Root><Data>" + escape(EMBEDDED).replace("&lt;RESULT", "&#60;RESULT") + "</Data></Root>",
+    "declared_entity": (
+        "<!DOCTYPE Root [<!ENTITY width '10.0'>]><Root><Data>"
+        + escape(EMBEDDED).replace("10.0", "&width;") + "</Data></Root>"
+    ),
+    "large": "<Root><Data>" + escape(EMBEDDED) + " " * (11 * 1024 * 1024) + "</Data></Root>",
+}
+
+_STDLIB = types.SimpleNamespace(fromstring=ET.fromstring)
+
+
+class TestExtractor(unittest.TestCase):
+    """Test cases for XMLExtractor.extract_output."""
+
+    def test_extract_output(self):
+        """Test that SLOPES and RESULT values are extracted and converted."""
+        output = XMLExtractor().extract_output(DOCUMENTS["plain"])
+
+        self.assertEqual(output["SLOPES"], [{"Pos": 1, "Sensor": 2.5}, {"Pos": 2, "Sensor": -0.75}])
+        self.assertEqual(output["RESULT"]["WIDTH"], 10.0)
+        self.assertEqual(output["RESULT"]["START"], 0)
+
+    def test_missing_data_section(self):
+        """Test that a document without a Data section is rejected."""
+        with self.assertRaises(ValueError):
+            XMLExtractor().extract_output("<Root><Other/></Root>")
+
+    def test_malformed_document(self):
+        """Test that malformed XML raises the backend's parse error."""
+        with self.assertRaises(xml_backend.ParseError):
+            XMLExtractor().extract_output("<Root><Data>")
+
+    def test_backends_extract_identical_outputs(self):
+        """Test that the configured backend matches ElementTree on every document."""
+        for name, document in DOCUMENTS.items():
+            with self.subTest(document=name):
+                output = XMLExtractor().extract_output(document)
+                with patch.object(extractors, "xml_backend", _STDLIB):
+                    expected = XMLExtractor().extract_output(document)
+                self.assertEqual(output, expected)
+
+    def test_external_entities_not_loaded(self):
+        """Test that neither backend reads a file named by an external entity."""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("secret")
+        self.addCleanup(os.remove, f.name)
+        document = (
+            f"<!DOCTYPE Root [<!ENTITY x SYSTEM 'file://{f.name}'>]><Root><Data>&x;</Data></Root>"
+        )
+
+        with self.assertRaises(xml_backend.ParseError):
+            xml_backend.fromstring(document)
+        with self.assertRaises(xml_backend.ParseError):
+            xml_backend.fromstring(document.encode("utf-8"))
+
+    @unittest.skipUnless(xml_backend.BACKEND == xml_backend.BACKEND_LXML, "lxml is not installed")
+    def test_lxml_parsers_per_thread(self):
+        """Test that threads never share an lxml parser."""
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(xml_backend._get_parsers()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(xml_backend._get_parsers(), xml_backend._get_parsers())
+        self.assertIsNot(parsers[0][0], xml_backend._get_parsers()[0])
+
+    @unittest.skipUnless(xml_backend.BACKEND == xml_backend.BACKEND_LXML, "lxml is not installed")
+    def test_lxml_tree_matches_elementtree(self):
+        """Test that lxml drops comments and processing instructions like ElementTree."""
+        document = DOCUMENTS["comments"]
+        self.assertEqual(
+            [child.tag for child in xml_backend.fromstring(document)],
+            [child.tag for child in ET.fromstring(document)],
+        )
+        self.assertEqual(
+            xml_backend.fromstring(DOCUMENTS["declaration"]).get("name"), "Müller"
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
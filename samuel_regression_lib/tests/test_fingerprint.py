@@ -0,0 +1,77 @@
+"""
+Tests for the exact-match fast path based on output fingerprints.
+"""
+
+import unittest
+
+from samuel_regression_lib import RegressionTest
+from samuel_regression_lib.comparators import output_fingerprint
+from samuel_regression_lib.tests.fakes import FingerprintDatabase
+
+REFERENCE = {"RESULT": {"WIDTH": 10.0, "ANGLE": 45.0}, "SLOPES": [{"Pos": 1, "Sensor": 2.5}]}
+
+
+class TestFingerprint(unittest.TestCase):
+    """Test cases for fingerprint matching in RegressionTest.test_file."""
+
+    def setUp(self):
+        """Create a backend with a single reference."""
+        self.database = FingerprintDatabase({("a.xml", "lq"): REFERENCE})
+        self.test = RegressionTest(database=self.database)
+
+    def test_fingerprint_ignores_key_order(self):
+        """Test that the fingerprint does not depend on key order."""
+        reordered = {"SLOPES": REFERENCE["SLOPES"], "RESULT": {"ANGLE": 45.0, "WIDTH": 10.0}}
+        self.assertEqual(output_fingerprint(reordered), output_fingerprint(REFERENCE))
+
+    def test_fingerprint_of_raw_bson(self):
+        """Test that a raw BSON reference has the fingerprint of its decoded form."""
+        import bson
+        from bson.raw_bson import RawBSONDocument
+
+        raw = RawBSONDocument(bson.encode({"output_data": REFERENCE}))["output_data"]
+        self.assertEqual(output_fingerprint(raw), output_fingerprint(REFERENCE))
+
+    def test_identical_output_skips_full_fetch(self):
+        """Test that an identical output passes without fetching the reference."""
+        self.test.test_file("a.xml", "lq", dict(REFERENCE))
+
+        results = self.test.get_results()
+        self.assertIn("fingerprint match", results)
+        self.assertIn("Overall Result: PASS", results)
+        self.assertEqual(self.database.lookups, 0)
+
+    def test_changed_output_is_compared(self):
+        """Test that a changed output falls back to the full comparison."""
+        changed = {"RESULT": {"WIDTH": 20.0, "ANGLE": 45.0}, "SLOPES": REFERENCE["SLOPES"]}
+        self.test.test_file("a.xml", "lq", changed)
+
+        results = self.test.get_results()
+        self.assertIn("Overall Result: FAIL", results)
+        self.assertEqual(self.database.lookups, 1)
+
+    def test_identical_output_without_value_is_compared(self):
+        """Test that an identical output with a None or NaN RESULT value still fails."""
+        for value in (None, float("nan")):
+            with self.subTest(value=value):
+                reference = {"RESULT": {"WIDTH": value, "ANGLE": 45.0}, "SLOPES": []}
+                database = FingerprintDatabase({("a.xml", "lq"): reference})
+                test = RegressionTest(database=database)
+
+                test.test_file("a.xml", "lq", {"RESULT": {"WIDTH": value, "ANGLE": 45.0}, "SLOPES": []})
+
+                results = test.get_results()
+                self.assertNotIn("fingerprint match", results)
+                self.assertIn("Overall Result: FAIL", results)
+                self.assertEqual(database.lookups, 1)
+
+    def test_missing_reference(self):
+        """Test that a missing reference is reported without a full fetch."""
+        self.test.test_file("b.xml", "lq", dict(REFERENCE))
+
+        self.assertIn("No reference data found", self.test.get_results())
+        self.assertEqual(self.database.lookups, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
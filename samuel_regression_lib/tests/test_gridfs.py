@@ -0,0 +1,149 @@
+"""
+Tests for GridFS storage of large reference inputs.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from samuel_regression_lib.cli import save_reference_input
+from samuel_regression_lib.db import Database
+
+
+class TestGridFSInputs(unittest.TestCase):
+    """Test cases for storing and streaming inputs through GridFS."""
+
+    def setUp(self):
+        """Wire a mocked MongoClient and GridFS bucket."""
+        patcher = patch('pymongo.MongoClient')
+        mock_client = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        bucket_patcher = patch('gridfs.GridFSBucket')
+        self.mock_bucket_class = bucket_patcher.start()
+        self.addCleanup(bucket_patcher.stop)
+        self.mock_bucket = self.mock_bucket_class.return_value
+
+        threshold_patcher = patch('samuel_regression_lib.db.GRIDFS_THRESHOLD_BYTES', 16)
+        threshold_patcher.start()
+        self.addCleanup(threshold_patcher.stop)
+
+        mock_instance = MagicMock()
+        self.mock_db = MagicMock()
+        self.mock_collection = MagicMock()
+        mock_client.return_value = mock_instance
+        mock_instance.__getitem__.return_value = self.mock_db
+        self.mock_db.with_options.return_value = self.mock_db
+        self.mock_db.__getitem__.return_value = self.mock_collection
+
+    def test_large_input_stored_in_gridfs(self):
+        """Test that a large input is uploaded and only referenced."""
+        xml_data = "<DATA>" + "x" * 100 + "</DATA>"
+        self.mock_collection.find_one.return_value = None
+        self.mock_bucket.upload_from_stream.return_value = "file-id"
+
+        stored = Database(layout="consolidated").store_reference_data(
+            "a.xml", "lq", xml_data, {"RESULT": {}}
+        )
+
+        self.assertTrue(stored)
+        self.mock_bucket.upload_from_stream.assert_called_once()
+        update = self.mock_collection.update_one.call_args[0][1]
+        self.assertEqual(update["$set"]["xml_file_id"], "file-id")
+        self.assertEqual(
+            update["$set"]["xml_sha256"], hashlib.sha256(xml_data.encode("utf-8")).hexdigest()
+        )
+        self.assertNotIn("xml_data", update["$set"])
+        self.assertIn("xml_data", update["$unset"])
+
+    def test_small_input_embedded(self):
+        """Test that a small input stays in the reference document."""
+        Database(layout="consolidated").store_reference_data("a.xml", "lq", "<x/>", {"RESULT": {}})
+
+        update = self.mock_collection.update_one.call_args[0][1]
+        self.assertEqual(update["$set"]["xml_data"], "<x/>")
+        self.assertIn("xml_file_id", update["$unset"])
+        self.mock_bucket.upload_from_stream.assert_not_called()
+
+    def test_iter_reference_input_streams_chunks(self):
+        """Test that a GridFS input is read back chunk by chunk and verified."""
+        chunks = [b"<DATA>", b"xxxx", b"</DATA>"]
+        self.mock_collection.find_one.return_value = {
+            "xml_file_id": "file-id",
+            "xml_sha256": hashlib.sha256(b"".join(chunks)).hexdigest(),
+        }
+        stream = self.mock_bucket.open_download_stream.return_value.__enter__.return_value
+        stream.readchunk.side_effect = chunks + [b""]
+
+        result = list(Database(layout="consolidated").iter_reference_input("a.xml", "lq"))
+
+        self.assertEqual(result, chunks)
+        self.mock_bucket.open_download_stream.assert_called_once_with("file-id")
+
+    def test_iter_reference_input_detects_corruption(self):
+        """Test that a GridFS input that does not match its hash is rejected."""
+        self.mock_collection.find_one.return_value = {
+            "xml_file_id": "file-id", "xml_sha256": "0" * 64,
+        }
+        stream = self.mock_bucket.open_download_stream.return_value.__enter__.return_value
+        stream.readchunk.side_effect = [b"<DATA/>", b""]
+
+        with self.assertRaises(ValueError):
+            list(Database(layout="consolidated").iter_reference_input("a.xml", "lq"))
+
+
+class TestSaveReferenceInput(unittest.TestCase):
+    """Test cases for writing a stored input to a file from the CLI."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.output_path = os.path.join(self.directory, "input.xml")
+
+        patcher = patch('samuel_regression_lib.cli.Database')
+        self.db = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.db.test_connection.return_value = True
+
+    def _save(self, chunks):
+        self.db.iter_reference_input.side_effect = lambda filename, method: chunks()
+        return save_reference_input("a.xml", "lq", self.output_path)
+
+    def test_writes_whole_input(self):
+        """Test that the input ends up in the output file and nothing else is left."""
+        message = self._save(lambda: iter([b"<DATA>", b"</DATA>"]))
+
+        self.assertEqual(message, f"Wrote 13 bytes to '{self.output_path}'")
+        with open(self.output_path, "rb") as f:
+            self.assertEqual(f.read(), b"<DATA></DATA>")
+        self.assertEqual(os.listdir(self.directory), ["input.xml"])
+
+    def test_missing_reference_leaves_no_file(self):
+        """Test that no empty file is created for a missing reference."""
+        message = self._save(lambda: iter([]))
+
+        self.assertIn("No stored input found", message)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_failed_read_keeps_existing_file(self):
+        """Test that a hash mismatch mid-stream leaves no truncated output."""
+        with open(self.output_path, "wb") as f:
+            f.write(b"previous")
+
+        def chunks():
+            yield b"<DATA>"
+            raise ValueError("Stored input of 'a.xml' does not match its hash")
+
+        message = self._save(chunks)
+
+        self.assertIn("Error reading reference input", message)
+        with open(self.output_path, "rb") as f:
+            self.assertEqual(f.read(), b"previous")
+        self.assertEqual(os.listdir(self.directory), ["input.xml"])
+
+
+if __name__ == '__main__':
+    unittest.main()
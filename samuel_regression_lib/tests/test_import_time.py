@@ -0,0 +1,78 @@
+"""
+Tests for the import-time budget of the library.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+# Cumulative import time allowed for `import samuel_regression_lib`
+IMPORT_TIME_BUDGET_US = 50000
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _run_import(statement):
+    """
+    Import the library in a fresh interpreter with -X importtime.
+
+    Args:
+        statement: Python statement to execute
+
+    Returns:
+        Tuple of (cumulative import times by module, stdout)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if parts[1].isdigit():
+            timings[parts[2]] = int(parts[1])
+
+    return timings, completed.stdout
+
+
+class TestImportTime(unittest.TestCase):
+    """Test cases for lazy imports and the startup budget."""
+
+    def test_import_within_budget(self):
+        """Test that importing the package stays within the startup budget."""
+        timings, _ = _run_import("import samuel_regression_lib")
+
+        self.assertIn("samuel_regression_lib", timings)
+        self.assertLess(timings["samuel_regression_lib"], IMPORT_TIME_BUDGET_US)
+
+    def test_heavy_dependencies_deferred(self):
+        """Test that pymongo and the XML parsers are not imported eagerly."""
+        _, stdout = _run_import(
+            "import sys, samuel_regression_lib\n"
+            "rt = samuel_regression_lib.RegressionTest()\n"
+            "print('pymongo' in sys.modules, 'xml.etree.ElementTree' in sys.modules,"
+            " 'lxml.etree' in sys.modules)"
+        )
+
+        self.assertEqual(stdout.split(), ["False", "False", "False"])
+
+    def test_extractor_does_not_import_pymongo(self):
+        """Test that local extraction does not pull in the database layer."""
+        _, stdout = _run_import(
+            "import sys\n"
+            "from samuel_regression_lib.extractors import XMLExtractor\n"
+            "print('pymongo' in sys.modules)"
+        )
+
+        self.assertEqual(stdout.split(), ["False"])
+
+
+if __name__ == '__main__':
+    unittest.main()
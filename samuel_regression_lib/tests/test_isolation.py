@@ -0,0 +1,85 @@
+"""
+Tests for isolated extraction with per-file limits.
+"""
+
+import unittest
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+from samuel_regression_lib import RegressionTest, xml_backend
+from samuel_regression_lib.extractors import XMLExtractor
+from samuel_regression_lib.isolation import IsolatedExtractor, ExtractionError
+
+VALID_XML = "<Root><Data>" + escape("""
+<OUTPUT>
+<SLOPE><Pos>1</Pos><Sensor>2.5</Sensor></SLOPE>
+<RESULT><START>0</START><END>10</END><WIDTH>10.0</WIDTH><HEIGHT_MIN>1.0</HEIGHT_MIN>
+<HEIGHT_MAX>2.0</HEIGHT_MAX><HEIGHT_MEAN>1.5</HEIGHT_MEAN><ANGLE>45.0</ANGLE></RESULT>
+</OUTPUT>
+""") + "</Data></Root>"
+
+# An unterminated OUTPUT section makes the OUTPUT regex backtrack quadratically
+BACKTRACKING_XML = "<Root><Data>&lt;OUTPUT&gt;" + " " * 200000 + "x</Data></Root>"
+
+
+class TestIsolation(unittest.TestCase):
+    """Test cases for extraction in a worker process."""
+
+    def setUp(self):
+        """Create an extractor with a short wall-clock limit."""
+        self.extractor = IsolatedExtractor(timeout=2.0, cpu_seconds=0)
+        self.addCleanup(self.extractor.close)
+
+    def test_extracts_like_xml_extractor(self):
+        """Test that isolated extraction returns the in-process result."""
+        self.assertEqual(
+            self.extractor.extract_output(VALID_XML),
+            XMLExtractor().extract_output(VALID_XML),
+        )
+
+    def test_limits_and_errors_do_not_stop_the_run(self):
+        """Test that stalled and malformed files fail with a reason."""
+        with self.assertRaises(ExtractionError) as context:
+            self.extractor.extract_output(BACKTRACKING_XML)
+        self.assertIn("Wall-clock limit", context.exception.reason)
+
+        with self.assertRaises(ExtractionError) as context:
+            self.extractor.extract_output("<Root><Data>")
+        self.assertIn(xml_backend.ParseError.__name__, context.exception.reason)
+
+        # A fresh worker extracts the next file
+        self.assertEqual(self.extractor.extract_output(VALID_XML)["RESULT"]["WIDTH"], 10.0)
+
+    def test_regression_test_records_error(self):
+        """Test that RegressionTest.extract_file marks failed files as ERROR."""
+        test = RegressionTest(database=object(), isolate=self.extractor)
+
+        self.assertIsNone(test.extract_file("bad.xml", "lq", "<Root><Data>"))
+        self.assertEqual(test.extract_file("good.xml", "lq", VALID_XML)["RESULT"]["ANGLE"], 45.0)
+
+        results = test.get_results()
+        self.assertIn("Overall Result: ERROR", results)
+        self.assertIn(f"bad.xml (lq): {xml_backend.ParseError.__name__}", results)
+
+    def test_close_stops_worker(self):
+        """Test that closing RegressionTest stops the isolated worker."""
+        with RegressionTest(database=object(), isolate=True) as test:
+            test.extract_file("good.xml", "lq", VALID_XML)
+            process = test.extractor._process
+            self.assertTrue(process.is_alive())
+
+        self.assertFalse(process.is_alive())
+        self.assertIsNone(test.extractor._process)
+
+    @patch('pymongo.MongoClient')
+    def test_close_closes_database(self, mock_client):
+        """Test that closing RegressionTest closes the client of its database."""
+        with RegressionTest() as test:
+            self.assertTrue(test.db.test_connection())
+
+        mock_client.return_value.close.assert_called_once()
+        self.assertIsNone(test.db.client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Tests for the consolidated reference layout.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+
+from samuel_regression_lib.db import Database
+
+
+class TestConsolidatedLayout(unittest.TestCase):
+    """Test cases for reading and writing the consolidated layout."""
+
+    def setUp(self):
+        """Wire a mocked MongoClient to a single mocked collection."""
+        patcher = patch('pymongo.MongoClient')
+        mock_client = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        mock_instance = MagicMock()
+        self.mock_db = MagicMock()
+        self.mock_collection = MagicMock()
+        mock_client.return_value = mock_instance
+        mock_instance.__getitem__.return_value = self.mock_db
+        self.mock_db.with_options.return_value = self.mock_db  # Raw BSON read view
+        self.mock_db.__getitem__.return_value = self.mock_collection
+
+    def test_unknown_layout_rejected(self):
+        """Test that an unknown layout name is rejected."""
+        with self.assertRaises(ValueError):
+            Database(layout="sharded")
+
+    def test_get_reference_data_many_single_query(self):
+        """Test that a multi-method lookup is one indexed query."""
+        self.mock_collection.find.return_value = [
+            {"filename": "a.xml", "method": "lq", "output_data": {"RESULT": {"WIDTH": 1}}},
+            {"filename": "b.xml", "method": "cr", "output_data": {"RESULT": {"WIDTH": 2}}},
+        ]
+
+        found = Database(layout="consolidated").get_reference_data_many(
+            [("a.xml", "lq"), ("b.xml", "cr")]
+        )
+
+        self.assertEqual(found, {
+            ("a.xml", "lq"): {"RESULT": {"WIDTH": 1}},
+            ("b.xml", "cr"): {"RESULT": {"WIDTH": 2}},
+        })
+        self.mock_collection.find.assert_called_once()
+        query = self.mock_collection.find.call_args[0][0]
+        self.assertCountEqual(query["$or"], [
+            {"method": "lq", "filename": {"$in": ["a.xml"]}},
+            {"method": "cr", "filename": {"$in": ["b.xml"]}},
+        ])
+
+    def test_get_reference_data_falls_back_to_per_method(self):
+        """Test that lookups read the per-method layout when not migrated yet."""
+        self.mock_db.list_collection_names.return_value = ["reference_data_lq"]
+        self.mock_collection.count_documents.return_value = 0
+        self.mock_collection.find_one.side_effect = [
+            None, {"filename": "a.xml", "output_data": {"RESULT": {}}}
+        ]
+
+        result = Database(layout="consolidated").get_reference_data("a.xml", "lq")
+
+        self.assertEqual(result, {"RESULT": {}})
+        self.assertEqual(
+            [c[0][0] for c in self.mock_db.__getitem__.call_args_list],
+            ["migration_state", "references", "reference_data_lq"],
+        )
+
+    def test_no_fallback_once_migrated(self):
+        """Test that a miss is a single query once every collection is migrated."""
+        self.mock_db.list_collection_names.return_value = ["reference_data_lq"]
+        self.mock_collection.count_documents.return_value = 1
+        self.mock_collection.find_one.return_value = None
+        database = Database(layout="consolidated")
+
+        self.assertIsNone(database.get_reference_data("a.xml", "lq"))
+        self.assertEqual(database.get_reference_fingerprint("b.xml", "lq"), (False, None))
+
+        self.assertEqual(self.mock_collection.find_one.call_count, 2)
+        self.mock_collection.count_documents.assert_called_once()
+
+    def test_per_method_never_reads_consolidated(self):
+        """Test that the per-method layout does not query the consolidated collection."""
+        self.mock_collection.find_one.return_value = None
+
+        self.assertIsNone(Database(layout="per_method").get_reference_data("a.xml", "lq"))
+
+        self.mock_collection.find_one.assert_called_once()
+        self.mock_db.__getitem__.assert_called_once_with("reference_data_lq")
+
+    def test_migration_keeps_newer_documents(self):
+        """Test that migrating never replaces a newer consolidated document."""
+        from pymongo.errors import BulkWriteError
+
+        self.mock_db.list_collection_names.return_value = ["reference_data_lq"]
+        self.mock_collection.find.return_value.sort.return_value.limit.side_effect = [
+            [{"_id": 1, "filename": "a.xml", "updated_at": 5.0}], [],
+        ]
+        self.mock_collection.find.return_value.__iter__.return_value = iter([])
+        # The consolidated document is newer: the guarded upsert collides
+        self.mock_collection.bulk_write.side_effect = BulkWriteError(
+            {"writeErrors": [{"index": 0, "code": 11000}]}
+        )
+
+        copied = Database(layout="consolidated").migrate_to_consolidated(resume=False)
+
+        self.assertEqual(copied, {"lq": 1})
+        replace = self.mock_collection.bulk_write.call_args[0][0][0]
+        self.assertEqual(replace._filter, {
+            "method": "lq", "filename": "a.xml", "updated_at": {"$lt": 5.0},
+        })
+
+    def test_store_consolidated_upserts(self):
+        """Test that storing in the consolidated layout is a single upsert."""
+        stored = Database(layout="consolidated").store_reference_data(
+            "a.xml", "lq", "<xml/>", {"RESULT": {}}
+        )
+
+        self.assertTrue(stored)
+        self.mock_collection.create_index.assert_called_once()
+        self.mock_collection.find_one.assert_not_called()
+        args, kwargs = self.mock_collection.update_one.call_args
+        self.assertEqual(args[0], {"method": "lq", "filename": "a.xml"})
+        self.assertTrue(kwargs["upsert"])
+
+    def test_lookups_return_dicts_by_default(self):
+        """Test that lookups return plain, modifiable dicts unless raw BSON is asked for."""
+        self.mock_collection.find_one.return_value = {"output_data": {"RESULT": {"WIDTH": 1.5}}}
+
+        result = Database(layout="consolidated").get_reference_data("a.xml", "lq")
+
+        self.assertIsInstance(result, dict)
+        self.mock_db.with_options.assert_not_called()
+
+    def test_lookups_decode_lazily(self):
+        """Test that lookups read raw BSON and project away the XML data."""
+        import bson
+        from bson.raw_bson import RawBSONDocument
+
+        output_data = {"RESULT": {"WIDTH": 1.5}, "SLOPES": [{"Pos": 1, "Sensor": 2.5}]}
+        self.mock_collection.find_one.return_value = RawBSONDocument(
+            bson.encode({"output_data": output_data})
+        )
+
+        result = Database(layout="consolidated", raw_bson=True).get_reference_data("a.xml", "lq")
+
+        self.assertEqual(result["RESULT"], {"WIDTH": 1.5})
+        self.assertEqual(len(result["SLOPES"]), 1)
+        self.assertEqual(result, output_data)
+        codec_options = self.mock_db.with_options.call_args[1]["codec_options"]
+        self.assertIs(codec_options.document_class, RawBSONDocument)
+        self.assertEqual(self.mock_collection.find_one.call_args[0][1], {"output_data": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Tests for lazily decoded BSON documents.
+"""
+
+import unittest
+
+import bson
+from bson.code import Code
+from bson.dbref import DBRef
+from bson.regex import Regex
+
+from samuel_regression_lib.lazy import LazyDocument
+
+OUTPUT = {"RESULT": {"WIDTH": 1.5, "ANGLE": 45}, "SLOPES": [{"Pos": 1, "Sensor": 2.5}]}
+
+
+class TestLazyDocument(unittest.TestCase):
+    """Test cases for LazyDocument and LazyArray."""
+
+    def test_decodes_like_bson(self):
+        """Test that a lazy document equals its decoded form."""
+        document = LazyDocument(bson.encode(OUTPUT))
+
+        self.assertEqual(document["RESULT"]["WIDTH"], 1.5)
+        self.assertEqual(len(document["SLOPES"]), 1)
+        self.assertEqual(document, OUTPUT)
+        self.assertEqual(list(document), ["RESULT", "SLOPES"])
+        with self.assertRaises(KeyError):
+            document["MISSING"]
+
+    def test_unsupported_types_fall_back_to_bson(self):
+        """Test that element types the scanner does not know are still decoded."""
+        data = dict(OUTPUT, pattern=Regex("^a.*", "i"), code=Code("f()"), link=DBRef("c", 1))
+        # 0x06 (undefined) and 0x0C (DBPointer) cannot be encoded by pymongo;
+        # splice an undefined element in by hand
+        raw = bytearray(bson.encode(data))
+        raw[-1:] = b"\x06gone\x00\x00"
+        raw[:4] = len(raw).to_bytes(4, "little")
+        expected = bson.decode(bytes(raw))
+
+        document = LazyDocument(bytes(raw))
+
+        self.assertEqual(document["pattern"], Regex("^a.*", "i"))
+        self.assertIsNone(document["gone"])
+        self.assertEqual(document, expected)
+        self.assertEqual(list(document), list(expected))
+
+    def test_array_with_unsupported_types(self):
+        """Test that an array holding a regular expression still has a length."""
+        document = LazyDocument(bson.encode({"patterns": [Regex("a"), Regex("b")]}))
+
+        self.assertEqual(len(document["patterns"]), 2)
+        self.assertEqual(document["patterns"][1], Regex("b"))
+
+
+if __name__ == '__main__':
+    unittest.main()
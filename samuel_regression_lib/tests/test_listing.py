@@ -0,0 +1,105 @@
+"""
+Tests for streaming, paginated and aggregated reference listing.
+"""
+
+import argparse
+import unittest
+from unittest.mock import patch, MagicMock
+
+from samuel_regression_lib.cli import list_references, positive_int
+from samuel_regression_lib.db import Database
+
+
+def _mock_database(mock_client, collection_names, documents):
+    """Wire a mocked MongoClient to a database with the given collections."""
+    mock_instance = MagicMock()
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_cursor = MagicMock()
+
+    mock_client.return_value = mock_instance
+    mock_instance.__getitem__.return_value = mock_db
+    mock_db.with_options.return_value = mock_db  # Raw BSON read view
+    mock_db.__getitem__.return_value = mock_collection
+    mock_db.list_collection_names.return_value = collection_names
+    mock_collection.aggregate.return_value = mock_cursor
+    mock_cursor.__iter__.return_value = iter(documents)
+
+    return mock_db, mock_collection
+
+
+class TestReferenceListing(unittest.TestCase):
+    """Test cases for Database listing and counting."""
+
+    @patch('pymongo.MongoClient')
+    def test_iter_reference_data_uses_single_union(self, mock_client):
+        """Test that all methods are read through one paginated aggregation."""
+        docs = [{"filename": "a.xml", "method": "cr", "created_at": 1.0}]
+        mock_db, mock_collection = _mock_database(
+            mock_client, ["reference_data_lq", "reference_data_cr"], docs
+        )
+
+        result = list(Database().iter_reference_data(since=10.0, skip=20, limit=10))
+
+        self.assertEqual(result, docs)
+        mock_db.__getitem__.assert_called_once_with("reference_data_cr")
+        mock_collection.aggregate.assert_called_once()
+        stages = mock_collection.aggregate.call_args[0][0]
+
+        self.assertEqual(stages[0], {"$match": {"updated_at": {"$gte": 10.0}}})
+        union = [stage["$unionWith"] for stage in stages if "$unionWith" in stage]
+        self.assertEqual([u["coll"] for u in union], ["reference_data_lq"])
+        self.assertEqual(stages[-2:], [{"$skip": 20}, {"$limit": 10}])
+
+    @patch('pymongo.MongoClient')
+    def test_iter_reference_data_no_collections(self, mock_client):
+        """Test that listing an unknown method yields nothing."""
+        _, mock_collection = _mock_database(mock_client, [], [])
+
+        self.assertEqual(list(Database().iter_reference_data("missing")), [])
+        mock_collection.aggregate.assert_not_called()
+
+    @patch('pymongo.MongoClient')
+    def test_iter_reference_data_raises_mid_stream(self, mock_client):
+        """Test that an error part-way through the listing is not swallowed."""
+        def documents():
+            yield {"filename": "a.xml", "method": "lq", "created_at": 1.0}
+            raise RuntimeError("cursor killed")
+
+        _, mock_collection = _mock_database(mock_client, ["reference_data_lq"], [])
+        mock_collection.aggregate.return_value.__iter__.side_effect = documents
+
+        with self.assertRaises(RuntimeError):
+            list(Database().iter_reference_data())
+
+        output = list_references()
+        self.assertIn("Filename: a.xml", output)
+        self.assertIn("Error listing reference data: cursor killed", output)
+        self.assertNotIn("No reference data found", output)
+
+    def test_page_must_be_positive(self):
+        """Test that --page and --page-size reject values below 1."""
+        self.assertEqual(positive_int("2"), 2)
+        for value in ("0", "-1", "two"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                positive_int(value)
+
+    @patch('pymongo.MongoClient')
+    def test_count_reference_data_groups_server_side(self, mock_client):
+        """Test that per-method counts come from one $group aggregation."""
+        _, mock_collection = _mock_database(
+            mock_client, ["reference_data_lq", "reference_data_cr"], []
+        )
+        mock_collection.aggregate.return_value = [
+            {"_id": "cr", "count": 2}, {"_id": "lq", "count": 5}
+        ]
+
+        counts = Database().count_reference_data()
+
+        self.assertEqual(counts, {"cr": 2, "lq": 5})
+        stages = mock_collection.aggregate.call_args[0][0]
+        self.assertIn({"$group": {"_id": "$method", "count": {"$sum": 1}}}, stages)
+
+
+if __name__ == '__main__':
+    unittest.main()
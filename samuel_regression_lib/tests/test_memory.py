@@ -0,0 +1,91 @@
+"""
+Tests for memory tracking and memory budgets.
+"""
+
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from samuel_regression_lib import RegressionTest
+from samuel_regression_lib.memory import MemoryTracker
+from samuel_regression_lib.tests.fakes import FakeDatabase
+
+REFERENCE = {"RESULT": {"WIDTH": 1.0}}
+MB = 1024 * 1024
+
+
+class _Database(FakeDatabase):
+    """In-memory backend whose lookup of 'big.xml' allocates 4 MB."""
+
+    def get_reference_data(self, filename, method):
+        if filename == "big.xml":
+            buffer = bytearray(4 * MB)
+            del buffer
+        return REFERENCE
+
+
+class TestMemory(unittest.TestCase):
+    """Test cases for peaks per phase and file and for the budget actions."""
+
+    def _run(self, tracker):
+        """Test a small file, the large one and another small one."""
+        self.addCleanup(tracker.stop)
+        test = RegressionTest(database=_Database(), memory=tracker)
+        for filename in ("a.xml", "big.xml", "b.xml"):
+            test.test_file(filename, "lq", dict(REFERENCE))
+        return test, test.get_results()
+
+    def test_peaks_per_phase_and_file(self):
+        """Test that the lookup and the file it belongs to carry the peak."""
+        tracker = MemoryTracker()
+        _, results = self._run(tracker)
+
+        self.assertGreaterEqual(tracker.phase_peaks["lookup"], 4 * MB)
+        self.assertLess(tracker.phase_peaks["compare"], 4 * MB)
+        self.assertGreaterEqual(tracker.phase_peaks["file"], 4 * MB)
+        self.assertEqual(tracker.largest_files[0][1:], ("big.xml", "lq"))
+        self.assertIn("Peak per phase:", results)
+        self.assertIn("Top allocation sites", results)
+
+    def test_budget_fails_cleanly(self):
+        """Test that exceeding the budget stops testing further files."""
+        tracker = MemoryTracker(budget=2 * MB, action="fail")
+        _, results = self._run(tracker)
+
+        self.assertIn("Test Results for 'big.xml'", results)
+        self.assertNotIn("Test Results for 'b.xml'", results)
+        self.assertIn("remaining files were not tested", results)
+        self.assertIn("Budget exceeded in phase 'lookup'", results)
+
+    def test_budget_switches_to_streaming(self):
+        """Test that exceeding the budget spools results to disk and continues."""
+        tracker = MemoryTracker(budget=2 * MB, action="stream")
+        test, results = self._run(tracker)
+
+        self.assertIsNotNone(test._case_builder._spool)
+        self.assertEqual(test._case_builder.results, [])
+        for filename in ("a.xml", "big.xml", "b.xml"):
+            self.assertIn(f"Test Results for '{filename}'", results)
+        self.assertIn("results spooled to disk", results)
+
+    def test_without_reset_peak(self):
+        """Test that Python < 3.9 (no tracemalloc.reset_peak) still tracks peaks."""
+        with patch("samuel_regression_lib.memory.tracemalloc", wraps=tracemalloc) as traced:
+            del traced.reset_peak
+            tracker = MemoryTracker()
+            self._run(tracker)
+
+        self.assertGreaterEqual(tracker.phase_peaks["lookup"], 4 * MB)
+        self.assertEqual(tracker.largest_files[0][1:], ("big.xml", "lq"))
+
+    def test_close_stops_tracing(self):
+        """Test that closing the run turns tracemalloc off again."""
+        test, _ = self._run(MemoryTracker())
+        self.assertTrue(tracemalloc.is_tracing())
+
+        test.close()
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == '__main__':
+    unittest.main()
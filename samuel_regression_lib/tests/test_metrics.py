@@ -0,0 +1,149 @@
+"""
+Tests for database latency metrics.
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from samuel_regression_lib import RegressionTest
+from samuel_regression_lib.cli import main
+from samuel_regression_lib.metrics import DatabaseMetrics, LatencyHistogram
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for histograms, the slow-operation log and exports."""
+
+    def setUp(self):
+        """Create metrics with a 100 ms slow threshold."""
+        self.metrics = DatabaseMetrics(slow_threshold=0.1, bounds=(0.01, 0.1, 1.0))
+
+    def test_histogram_quantiles(self):
+        """Test bucket counts and interpolated quantiles."""
+        histogram = LatencyHistogram((0.01, 0.1, 1.0))
+        for seconds in (0.005, 0.005, 0.05, 0.5):
+            histogram.observe(seconds)
+
+        self.assertEqual(histogram.counts, [2, 1, 1, 0])
+        self.assertEqual(histogram.count, 4)
+        self.assertLessEqual(histogram.quantile(0.5), 0.01)
+        self.assertEqual(histogram.quantile(1.0), 0.5)
+
+    def test_slow_operations_logged(self):
+        """Test that only operations above the threshold are logged."""
+        with self.assertLogs("samuel_regression_lib.metrics", level="WARNING") as logs:
+            self.metrics.observe("lookup", "reference_data_lq", 0.05, "lq", {"filename": "a.xml"})
+            self.metrics.observe("lookup", "reference_data_lq", 0.5, "lq", {"filename": "b.xml"})
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("reference_data_lq", logs.output[0])
+        self.assertIn("b.xml", logs.output[0])
+
+        summary = self.metrics.summary()
+        self.assertEqual(len(summary["operations"]), 1)
+        self.assertEqual(summary["operations"][0]["count"], 2)
+        self.assertEqual(summary["operations"][0]["slow"], 1)
+
+    def test_timed_cursor_counts_one_operation(self):
+        """Test that iterating a cursor records a single operation and closes it."""
+        closed = []
+
+        class _Cursor(list):
+            def close(self):
+                closed.append(True)
+
+        items = list(self.metrics.timed_cursor(lambda: _Cursor([1, 2, 3]), "list", "references"))
+
+        self.assertEqual(items, [1, 2, 3])
+        self.assertEqual(closed, [True])
+        self.assertEqual(self.metrics.summary()["operations"][0]["count"], 1)
+
+    def test_exports(self):
+        """Test the JSON summary and Prometheus textfile exports."""
+        self.metrics.observe("store", "references", 0.05, "lq")
+        self.metrics.observe("list", "reference_data_*", 2.0)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        json_path = os.path.join(directory, "metrics.json")
+        prom_path = os.path.join(directory, "metrics.prom")
+        self.metrics.write_json(json_path)
+        self.metrics.write_prometheus(prom_path)
+
+        with open(json_path) as f:
+            summary = json.load(f)
+        self.assertEqual({op["operation"] for op in summary["operations"]}, {"store", "list"})
+
+        with open(prom_path) as f:
+            text = f.read()
+        labels = 'operation="store",collection="references",method="lq"'
+        self.assertIn(f'samuel_regression_db_operation_seconds_bucket{{{labels},le="0.1"}} 1', text)
+        self.assertIn(f'samuel_regression_db_operation_seconds_count{{{labels}}} 1', text)
+        self.assertIn(
+            'samuel_regression_db_slow_operations_total'
+            '{operation="list",collection="reference_data_*",method=""} 1',
+            text,
+        )
+
+
+class TestMetricsFiles(unittest.TestCase):
+    """Test cases for writing the metrics files at the end of a run."""
+
+    def setUp(self):
+        """Create a directory for the metrics files."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.json_path = os.path.join(self.directory, "metrics.json")
+        self.prom_path = os.path.join(self.directory, "metrics.prom")
+
+    def _assert_written(self, operation):
+        """Check that both files hold the given operation."""
+        with open(self.json_path) as f:
+            summary = json.load(f)
+        self.assertEqual([op["operation"] for op in summary["operations"]], [operation])
+        with open(self.prom_path) as f:
+            self.assertIn(f'operation="{operation}"', f.read())
+
+    @patch('samuel_regression_lib.cli.Database')
+    def test_cli_flags(self, mock_database):
+        """Test that --metrics-json and --metrics-prom export the latencies of the command."""
+        def open_database(metrics=None):
+            db = MagicMock()
+            db.test_connection.return_value = True
+
+            def count(method=None, since=None):
+                metrics.observe("count", "references", 0.05, method)
+                return {"lq": 3}
+
+            db.count_reference_data.side_effect = count
+            return db
+
+        mock_database.side_effect = open_database
+        argv = [
+            "samuel-regression", "--metrics-json", self.json_path, "--metrics-prom", self.prom_path,
+            "list", "--count", "--method", "lq",
+        ]
+        with patch.object(sys, "argv", argv), patch("sys.stdout", new=io.StringIO()):
+            main()
+
+        self._assert_written("count")
+
+    def test_regression_test_arguments(self):
+        """Test that get_results() writes the metrics files given to RegressionTest."""
+        db = MagicMock()
+        db.metrics = DatabaseMetrics()
+        db.metrics.observe("lookup", "reference_data_lq", 0.02, "lq")
+
+        test = RegressionTest(database=db, metrics_json=self.json_path, metrics_prom=self.prom_path)
+        test.get_results()
+
+        self._assert_written("lookup")
+
+
+if __name__ == '__main__':
+    unittest.main()
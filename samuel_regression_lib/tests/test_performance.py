@@ -0,0 +1,86 @@
+"""
+Tests for runtime and peak memory regression checks.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+
+from samuel_regression_lib import RegressionTest
+from samuel_regression_lib.db import Database
+from samuel_regression_lib.performance import check_measurement
+from samuel_regression_lib.tests.fakes import PerformanceDatabase
+
+REFERENCE = {"RESULT": {"WIDTH": 10.0}}
+
+
+class TestPerformance(unittest.TestCase):
+    """Test cases for performance baselines in RegressionTest.test_file."""
+
+    def test_significant_slowdown(self):
+        """Test that only significant increases beyond the tolerance are flagged."""
+        samples = [1.0, 1.02, 0.98, 1.01, 0.99]
+
+        self.assertTrue(check_measurement(samples, 1.5)["regressed"])
+        # Significant, but within the tolerance
+        self.assertFalse(check_measurement(samples, 1.1)["regressed"])
+        # Beyond the tolerance, but within the noise of the baseline
+        noisy = [0.5, 1.5, 0.6, 1.4, 1.0]
+        self.assertFalse(check_measurement(noisy, 1.5)["regressed"])
+        # Too few samples to judge
+        self.assertFalse(check_measurement(samples[:2], 5.0)["checked"])
+
+    def test_regression_reported_and_not_recorded(self):
+        """Test that a slowdown fails and is kept out of the baseline."""
+        database = PerformanceDatabase({("a.xml", "lq"): REFERENCE}, {
+            "runtime": [1.0, 1.02, 0.98, 1.01, 0.99],
+            "peak_memory": [100e6, 101e6, 99e6, 100e6, 100e6],
+        })
+        test = RegressionTest(database=database)
+
+        test.test_file("a.xml", "lq", dict(REFERENCE), runtime=2.0, peak_memory=100.5e6)
+        test.test_file("b.xml", "lq", dict(REFERENCE), runtime=2.0)
+
+        results = test.get_results()
+        self.assertIn("Performance Result: FAIL", results)
+        self.assertIn("a.xml (lq): runtime", results)
+        # Missing references get no performance check
+        self.assertNotIn("Performance Results for 'b.xml'", results)
+        self.assertEqual(database.recorded, [{"peak_memory": 100.5e6}])
+
+    def test_record_performance_keeps_rolling_window(self):
+        """Test that measurements are pushed with a bounded slice."""
+        with patch('pymongo.MongoClient') as mock_client:
+            mock_db = MagicMock()
+            mock_collection = MagicMock()
+            mock_client.return_value.__getitem__.return_value = mock_db
+            mock_db.with_options.return_value = mock_db  # Raw BSON read view
+            mock_db.__getitem__.return_value = mock_collection
+
+            database = Database(layout="consolidated")
+            self.assertTrue(database.record_performance("a.xml", "lq", {"runtime": 1.5}))
+
+        query, update = mock_collection.update_one.call_args[0]
+        self.assertEqual(query, {"method": "lq", "filename": "a.xml"})
+        push = update["$push"]["performance.runtime"]
+        self.assertEqual(push["$each"], [1.5])
+        self.assertLess(push["$slice"], 0)
+
+    def test_readding_reference_resets_baseline(self):
+        """Test that storing a reference again drops its performance history."""
+        for layout in ("per_method", "consolidated"):
+            with self.subTest(layout=layout), patch('pymongo.MongoClient') as mock_client:
+                mock_db = MagicMock()
+                mock_collection = MagicMock()
+                mock_client.return_value.__getitem__.return_value = mock_db
+                mock_db.__getitem__.return_value = mock_collection
+                mock_collection.find_one.return_value = {"_id": 1}  # Reference already exists
+
+                database = Database(layout=layout)
+                self.assertTrue(database.store_reference_data("a.xml", "lq", "<Root/>", REFERENCE))
+
+                update = mock_collection.update_one.call_args[0][1]
+                self.assertIn("performance", update["$unset"])
+
+
+if __name__ == '__main__':
+    unittest.main()
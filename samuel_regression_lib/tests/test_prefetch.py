@@ -0,0 +1,97 @@
+"""
+Tests for background prefetching of reference data.
+"""
+
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from samuel_regression_lib import RegressionTest
+from samuel_regression_lib.prefetch import ReferencePrefetcher, MISSING
+from samuel_regression_lib.tests.fakes import FakeDatabase
+
+
+class TestReferencePrefetcher(unittest.TestCase):
+    """Test cases for ReferencePrefetcher."""
+
+    def test_sequential_hits_in_batches(self):
+        """Test that hinted files are served from batched queries."""
+        keys = [(f"file{i}.xml", "lq") for i in range(50)]
+        database = FakeDatabase({key: {"RESULT": {"WIDTH": i}} for i, key in enumerate(keys)}, delay=0.01)
+        prefetcher = ReferencePrefetcher(database, iter(keys), window=16, batch_size=8)
+
+        for i, key in enumerate(keys):
+            self.assertEqual(prefetcher.get(*key), (True, {"RESULT": {"WIDTH": i}}))
+
+        self.assertEqual(prefetcher.hits, 50)
+        self.assertTrue(all(len(batch) <= 8 for batch in database.batches))
+        self.assertLess(len(database.batches), 50)
+
+    def test_missing_reference_is_a_hit(self):
+        """Test that a reference confirmed absent needs no second query."""
+        prefetcher = ReferencePrefetcher(FakeDatabase({}, delay=0.01), [("a.xml", "lq")])
+
+        self.assertEqual(prefetcher.get("a.xml", "lq"), (True, MISSING))
+
+    def test_unhinted_file_is_a_miss(self):
+        """Test that files outside the hint are left to the caller."""
+        database = FakeDatabase({("a.xml", "lq"): {}}, delay=0.01)
+        prefetcher = ReferencePrefetcher(database, [("a.xml", "lq")])
+
+        self.assertEqual(prefetcher.get("other.xml", "lq"), (False, None))
+        self.assertEqual(prefetcher.get("a.xml", "lq"), (True, {}))
+
+    def test_unhinted_file_does_not_wait(self):
+        """Test that a file outside the hint is a miss while hinted files are still fetched."""
+        keys = [(f"file{i}.xml", "lq") for i in range(50)]
+        database = FakeDatabase({key: {} for key in keys}, delay=0.2)
+        prefetcher = ReferencePrefetcher(database, keys, window=16, batch_size=8)
+
+        start = time.perf_counter()
+        self.assertEqual(prefetcher.get("other.xml", "lq"), (False, None))
+        self.assertLess(time.perf_counter() - start, 0.15)
+        self.assertEqual(prefetcher.get(*keys[0]), (True, {}))
+        prefetcher.stop()
+
+    def test_skipped_files_are_dropped(self):
+        """Test that the buffer does not fill up with skipped references."""
+        keys = [(f"file{i}.xml", "lq") for i in range(40)]
+        database = FakeDatabase({key: {} for key in keys}, delay=0)
+        prefetcher = ReferencePrefetcher(database, keys, window=4, batch_size=2)
+
+        # Only every third file is actually tested
+        for key in keys[::3]:
+            self.assertEqual(prefetcher.get(*key), (True, {}))
+
+    def test_failed_lookup_is_not_missing(self):
+        """Test that a batch lost to a database error is left to the caller."""
+        database = FakeDatabase()
+        database.get_reference_data_many = MagicMock(side_effect=ConnectionError("down"))
+        prefetcher = ReferencePrefetcher(database, [("a.xml", "lq")])
+
+        with patch("sys.stdout"):
+            self.assertEqual(prefetcher.get("a.xml", "lq"), (False, None))
+
+    def test_stop_joins_thread(self):
+        """Test that stop() waits for a fetch in progress to finish."""
+        keys = [(f"file{i}.xml", "lq") for i in range(40)]
+        prefetcher = ReferencePrefetcher(FakeDatabase({}, delay=0.1), keys, window=4, batch_size=2)
+
+        prefetcher.stop()
+        self.assertFalse(prefetcher._thread.is_alive())
+
+    def test_close_stops_thread(self):
+        """Test that closing RegressionTest shuts the prefetching thread down."""
+        keys = [(f"file{i}.xml", "lq") for i in range(40)]
+        database = FakeDatabase({key: {} for key in keys}, delay=0.01)
+        test = RegressionTest(database=database).prefetch(keys)
+        test.test_file("file0.xml", "lq", {})
+        thread = test._prefetcher._thread
+
+        test.close()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(test._prefetcher)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Tests for indexed range queries over stored RESULT values.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+
+from samuel_regression_lib.cli import parse_range
+from samuel_regression_lib.db import Database
+
+
+class TestResultQuery(unittest.TestCase):
+    """Test cases for result indexes and range queries."""
+
+    def setUp(self):
+        """Wire a mocked MongoClient to a single mocked collection."""
+        patcher = patch('pymongo.MongoClient')
+        mock_client = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.mock_db = MagicMock()
+        self.mock_collection = MagicMock()
+        mock_client.return_value.__getitem__.return_value = self.mock_db
+        self.mock_db.with_options.return_value = self.mock_db  # Raw BSON read view
+        self.mock_db.__getitem__.return_value = self.mock_collection
+
+    def test_indexes_cover_queries(self):
+        """Test that every index holds the filename (and method) for covered queries."""
+        self.mock_collection.create_index.side_effect = lambda keys, name: name
+
+        created = Database(layout="consolidated").ensure_result_indexes(["WIDTH", "ANGLE"])
+
+        self.assertEqual(created, [
+            ("references", "result_WIDTH"), ("references", "result_WIDTH_all"),
+            ("references", "result_ANGLE"), ("references", "result_ANGLE_all"),
+        ])
+        calls = self.mock_collection.create_index.call_args_list
+        self.assertEqual(calls[0][0][0], [("method", 1), ("output_data.RESULT.WIDTH", 1), ("filename", 1)])
+        # Queries without --method cannot use a method prefix
+        self.assertEqual(calls[1][0][0], [("output_data.RESULT.WIDTH", 1), ("method", 1), ("filename", 1)])
+
+    def test_per_method_indexes(self):
+        """Test that per-method collections get one index per field."""
+        self.mock_db.list_collection_names.return_value = ["reference_data_lq"]
+        self.mock_collection.create_index.side_effect = lambda keys, name: name
+
+        created = Database(layout="per_method").ensure_result_indexes(["WIDTH"])
+
+        self.assertEqual(created, [("reference_data_lq", "result_WIDTH")])
+        self.assertEqual(
+            self.mock_collection.create_index.call_args[0][0],
+            [("output_data.RESULT.WIDTH", 1), ("filename", 1)],
+        )
+
+    def test_range_query_streams_filenames(self):
+        """Test that ranges are filtered server-side and only names are projected."""
+        self.mock_collection.find.return_value = [
+            {"filename": "a.xml", "method": "lq"}, {"filename": "b.xml", "method": "lq"}
+        ]
+
+        found = list(Database(layout="consolidated").query_reference_data(
+            {"WIDTH": (10.0, 20.0), "ANGLE": (None, 45.0)}, method="lq"
+        ))
+
+        self.assertEqual(found, [("a.xml", "lq"), ("b.xml", "lq")])
+        query, projection = self.mock_collection.find.call_args[0]
+        self.assertEqual(query, {
+            "output_data.RESULT.WIDTH": {"$gte": 10.0, "$lte": 20.0},
+            "output_data.RESULT.ANGLE": {"$lte": 45.0},
+            "method": "lq",
+        })
+        self.assertEqual(projection, {"_id": 0, "filename": 1, "method": 1})
+
+    def test_invalid_fields_rejected(self):
+        """Test that field names cannot inject operators or paths."""
+        with self.assertRaises(ValueError):
+            list(Database().query_reference_data({"$where": (0, 1)}))
+        with self.assertRaises(ValueError):
+            Database().ensure_result_indexes(["RESULT.WIDTH"])
+
+    def test_parse_range(self):
+        """Test the --range syntax with open bounds."""
+        self.assertEqual(parse_range("WIDTH=10:20"), ("WIDTH", (10.0, 20.0)))
+        self.assertEqual(parse_range("ANGLE=:45"), ("ANGLE", (None, 45.0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Tests for quick check sampling.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from samuel_regression_lib import RegressionTest
+from samuel_regression_lib.sampling import QuickSampler, select_sample, failure_upper_bound
+
+NOW = 1000000000.0
+
+
+def _references(count, method="lq", updated_at=0.0):
+    return [
+        {"filename": f"file{i}.xml", "method": method, "updated_at": updated_at}
+        for i in range(count)
+    ]
+
+
+class TestSampling(unittest.TestCase):
+    """Test cases for sample selection and extrapolation."""
+
+    def test_sample_is_deterministic(self):
+        """Test that the same seed always gives the same sample."""
+        references = _references(200)
+
+        first = select_sample(references, 20, "seed", {}, NOW)
+        second = select_sample(list(reversed(references)), 20, "seed", {}, NOW)
+
+        self.assertEqual(len(first), 20)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, select_sample(references, 20, "other", {}, NOW))
+
+    def test_sample_favours_recent_failures_and_changes(self):
+        """Test that recently failing and changed files are preferred."""
+        references = _references(500)
+        references[7]["updated_at"] = NOW
+        history = {f"file{i}.xml": {"failed_at": NOW} for i in range(10, 20)}
+
+        hits = 0
+        for seed in range(20):
+            sample = select_sample(references, 25, str(seed), history, NOW)
+            hits += sum(f"file{i}.xml" in sample for i in [7] + list(range(10, 20)))
+
+        # Uniform sampling would pick about 20 * 11 * 25 / 500 = 11 of them
+        self.assertGreater(hits, 50)
+
+    def test_budget_larger_than_population(self):
+        """Test that a small method is tested exhaustively."""
+        self.assertEqual(len(select_sample(_references(5), 25, "seed", {}, NOW)), 5)
+
+    def test_failure_upper_bound(self):
+        """Test the extrapolated failure bound."""
+        self.assertEqual(failure_upper_bound(0, 0, 100), 1.0)
+        self.assertEqual(failure_upper_bound(2, 10, 10), 0.2)
+
+        no_failures = failure_upper_bound(0, 25, 1000)
+        some_failures = failure_upper_bound(5, 25, 1000)
+        self.assertGreater(no_failures, 0.0)
+        self.assertLess(no_failures, 0.2)
+        self.assertGreater(some_failures, 5 / 25)
+
+
+class TestHistory(unittest.TestCase):
+    """Test cases for the local quick check history."""
+
+    def setUp(self):
+        """Run in an empty directory with a backend holding one reference."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        self.addCleanup(os.chdir, cwd)
+
+        self.db = MagicMock()
+        self.db.test_connection.return_value = True
+        self.db.iter_reference_data.side_effect = lambda method: iter(_references(1, method))
+        self.db.get_reference_fingerprint.return_value = (True, None)
+        self.db.get_reference_data.return_value = {"RESULT": {"WIDTH": 10.0}}
+
+    def _run(self, **kwargs):
+        test = RegressionTest(database=self.db, quick=True, **kwargs)
+        test.test_file("file0.xml", "lq", {"RESULT": {"WIDTH": 10.0}})
+        test.get_results()
+        return test
+
+    def test_no_history_by_default(self):
+        """Test that a quick run writes no history file unless one is given."""
+        self._run()
+
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_history_path(self):
+        """Test that the outcomes go to the given history file, once per change."""
+        path = os.path.join(self.directory, "history", "quick.json")
+        os.mkdir(os.path.dirname(path))
+
+        test = self._run(quick_history=path)
+
+        with open(path) as f:
+            self.assertIn("file0.xml", json.load(f)["lq"])
+        self.assertIn("file0.xml", QuickSampler(self.db, history_path=path).history["lq"])
+        self.assertEqual(os.listdir(self.directory), ["history"])
+
+        # Nothing new was tested, so the history is not written again
+        os.remove(path)
+        test.get_results()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the shared-memory reference store.
+"""
+
+import multiprocessing
+import unittest
+from unittest.mock import patch
+
+from samuel_regression_lib.comparators import OutputComparator
+from samuel_regression_lib import shared
+from samuel_regression_lib.shared import SharedReferenceStore, init_worker, worker_store
+
+REFERENCES = {
+    ("a.xml", "lq"): {
+        "SLOPES": [{"Pos": 10.5, "Sensor": 5}, {"Pos": 20, "Sensor": 8.7}],
+        "RESULT": {
+            "START": 1, "END": 2.5, "WIDTH": 1.5, "HEIGHT_MIN": "",
+            "HEIGHT_MAX": None, "HEIGHT_MEAN": 3.25, "ANGLE": "n/a"
+        },
+    },
+    ("b.xml", "cr"): {"RESULT": {"WIDTH": 7}},
+    ("d.xml", "cr"): {
+        "SLOPES": [{"Pos": 1.0, "Sensor": 2.0}],
+        "RESULT": {"START": 1, "END": 2.5, "WIDTH": 1.5},
+    },
+    ("c.xml", "lq"): {"RESULT": {"WIDTH": 1}, "EXTRA": [1, 2, 3]},
+}
+
+
+def _worker_lookup(key):
+    """Look up a reference in a pool worker and convert it to plain data."""
+    reference = worker_store().get_reference_data(*key)
+    return {"RESULT": reference["RESULT"], "SLOPES": list(reference.get("SLOPES", []))}
+
+
+class TestSharedReferenceStore(unittest.TestCase):
+    """Test cases for SharedReferenceStore."""
+
+    def setUp(self):
+        """Create a store from the test references."""
+        self.store = SharedReferenceStore.create(REFERENCES.items())
+        self.addCleanup(self.store.close)
+
+    def test_round_trip(self):
+        """Test that views decode to the original values and types."""
+        for (filename, method), output_data in REFERENCES.items():
+            reference = self.store.get_reference_data(filename, method)
+            self.assertEqual(dict(reference), output_data)
+
+        self.assertIsNone(self.store.get_reference_data("a.xml", "cr"))
+
+    def test_comparator_accepts_views(self):
+        """Test that the comparator works directly on a view."""
+        reference = self.store.get_reference_data("d.xml", "cr")
+        actual = {"SLOPES": [{}], "RESULT": {"START": 1, "END": 2.5, "WIDTH": 1.501}}
+
+        result = OutputComparator().compare(actual, reference, 0.01)
+
+        self.assertTrue(result["overall_passed"])
+        self.assertEqual(result["attributes"]["START"]["expected"], 1)
+        self.assertEqual(result["attributes"]["SLOPES_COUNT"]["expected"], 1)
+
+    def test_workers_read_shared_block(self):
+        """Test that pool workers attach and read without a database."""
+        keys = list(REFERENCES)[:2]
+        with multiprocessing.Pool(2, initializer=init_worker, initargs=(self.store.handle,)) as pool:
+            results = pool.map(_worker_lookup, keys)
+
+        self.assertEqual(results[0], REFERENCES[keys[0]])
+        self.assertEqual(results[1], {"RESULT": {"WIDTH": 7}, "SLOPES": []})
+
+    def test_without_shared_memory(self):
+        """Test the per-process fallback for Python < 3.8."""
+        with patch.object(shared, "shared_memory", None):
+            store = SharedReferenceStore.create(REFERENCES.items())
+            attached = SharedReferenceStore.attach(store.handle)
+        self.addCleanup(store.close)
+        self.addCleanup(attached.close)
+
+        self.assertIsNone(store.handle[0])
+        for (filename, method), output_data in REFERENCES.items():
+            self.assertEqual(dict(attached.get_reference_data(filename, method)), output_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Tests for memory-mapped reference snapshots.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from samuel_regression_lib.snapshot import SnapshotDatabase, export_snapshot, refresh_snapshot
+from samuel_regression_lib.tests.fakes import FakeDatabase, reference_document
+
+
+def _doc(filename, method, width, updated_at):
+    return reference_document(
+        filename, method, {"RESULT": {"WIDTH": width}, "SLOPES": [{"Pos": 1, "Sensor": 2.5}]}, updated_at
+    )
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test cases for snapshot export, lookup and refresh."""
+
+    def setUp(self):
+        """Create a temporary directory for snapshot files."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "refs.snap")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory)
+
+    def _data_size(self):
+        """Size of the header and data records of the snapshot."""
+        snapshot = SnapshotDatabase(self.path)
+        try:
+            snapshot._open()
+            return snapshot._index_offset
+        finally:
+            snapshot.close()
+
+    def test_export_and_lookup(self):
+        """Test that exported references can be looked up by key."""
+        database = FakeDatabase(documents=[
+            _doc("b.xml", "lq", 2, 10.0),
+            _doc("a.xml", "lq", 1, 10.0),
+            _doc("a.xml", "cr", 3, 10.0),
+        ])
+
+        self.assertEqual(export_snapshot(database, self.path), 3)
+
+        snapshot = SnapshotDatabase(self.path)
+        try:
+            self.assertEqual(snapshot.get_reference_data("a.xml", "lq")["RESULT"], {"WIDTH": 1})
+            self.assertEqual(snapshot.get_reference_data("a.xml", "cr")["RESULT"], {"WIDTH": 3})
+            self.assertIsNone(snapshot.get_reference_data("c.xml", "lq"))
+            self.assertEqual(snapshot.count_reference_data(), {"cr": 1, "lq": 2})
+            self.assertEqual(
+                [doc["filename"] for doc in snapshot.iter_reference_data("lq")],
+                ["a.xml", "b.xml"],
+            )
+        finally:
+            snapshot.close()
+
+    def test_export_selected_methods(self):
+        """Test that only the requested methods are exported."""
+        database = FakeDatabase(documents=[_doc("a.xml", "lq", 1, 10.0), _doc("a.xml", "cr", 3, 10.0)])
+
+        self.assertEqual(export_snapshot(database, self.path, ["cr"]), 1)
+
+    def test_refresh_applies_delta(self):
+        """Test that refresh adds new and replaces updated references."""
+        docs = [_doc("a.xml", "lq", 1, 10.0), _doc("b.xml", "lq", 2, 10.0)]
+        database = FakeDatabase(documents=docs)
+        export_snapshot(database, self.path)
+
+        docs[0] = _doc("a.xml", "lq", 100, 20.0)
+        docs.append(_doc("c.xml", "lq", 3, 20.0))
+
+        written, updated = refresh_snapshot(database, self.path)
+
+        self.assertEqual(written, 3)
+        self.assertEqual(updated, 2)  # b.xml is unchanged
+        snapshot = SnapshotDatabase(self.path)
+        try:
+            self.assertEqual(snapshot.get_reference_data("a.xml", "lq")["RESULT"], {"WIDTH": 100})
+            self.assertEqual(snapshot.get_reference_data("b.xml", "lq")["RESULT"], {"WIDTH": 2})
+            self.assertEqual(snapshot.get_reference_data("c.xml", "lq")["RESULT"], {"WIDTH": 3})
+        finally:
+            snapshot.close()
+
+    def test_refresh_does_not_grow(self):
+        """Test that refreshing leaves no dead records and skips the boundary record."""
+        docs = [_doc("a.xml", "lq", 1, 10.0), _doc("b.xml", "lq", 2, 20.0)]
+        database = FakeDatabase(documents=docs)
+        export_snapshot(database, self.path)
+        data_size = self._data_size()
+
+        self.assertEqual(refresh_snapshot(database, self.path), (2, 0))
+        docs[0] = _doc("a.xml", "lq", 5, 30.0)
+        for _ in range(3):
+            refresh_snapshot(database, self.path)
+
+        self.assertEqual(refresh_snapshot(database, self.path), (2, 0))
+        self.assertEqual(self._data_size(), data_size)
+
+    def test_unreadable_snapshot(self):
+        """Test that a file that is not a snapshot fails to load."""
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot at all, just some bytes")
+
+        snapshot = SnapshotDatabase(self.path)
+        self.assertFalse(snapshot.test_connection())
+        self.assertIsNone(snapshot.get_reference_data("a.xml", "lq"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Tests for Chrome trace export.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from samuel_regression_lib import RegressionTest
+from samuel_regression_lib.tests.fakes import FakeDatabase
+from samuel_regression_lib.tracer import Tracer, merge_traces
+
+REFERENCES = {("a.xml", "lq"): {"RESULT": {"WIDTH": 1.0}}}
+
+
+class TestTracer(unittest.TestCase):
+    """Test cases for tracing regression runs."""
+
+    def setUp(self):
+        """Create a temporary directory for trace files."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_regression_run_spans(self):
+        """Test that a run records connect, lookup, compare and report spans."""
+        path = os.path.join(self.directory, "trace-{pid}.json")
+        test = RegressionTest(database=FakeDatabase(REFERENCES), trace=path)
+
+        with test.span("extract", filename="a.xml"):
+            output_data = {"RESULT": {"WIDTH": 1.0}}
+        test.test_file("a.xml", "lq", output_data)
+        test.test_file("b.xml", "lq", output_data)
+        test.get_results()
+
+        with open(path.replace("{pid}", str(os.getpid()))) as f:
+            events = json.load(f)["traceEvents"]
+
+        spans = [event for event in events if event["ph"] == "X"]
+        self.assertEqual(
+            [event["name"] for event in spans],
+            ["extract", "connect", "lookup", "compare", "report", "file",
+             "lookup", "report", "file", "results"],
+        )
+        for event in spans:
+            self.assertEqual(event["pid"], os.getpid())
+            self.assertEqual(event["tid"], threading.get_ident())
+            self.assertGreaterEqual(event["dur"], 0)
+        self.assertEqual(spans[2]["args"], {"filename": "a.xml", "method": "lq"})
+        self.assertIn("thread_name", [event["name"] for event in events if event["ph"] == "M"])
+
+    def test_tracing_is_opt_in(self):
+        """Test that spans are no-ops without a tracer."""
+        test = RegressionTest(database=FakeDatabase(REFERENCES))
+        with test.span("extract"):
+            pass
+        self.assertIsNone(test.tracer)
+
+    def test_merge_traces(self):
+        """Test that traces of several processes are combined."""
+        paths = []
+        for index in range(2):
+            tracer = Tracer()
+            with tracer.span("lookup", filename=f"{index}.xml"):
+                pass
+            path = os.path.join(self.directory, f"worker{index}.json")
+            tracer.save(path)
+            paths.append(path)
+
+        output_path = os.path.join(self.directory, "merged.json")
+        count = merge_traces(paths, output_path)
+
+        with open(output_path) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(count, len(events))
+        self.assertEqual(sum(event["name"] == "lookup" for event in events), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
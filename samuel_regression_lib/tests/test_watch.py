@@ -0,0 +1,115 @@
+"""
+Tests for watch mode.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+from samuel_regression_lib.tests.fakes import FakeDatabase
+from samuel_regression_lib.watch import WatchSession, make_watcher
+
+
+def _output_xml(width):
+    """Build an output file whose embedded RESULT has the given width."""
+    return "<Root><Data>" + escape(
+        f"<OUTPUT><RESULT><WIDTH>{width}</WIDTH><ANGLE>45.0</ANGLE></RESULT></OUTPUT>"
+    ) + "</Data></Root>"
+
+
+class TestWatch(unittest.TestCase):
+    """Test cases for incremental re-testing and change detection."""
+
+    def setUp(self):
+        """Create an output directory with two files."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self._write("a.xml", "10.0")
+        self._write("b.xml", "10.0")
+
+    def _write(self, filename, width):
+        with open(os.path.join(self.directory, filename), "w") as f:
+            f.write(_output_xml(width))
+
+    def test_only_changed_files_are_retested(self):
+        """Test that results update incrementally with warm references."""
+        reference = {"RESULT": {"WIDTH": 10.0, "ANGLE": 45.0}, "SLOPES": []}
+        database = FakeDatabase({("a.xml", "lq"): reference})
+        session = WatchSession(self.directory, "lq", database)
+
+        changes = session.update(session.filenames())
+        self.assertEqual([change[:2] for change in changes], [("a.xml", "PASS"), ("b.xml", "MISSING")])
+        self.assertEqual(session.summary(), "1 PASS, 0 FAIL, 0 ERROR, 1 MISSING")
+
+        self._write("a.xml", "12.0")
+        changes = session.update({"a.xml"})
+        self.assertEqual(changes[0][:2], ("a.xml", "FAIL"))
+        self.assertIn("WIDTH", changes[0][2])
+
+        # Rewriting an unchanged output reports nothing new
+        self._write("a.xml", "12.0")
+        self.assertEqual(session.update({"a.xml"}), [])
+
+        os.remove(os.path.join(self.directory, "b.xml"))
+        self.assertEqual(session.update({"b.xml"}), [("b.xml", "DELETED", "")])
+        self.assertEqual(len(database.batches), 1)
+
+    def test_failed_lookup_is_retried(self):
+        """Test that a database error is not cached as a missing reference."""
+        reference = {"RESULT": {"WIDTH": 10.0, "ANGLE": 45.0}, "SLOPES": []}
+        database = FakeDatabase({("a.xml", "lq"): reference})
+        session = WatchSession(self.directory, "lq", database)
+
+        with patch.object(database, "get_reference_data_many", side_effect=ConnectionError("down")), \
+                patch("sys.stdout"):
+            changes = session.update({"a.xml"})
+        self.assertEqual(changes, [("a.xml", "ERROR", "reference lookup failed")])
+
+        self._write("a.xml", "10.0")
+        self.assertEqual(session.update({"a.xml"})[0][:2], ("a.xml", "PASS"))
+
+    def test_unanswered_single_lookup_is_retried(self):
+        """Test that a None from get_reference_data is looked up again on the next change."""
+        reference = {"RESULT": {"WIDTH": 10.0, "ANGLE": 45.0}, "SLOPES": []}
+        answers = [None, reference]  # The first lookup fails
+
+        class _SingleDatabase:
+            def get_reference_data(self, filename, method):
+                return answers.pop(0)
+
+        session = WatchSession(self.directory, "lq", _SingleDatabase())
+
+        self.assertEqual(session.update({"a.xml"}), [("a.xml", "MISSING", "no reference data")])
+        self._write("a.xml", "10.0")
+        self.assertEqual(session.update({"a.xml"})[0][:2], ("a.xml", "PASS"))
+        self.assertEqual(answers, [])
+
+    def test_polling_watcher(self):
+        """Test that polling reports modified and new files."""
+        watcher = make_watcher(self.directory, poll_interval=0.01)
+        self.addCleanup(watcher.close)
+
+        self._write("c.xml", "1.0")
+        os.utime(os.path.join(self.directory, "a.xml"), ns=(0, 0))
+
+        self.assertEqual(watcher.wait(1.0), {"a.xml", "c.xml"})
+        self.assertEqual(watcher.wait(0.05), set())
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_watcher(self):
+        """Test that inotify reports written and deleted files."""
+        watcher = make_watcher(self.directory)
+        self.addCleanup(watcher.close)
+
+        self._write("a.xml", "11.0")
+        os.remove(os.path.join(self.directory, "b.xml"))
+
+        self.assertEqual(watcher.wait(1.0), {"a.xml", "b.xml"})
+
+
+if __name__ == '__main__':
+    unittest.main()
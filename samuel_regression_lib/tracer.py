@@ -0,0 +1,150 @@
+"""
+Timeline tracing of regression runs in the Chrome trace-event format.
+
+A Tracer records spans (connect, lookup, extract, compare, report, ...)
+with the process and thread they ran on. The saved JSON file opens in
+chrome://tracing, Perfetto (ui.perfetto.dev) or any other viewer of the
+trace-event format, which shows stragglers and operations waiting on each
+other that aggregate timings hide.
+
+Timestamps are wall-clock microseconds, so traces written by several
+worker processes can be combined with merge_traces().
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Tracer:
+    """
+    Collects trace events of one process; safe to use from several threads.
+    """
+
+    def __init__(self, path=None, process_name=None):
+        """
+        Initialize an empty trace.
+
+        Args:
+            path: Default path for save(); "{pid}" is replaced by the process
+                  id, so that every worker process can write its own file
+            process_name: Name shown for this process in the viewer
+        """
+        self.path = path
+        self.pid = os.getpid()
+        self._events = []
+        self._named_threads = set()
+        self._lock = threading.Lock()
+
+        # Wall-clock origin with the resolution of the monotonic clock
+        self._origin_ns = time.time_ns() - time.perf_counter_ns()
+
+        self._events.append({
+            "name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+            "args": {"name": process_name or f"regression {self.pid}"},
+        })
+
+    def _now_us(self):
+        return (self._origin_ns + time.perf_counter_ns()) / 1000.0
+
+    def _thread_id(self):
+        """Get the current thread id, naming the thread on first use."""
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self._named_threads:
+            self._named_threads.add(tid)
+            self._events.append({
+                "name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                "args": {"name": thread.name},
+            })
+        return tid
+
+    @contextmanager
+    def span(self, name, category="regression", **args):
+        """
+        Record the enclosed block as one span.
+
+        Args:
+            name: Span name (e.g., "lookup")
+            category: Trace-event category
+            **args: Details shown with the span, e.g. filename and method
+        """
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            end = self._now_us()
+            with self._lock:
+                self._events.append({
+                    "name": name, "cat": category, "ph": "X",
+                    "ts": start, "dur": end - start,
+                    "pid": self.pid, "tid": self._thread_id(),
+                    "args": args,
+                })
+
+    def instant(self, name, category="regression", **args):
+        """
+        Record a point in time, e.g. a failed comparison.
+
+        Args:
+            name: Event name
+            category: Trace-event category
+            **args: Details shown with the event
+        """
+        with self._lock:
+            self._events.append({
+                "name": name, "cat": category, "ph": "i", "s": "t",
+                "ts": self._now_us(), "pid": self.pid, "tid": self._thread_id(),
+                "args": args,
+            })
+
+    @property
+    def events(self):
+        """Copy of the recorded events."""
+        with self._lock:
+            return list(self._events)
+
+    def save(self, path=None):
+        """
+        Write the trace as trace-event JSON.
+
+        Args:
+            path: Output path (default: the path given at construction)
+
+        Returns:
+            The path written
+        """
+        path = (path or self.path).replace("{pid}", str(self.pid))
+        _write_trace(path, self.events)
+        return path
+
+
+def _write_trace(path, events):
+    """Write trace events to a file atomically."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    os.replace(temp_path, path)
+
+
+def merge_traces(paths, output_path):
+    """
+    Combine the traces of several processes into one file.
+
+    Args:
+        paths: Paths of trace files written by Tracer.save()
+        output_path: Path of the combined trace
+
+    Returns:
+        Number of events in the combined trace
+    """
+    events = []
+    for path in paths:
+        with open(path, "r") as f:
+            data = json.load(f)
+        events.extend(data["traceEvents"] if isinstance(data, dict) else data)
+
+    _write_trace(output_path, events)
+    return len(events)
@@ -0,0 +1,365 @@
+"""
+Watch mode: re-test only the files that change in an output directory.
+
+The directory is watched with inotify where available (Linux, through
+ctypes) and by polling modification times elsewhere. The database client,
+the references of the method and the fingerprint of every tested output
+are kept between changes, so a change costs one extraction and one
+in-memory comparison instead of a full rerun.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import time
+from datetime import datetime
+
+from .config import TOLERANCE_THRESHOLD, WATCH_POLL_INTERVAL, WATCH_DEBOUNCE_SECONDS, WATCH_PATTERN
+
+# inotify constants from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+
+_MISSING = object()
+
+
+class _InotifyWatcher:
+    """Reports changed files of a directory using inotify through ctypes."""
+
+    def __init__(self, directory, pattern):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.directory = directory
+        self.pattern = pattern
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for '{directory}'")
+
+    def _read_events(self):
+        """Read the pending events; returns None after a queue overflow."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _IN_EVENT.unpack_from(data, offset)
+                offset += _IN_EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & _IN_Q_OVERFLOW:
+                    changed = None
+                elif changed is not None and name:
+                    name = os.fsdecode(name)
+                    if fnmatch.fnmatch(name, self.pattern):
+                        changed.add(name)
+
+    def wait(self, timeout):
+        """
+        Wait for changes.
+
+        Args:
+            timeout: Seconds to wait at most
+
+        Returns:
+            Set of changed filenames (possibly empty), or None if events
+            were lost and the whole directory has to be rescanned
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = self._read_events()
+        # Collect the rest of a burst, e.g. a script writing many outputs
+        while changed is not None:
+            readable, _, _ = select.select([self.fd], [], [], WATCH_DEBOUNCE_SECONDS)
+            if not readable:
+                break
+            more = self._read_events()
+            changed = None if more is None else changed | more
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingWatcher:
+    """Reports changed files of a directory by comparing modification times."""
+
+    def __init__(self, directory, pattern, interval=WATCH_POLL_INTERVAL):
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self._state = self._scan()
+
+    def _scan(self):
+        state = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if fnmatch.fnmatch(entry.name, self.pattern) and entry.is_file():
+                    stat = entry.stat()
+                    state[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def wait(self, timeout):
+        """
+        Wait for changes, polling every interval.
+
+        Args:
+            timeout: Seconds to wait at most
+
+        Returns:
+            Set of changed filenames (possibly empty)
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self._scan()
+            changed = {
+                name for name in state.keys() | self._state.keys()
+                if state.get(name) != self._state.get(name)
+            }
+            self._state = state
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory, pattern=WATCH_PATTERN, poll_interval=None):
+    """
+    Create a watcher for a directory, preferring inotify.
+
+    Args:
+        directory: Directory to watch
+        pattern: Glob pattern of the files to watch
+        poll_interval: Force polling with this interval in seconds
+
+    Returns:
+        Watcher with wait(timeout) and close() methods
+    """
+    if poll_interval is None and sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(directory, pattern)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); polling for changes")
+    return _PollingWatcher(directory, pattern, poll_interval or WATCH_POLL_INTERVAL)
+
+
+class WatchSession:
+    """
+    Keeps references and results of one method warm between changes.
+    """
+
+    def __init__(self, directory, method, database, extractor=None, comparator=None,
+                 pattern=WATCH_PATTERN):
+        """
+        Initialize the session.
+
+        Args:
+            directory: Directory holding the outputs of the script under test
+            method: Method name the outputs are tested against
+            database: Reference backend, kept connected for the session
+            extractor: Extractor of output data (default XMLExtractor)
+            comparator: Output comparator (default OutputComparator)
+            pattern: Glob pattern of the output files
+        """
+        if extractor is None:
+            from .extractors import XMLExtractor
+            extractor = XMLExtractor()
+        if comparator is None:
+            from .comparators import OutputComparator
+            comparator = OutputComparator()
+
+        self.directory = directory
+        self.method = method
+        self.db = database
+        self.extractor = extractor
+        self.comparator = comparator
+        self.pattern = pattern
+
+        self.results = {}  # filename -> (status, detail)
+        self._references = {}  # filename -> reference output data or _MISSING
+        self._fingerprints = {}  # filename -> fingerprint of the last tested output
+        self._unresolved = {}  # filename -> (status, detail) of a lookup that was not cached
+
+    def filenames(self):
+        """List the output files currently in the directory."""
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if fnmatch.fnmatch(name, self.pattern)
+            and os.path.isfile(os.path.join(self.directory, name))
+        )
+
+    def _load_references(self, filenames):
+        """Fetch the references not cached yet, in one batch when supported."""
+        self._unresolved = {}
+        needed = [name for name in filenames if name not in self._references]
+        if not needed:
+            return
+
+        if hasattr(self.db, "get_reference_data_many"):
+            try:
+                found = self.db.get_reference_data_many((name, self.method) for name in needed)
+            except Exception as e:
+                # Not cached, so the lookup is retried when the files change again
+                print(f"Error retrieving reference data: {e}")
+                self._unresolved = {name: ("ERROR", "reference lookup failed") for name in needed}
+                return
+            for name in needed:
+                self._references[name] = found.get((name, self.method), _MISSING)
+        else:
+            for name in needed:
+                reference_data = self.db.get_reference_data(name, self.method)
+                if reference_data is None:
+                    # Also returned when the lookup fails, so it is not cached
+                    self._unresolved[name] = ("MISSING", "no reference data")
+                else:
+                    self._references[name] = reference_data
+
+    def _test(self, filename):
+        """Extract and compare one file; returns (status, detail)."""
+        from .comparators import output_fingerprint
+
+        try:
+            with open(os.path.join(self.directory, filename), "r") as f:
+                xml_data = f.read()
+            output_data = self.extractor.extract_output(xml_data)
+        except Exception as e:
+            self._fingerprints.pop(filename, None)
+            return "ERROR", getattr(e, "reason", str(e))
+
+        fingerprint = output_fingerprint(output_data)
+        if self._fingerprints.get(filename) == fingerprint and filename in self.results:
+            return self.results[filename]
+        self._fingerprints[filename] = fingerprint
+
+        reference_data = self._references.get(filename)
+        if reference_data is None:
+            self._fingerprints.pop(filename, None)
+            return self._unresolved.get(filename, ("ERROR", "reference lookup failed"))
+        if reference_data is _MISSING:
+            return "MISSING", "no reference data"
+
+        comparison = self.comparator.compare(output_data, reference_data, TOLERANCE_THRESHOLD)
+        failed = [attr for attr, values in comparison["attributes"].items() if not values["passed"]]
+        detail = f"{comparison['average_diff']:.2f}%"
+        if failed:
+            detail += f"; failed: {', '.join(failed)}"
+        return ("PASS" if comparison["overall_passed"] else "FAIL"), detail
+
+    def update(self, filenames):
+        """
+        Re-test changed files.
+
+        Args:
+            filenames: Names of the changed files; files that no longer
+                       exist are dropped from the results
+
+        Returns:
+            List of (filename, status, detail) for the files whose result
+            changed, with status "DELETED" for removed files
+        """
+        present = [
+            name for name in sorted(filenames)
+            if os.path.isfile(os.path.join(self.directory, name))
+        ]
+        self._load_references(present)
+
+        changes = []
+        for name in sorted(filenames):
+            if name not in present:
+                if self.results.pop(name, None) is not None:
+                    self._fingerprints.pop(name, None)
+                    changes.append((name, "DELETED", ""))
+                continue
+
+            result = self._test(name)
+            if self.results.get(name) != result:
+                self.results[name] = result
+                changes.append((name, *result))
+        return changes
+
+    def summary(self):
+        """One-line summary of the current results."""
+        counts = {}
+        for status, _ in self.results.values():
+            counts[status] = counts.get(status, 0) + 1
+        return ", ".join(
+            f"{counts.get(status, 0)} {status}" for status in ("PASS", "FAIL", "ERROR", "MISSING")
+        )
+
+
+def watch(directory, method, database, extractor=None, poll_interval=None, out=None,
+          max_updates=None):
+    """
+    Test all outputs of a directory, then re-test them as they change.
+
+    Runs until interrupted (or max_updates batches of changes were tested).
+
+    Args:
+        directory: Directory holding the outputs of the script under test
+        method: Method name the outputs are tested against
+        database: Reference backend, kept connected for the session
+        extractor: Optional extractor (e.g. an IsolatedExtractor)
+        poll_interval: Force polling with this interval in seconds
+        out: Stream the live summary is written to (default stdout)
+        max_updates: Stop after this many batches of changes
+
+    Returns:
+        The WatchSession with the final results
+    """
+    out = out or sys.stdout
+    session = WatchSession(directory, method, database, extractor)
+    watcher = make_watcher(directory, session.pattern, poll_interval)
+
+    def report(changes, seconds):
+        for filename, status, detail in changes:
+            out.write(f"  {status:8} {filename}" + (f" ({detail})" if detail else "") + "\n")
+        stamp = datetime.now().strftime("%H:%M:%S")
+        out.write(f"[{stamp}] {len(changes)} changed in {seconds:.2f}s | {session.summary()}\n")
+        out.flush()
+
+    try:
+        start = time.perf_counter()
+        report(session.update(session.filenames()), time.perf_counter() - start)
+        out.write(f"Watching '{directory}' for changes (Ctrl+C to stop)\n")
+        out.flush()
+
+        updates = 0
+        while max_updates is None or updates < max_updates:
+            changed = watcher.wait(1.0)
+            if changed is None:
+                changed = set(session.filenames()) | set(session.results)
+            if not changed:
+                continue
+
+            start = time.perf_counter()
+            report(session.update(changed), time.perf_counter() - start)
+            updates += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+    return session
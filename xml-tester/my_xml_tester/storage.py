@@ -1,5 +1,5 @@
 # my_xml_tester/storage.py
-import xml.etree.ElementTree as ET
+from my_xml_tester import xml_backend
 from my_xml_tester.db import get_db_connection
 from my_xml_tester.extractor import extract_filename, extract_analyzer_result, extract_raw_xml
 
@@ -23,7 +23,7 @@ def store_xml(file_path: str, method_name: str):
 
     raw_data = extract_raw_xml(file_path)
     analyzer_elem = extract_analyzer_result(raw_data)
-    analyzer_data = ET.tostring(analyzer_elem, encoding='unicode') if analyzer_elem is not None else ""
+    analyzer_data = xml_backend.tostring(analyzer_elem) if analyzer_elem is not None else ""
 
     record = {
         "filename": filename,
@@ -45,6 +45,6 @@ def compare_output_with_reference(filename: str, method_name: str, output_xml_pa
     
     output_raw = extract_raw_xml(output_xml_path)
     output_analyzer_elem = extract_analyzer_result(output_raw)
-    output_analyzer_data = ET.tostring(output_analyzer_elem, encoding='unicode') if output_analyzer_elem is not None else ""
+    output_analyzer_data = xml_backend.tostring(output_analyzer_elem) if output_analyzer_elem is not None else ""
     
     return "Match" if stored_record["analyzer_data"] == output_analyzer_data else "Mismatch"
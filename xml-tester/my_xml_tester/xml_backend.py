@@ -0,0 +1,91 @@
+# my_xml_tester/xml_backend.py
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+XML_BACKEND = os.getenv("XML_BACKEND", "auto")  # "auto", "lxml" or "stdlib"
+
+BACKEND_LXML = "lxml"
+BACKEND_STDLIB = "stdlib"
+
+
+def _load_backend(name):
+    """Import the requested backend; "auto" prefers lxml."""
+    if name not in ("auto", BACKEND_LXML, BACKEND_STDLIB):
+        raise ValueError(f"Unknown XML backend '{name}'")
+
+    if name != BACKEND_STDLIB:
+        try:
+            from lxml import etree
+            return BACKEND_LXML, etree
+        except ImportError:
+            if name == BACKEND_LXML:
+                raise
+
+    return BACKEND_STDLIB, ET
+
+
+BACKEND, _etree = _load_backend(XML_BACKEND)
+
+if BACKEND == BACKEND_LXML:
+    ParseError = _etree.XMLSyntaxError
+
+    # Parse like ElementTree (no comments, PIs or external entities)
+    _OPTIONS = dict(
+        remove_comments=True, remove_pis=True, huge_tree=True, no_network=True,
+        resolve_entities="internal" if _etree.LXML_VERSION >= (5,) else False,
+    )
+
+    # lxml parsers keep per-parse state, so each thread gets its own pair
+    _parsers = threading.local()
+
+    def _get_parsers():
+        """Return this thread's (bytes parser, text parser), creating them on first use."""
+        parsers = getattr(_parsers, "pair", None)
+        if parsers is None:
+            # str input is encoded as UTF-8 first; ignore the encoding it declares
+            parsers = _parsers.pair = (
+                _etree.XMLParser(**_OPTIONS),
+                _etree.XMLParser(encoding="utf-8", **_OPTIONS),
+            )
+        return parsers
+
+    def fromstring(data):
+        """Parse an XML document from a string."""
+        if isinstance(data, str):
+            return _etree.fromstring(data.encode("utf-8"), _get_parsers()[1])
+        return _etree.fromstring(data, _get_parsers()[0])
+
+    def parse(source):
+        """Parse an XML document from a file."""
+        return _etree.parse(source, _get_parsers()[0]).getroot()
+
+    def iterparse(source, events=("end",)):
+        """Incrementally parse an XML file, yielding (event, element) pairs."""
+        return _etree.iterparse(source, events=events, **_OPTIONS)
+
+    def tostring(element):
+        """Serialize an element (with its tail) exactly as ElementTree does."""
+        # Re-read with ElementTree, which writes namespace prefixes as ns0, ns1, ...
+        tail = element.tail
+        element = ET.fromstring(_etree.tostring(element, with_tail=False))
+        element.tail = tail
+        return ET.tostring(element, encoding="unicode")
+else:
+    ParseError = ET.ParseError
+
+    def fromstring(data):
+        """Parse an XML document from a string."""
+        return ET.fromstring(data)
+
+    def parse(source):
+        """Parse an XML document from a file."""
+        return ET.parse(source).getroot()
+
+    def iterparse(source, events=("end",)):
+        """Incrementally parse an XML file, yielding (event, element) pairs."""
+        return ET.iterparse(source, events=events)
+
+    def tostring(element):
+        """Serialize an element (with its tail) exactly as ElementTree does."""
+        return ET.tostring(element, encoding="unicode")
@@ -0,0 +1,68 @@
+# test_xml_backend.py
+import importlib
+import os
+import unittest
+import xml.etree.ElementTree as ET
+from unittest.mock import MagicMock, patch
+
+from my_xml_tester import storage, xml_backend
+
+DOCUMENTS = {
+    "plain": "<Root><!-- c --><AnalyzerResult a='1'><V>2</V><E/></AnalyzerResult> tail </Root>",
+    "namespaced": (
+        "<r:Root xmlns:r='urn:root' xmlns:v='urn:values'>"
+        "<AnalyzerResult v:unit='mm'><v:Width>1.5</v:Width><r:Ok/></AnalyzerResult></r:Root>"
+    ),
+}
+
+def _original(document):
+    """What storage stored before the backends existed: ElementTree's serialization."""
+    return ET.tostring(ET.fromstring(document).find('.//AnalyzerResult'), encoding='unicode')
+
+def _backends():
+    """Reload xml_backend once per installed backend."""
+    try:
+        import lxml  # noqa: F401
+        names = ["stdlib", "lxml"]
+    except ImportError:
+        names = ["stdlib"]
+    try:
+        for name in names:
+            with patch.dict(os.environ, {"XML_BACKEND": name}):
+                importlib.reload(xml_backend)
+            yield name
+    finally:
+        importlib.reload(xml_backend)
+
+class TestXmlBackend(unittest.TestCase):
+    def test_serialization_matches_elementtree(self):
+        """Both backends store the fragment ElementTree would have stored."""
+        for name in _backends():
+            for label, document in DOCUMENTS.items():
+                with self.subTest(backend=name, document=label):
+                    element = xml_backend.fromstring(document).find('.//AnalyzerResult')
+                    self.assertEqual(xml_backend.tostring(element), _original(document))
+
+    def test_compare_is_exact(self):
+        """A reference stored with ElementTree matches output parsed by either backend."""
+        for name in _backends():
+            for label, document in DOCUMENTS.items():
+                with self.subTest(backend=name, document=label):
+                    collection = MagicMock()
+                    collection.find_one.return_value = {"analyzer_data": _original(document)}
+                    with patch.object(storage, "get_db_connection", return_value=collection), \
+                            patch.object(storage, "extract_raw_xml", return_value=document):
+                        result = storage.compare_output_with_reference("a", "lq", "a.xml")
+                    self.assertEqual(result, "Match")
+
+    def test_changed_value_mismatches(self):
+        """Any difference in the serialized fragment is a mismatch."""
+        document = DOCUMENTS["plain"]
+        collection = MagicMock()
+        collection.find_one.return_value = {"analyzer_data": _original(document).replace("2", "3")}
+        with patch.object(storage, "get_db_connection", return_value=collection), \
+                patch.object(storage, "extract_raw_xml", return_value=document):
+            self.assertEqual(storage.compare_output_with_reference("a", "lq", "a.xml"), "Mismatch")
+
+if __name__ == '__main__':
+    unittest.main()